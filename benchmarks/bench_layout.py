@@ -0,0 +1,96 @@
+"""Layout timing: NumPy layouts vs. the browser-side TypeScript layouts.
+
+Times py_src.layout for right-tree / circle / force at 1k/10k/50k nodes. The
+same map is also laid out by web_src/layouts through
+benchmarks/js_layout_bench.ts, bundled once with the esbuild that vite
+installs (``npm install``) and run with node. Without node or node_modules
+the JS column is skipped. (There is no headless JS force layout to compare
+against, so force is Python-only.)
+
+Usage: python benchmarks/bench_layout.py [node_count ...]
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_save import make_map  # noqa: E402
+from py_src.layout import compute_layout  # noqa: E402
+
+LAYOUTS = ("right-tree", "circle", "force")
+FORCE_ITERATIONS = 50
+
+
+def build_js_bench():
+    """
+    Bundle js_layout_bench.ts for node with vite's esbuild. Returns the
+    command to run it, or None (with the reason printed) when it cannot be built.
+    """
+    node = shutil.which("node")
+    esbuild = os.path.join(ROOT, "node_modules", ".bin", "esbuild.cmd" if os.name == "nt" else "esbuild")
+    if not node or not os.path.exists(esbuild):
+        print("JS layouts skipped: node or node_modules/.bin/esbuild not found (run npm install)")
+        return None
+    # node_modules の中に出力して、three などの外部パッケージを node が解決できるようにする
+    bundle = os.path.join(ROOT, "node_modules", ".cache", "bench", "js_layout_bench.mjs")
+    try:
+        result = subprocess.run(
+            [esbuild, os.path.join("benchmarks", "js_layout_bench.ts"), "--bundle", "--platform=node",
+             "--format=esm", "--packages=external", f"--outfile={bundle}", "--log-level=warning"],
+            cwd=ROOT, capture_output=True, text=True, timeout=120,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"JS layouts skipped: esbuild failed ({e})")
+        return None
+    if result.returncode != 0:
+        print(f"JS layouts skipped: esbuild failed\n{result.stderr}")
+        return None
+    return [node, bundle]
+
+
+def js_layout_ms(command, map_path, layout):
+    if layout == "force" or command is None:
+        return None
+    try:
+        result = subprocess.run(
+            command + [map_path, layout],
+            cwd=ROOT, capture_output=True, text=True, timeout=600,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return float(result.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return None
+
+
+def main(counts):
+    js_command = build_js_bench()
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            data = make_map(count)
+            map_path = os.path.join(tmp, f"map_{count}.json")
+            with open(map_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            for layout in LAYOUTS:
+                options = {"iterations": FORCE_ITERATIONS} if layout == "force" else None
+                best = float("inf")
+                for _ in range(1 if layout == "force" else 3):
+                    start = time.perf_counter()
+                    compute_layout(data, layout, options)
+                    best = min(best, time.perf_counter() - start)
+                js_ms = js_layout_ms(js_command, map_path, layout)
+                js_text = f"{js_ms:>10.1f}ms" if js_ms is not None else f"{'skipped':>12}"
+                print(f"nodes={count:>6} {layout:<10} numpy={best * 1000:>9.1f}ms js={js_text}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000, 50000])
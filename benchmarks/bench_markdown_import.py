@@ -0,0 +1,59 @@
+"""Markdown import timing for import_markdown_dialog-sized inputs.
+
+Generates a corpus of meeting-notes style Markdown (headings, nested and
+ordered lists, bold labels, fenced code) at 1k/10k/100k lines and times the
+streaming importer on each.
+
+Usage: python benchmarks/bench_markdown_import.py [line_count ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from py_src.markdown_import import parse_markdown_file  # noqa: E402
+
+
+def make_markdown(line_count, seed=0):
+    rnd = random.Random(seed)
+    lines = ["# 議事録"]
+    while len(lines) < line_count:
+        roll = rnd.random()
+        n = len(lines)
+        if roll < 0.03:
+            lines.append(f"## トピック {n}")
+        elif roll < 0.08:
+            lines.append(f"### 小見出し {n}")
+        elif roll < 0.10:
+            lines.append("")
+        elif roll < 0.12:
+            lines += ["```python", f"print({n})", "# comment, not a heading", "```"]
+        elif roll < 0.30:
+            lines.append(" " * rnd.choice((0, 3, 6)) + f"{rnd.randint(1, 9)}. 手順 {n}")
+        else:
+            indent = rnd.choice(("", "  ", "    ", "\t", "\t\t"))
+            text = rnd.choice((f"項目 {n}", f"**担当**: メンバー {n}", f"**決定事項 {n}**"))
+            lines.append(f"{indent}{rnd.choice('-*+')} {text}")
+    return "\n".join(lines[:line_count]) + "\n"
+
+
+def main(counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            path = os.path.join(tmp, f"notes_{count}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(make_markdown(count))
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                data = parse_markdown_file(path)
+                best = min(best, time.perf_counter() - start)
+            print(f"lines={count:>7} nodes={len(data['nodes']):>7} "
+                  f"{best * 1000:>8.1f}ms {best / count * 1e6:>6.2f}us/line")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,81 @@
+"""Node image batch: dedupe planning, cache hits and rendering.
+
+Builds N nodes where many share a look (same name / style / size / colors),
+then times:
+
+    plan (cold)   hashing every node and finding the missing keys
+    render        drawing the misses with the shared renderer (skipped when
+                  neither Playwright nor wkhtmltoimage is available)
+    plan (warm)   the same batch again: every key is a cache hit
+    gc            collecting after half of the looks are no longer used
+
+Usage: python benchmarks/bench_node_images.py [node_count] [distinct_looks]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from py_src.node_images import NodeImageCache, shared_renderer  # noqa: E402
+
+COLORS = ("#ffffff", "#ffe0e0", "#e0ffe0", "#e0e0ff", None)
+
+
+def make_nodes(node_count, looks, seed=0):
+    rnd = random.Random(seed)
+    styles = [
+        {
+            "name": f"課題 {i}",
+            "style_id": rnd.randint(1, 3),
+            "size_x": rnd.choice((300, 400)),
+            "size_y": 200,
+            "node_bg_color": rnd.choice(COLORS),
+        }
+        for i in range(looks)
+    ]
+    return [dict(rnd.choice(styles), id=i) for i in range(node_count)]
+
+
+def main(node_count, looks):
+    nodes = make_nodes(node_count, looks)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = NodeImageCache(cache_dir)
+        start = time.perf_counter()
+        keys, misses = cache.plan(nodes)
+        print(f"nodes={node_count} distinct={len(set(keys.values()))}")
+        print(f"  plan (cold)  {time.perf_counter() - start:>8.3f}s ({len(misses)} to render)")
+
+        try:
+            renderer = shared_renderer()
+        except RuntimeError as e:
+            print(f"  render       skipped ({e})")
+            for key in misses:
+                cache.store(key, b"\x89PNG\r\n\x1a\n")
+        else:
+            start = time.perf_counter()
+            rendered = cache.render(misses, renderer)
+            elapsed = time.perf_counter() - start
+            print(f"  render       {elapsed:>8.3f}s ({sum(rendered.values())} images, "
+                  f"{elapsed / max(len(misses), 1) * 1000:.1f}ms each, "
+                  f"{type(renderer).__name__})")
+
+        start = time.perf_counter()
+        _, misses = cache.plan(nodes)
+        print(f"  plan (warm)  {time.perf_counter() - start:>8.3f}s ({len(misses)} to render)")
+
+        distinct = list(dict.fromkeys(keys.values()))
+        start = time.perf_counter()
+        removed = cache.gc(distinct[: len(distinct) // 2], grace=0)
+        print(f"  gc           {time.perf_counter() - start:>8.3f}s ({removed} removed)")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 10000, int(args[1]) if len(args) > 1 else 500)
@@ -0,0 +1,119 @@
+"""OGP thumbnail fetching against a local stand-in HTTP server.
+
+Serves N pages (each with an og:image pointing at one of a few shared PNGs,
+ETag support on pages and images, and a fixed per-request latency) and times:
+
+    legacy       the old get_ogp_image: two serial requests.get per URL and
+                 a full BeautifulSoup parse
+    cold         OgpCache.get_many on an empty cache
+    warm         the same call again (fresh entries, no network)
+    revalidate   ttl=0, so every entry is revalidated and answered with 304s
+
+Usage: python benchmarks/bench_ogp.py [url_count] [latency_ms]
+"""
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from py_src.ogp_cache import OgpCache  # noqa: E402
+
+IMAGE_COUNT = 20
+
+
+def make_handler(latency):
+    images = {f"/img/{i}.png": b"\x89PNG\r\n\x1a\n" + os.urandom(20 * 1024) for i in range(IMAGE_COUNT)}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body, content_type):
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path.startswith("/page/"):
+                n = int(self.path.rsplit("/", 1)[1])
+                body = (
+                    "<html><head><title>page</title>"
+                    f'<meta property="og:image" content="/img/{n % IMAGE_COUNT}.png">'
+                    "</head><body>" + "<p>本文</p>" * 2000 + "</body></html>"
+                ).encode("utf-8")
+                self._send(body, "text/html; charset=utf-8")
+            elif self.path in images:
+                self._send(images[self.path], "image/png")
+            else:
+                self.send_error(404)
+
+    return Handler
+
+
+def legacy_fetch(url):
+    import base64
+    from urllib.parse import urljoin
+
+    import requests
+    from bs4 import BeautifulSoup
+
+    response = requests.get(url, timeout=10)
+    soup = BeautifulSoup(response.text, "html.parser")
+    og_image = soup.find("meta", property="og:image")
+    img_response = requests.get(urljoin(url, og_image.get("content")), timeout=10)
+    return base64.b64encode(img_response.content).decode("utf-8")
+
+
+def main(url_count, latency):
+    ThreadingHTTPServer.daemon_threads = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/page/{i}" for i in range(url_count)]
+    cache_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            legacy_fetch(url)
+        print(f"urls={url_count} latency={latency * 1000:.0f}ms")
+        print(f"  legacy      {time.perf_counter() - start:>8.3f}s")
+
+        cache = OgpCache(cache_dir)
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            result = cache.get_many(urls)
+            elapsed = time.perf_counter() - start
+            hits = sum(1 for entry in result.values() if entry)
+            print(f"  {label:<11} {elapsed:>8.3f}s ({hits} images)")
+
+        stale = OgpCache(cache_dir, ttl=0)
+        start = time.perf_counter()
+        stale.get_many(urls)
+        print(f"  revalidate  {time.perf_counter() - start:>8.3f}s")
+
+        objects = sum(len(files) for _, _, files in os.walk(os.path.join(cache_dir, "objects")))
+        print(f"  stored objects: {objects} (content-addressed, {IMAGE_COUNT} distinct images)")
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 200, (float(args[1]) if len(args) > 1 else 20.0) / 1000)
@@ -0,0 +1,71 @@
+"""Key filtering micro-benchmark: in-place deletion loop vs. frozenset projector.
+
+Usage: python benchmarks/bench_projection.py [node_count]
+"""
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from py_src.map_schema import project_graph  # noqa: E402
+
+LEGACY_NODE_KEYS = ["id", "name", "group", "x", "y", "z", "fx", "fy", "fz", "img", "icon_img", "style_id", "color", "index", "deadline", "priority", "urgency", "disabled", "type", "url", "file_path", "folder_path", "scale", "background", "size_x", "size_y", "rot_x", "rot_y", "groupId", "groupIds", "node_bg_color", "node_pattern_color", "groupShape", "groupColor", "collapsed"]
+
+
+def make_ui_payload(node_count):
+    """Nodes/links as the UI sends them, including force-graph runtime keys."""
+    nodes = []
+    for i in range(1, node_count + 1):
+        nodes.append({
+            "id": i, "name": f"node {i}", "group": 1, "style_id": 1, "type": "normal",
+            "x": float(i), "y": 0.0, "z": 0.0, "fx": float(i), "fy": 0.0, "fz": 0.0,
+            "size_x": 240, "size_y": 80, "index": i - 1,
+            "vx": 0.1, "vy": 0.2, "vz": 0.3, "__threeObj": None,
+            "_originalX": 0.0, "_originalY": 0.0, "_originalZ": 0.0,
+            "createdAt": "2024-01-01", "updatedAt": "2024-01-01",
+        })
+    links = [
+        {"index": i - 2, "source": nodes[i // 2 - 1], "target": nodes[i - 1], "name": "",
+         "__indexColor": "#000001", "__controlPoints": None, "__lineObj": None}
+        for i in range(2, node_count + 1)
+    ]
+    return {"nodes": nodes, "links": links}
+
+
+def legacy_filter(data):
+    for node in data["nodes"]:
+        for key in list(node.keys()):
+            if key not in LEGACY_NODE_KEYS:
+                del node[key]
+    for link in data["links"]:
+        for key in list(link.keys()):
+            if key not in ["source", "target", "index", "name"]:
+                del link[key]
+        if isinstance(link["source"], dict) and "id" in link["source"]:
+            link["source"] = link["source"]["id"]
+        if isinstance(link["target"], dict) and "id" in link["target"]:
+            link["target"] = link["target"]["id"]
+    return data
+
+
+def main(node_count):
+    payload = make_ui_payload(node_count)
+
+    legacy_input = copy.deepcopy(payload)  # the legacy loop mutates its input
+    start = time.perf_counter()
+    legacy = legacy_filter(legacy_input)
+    legacy_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    projected = project_graph(payload)
+    projected_ms = (time.perf_counter() - start) * 1000
+
+    assert projected == legacy
+    print(f"nodes={node_count} legacy={legacy_ms:.1f}ms projector={projected_ms:.1f}ms "
+          f"speedup={legacy_ms / projected_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
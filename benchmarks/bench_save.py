@@ -0,0 +1,77 @@
+"""Save latency vs. node count.
+
+Compares the previous save path (two indented debug dumps plus an in-place
+``json.dump``) with the streaming atomic writer in pretty and compact modes.
+
+Usage: python benchmarks/bench_save.py [node_count ...]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from py_src.map_writer import write_map  # noqa: E402
+
+
+def make_map(node_count, seed=0):
+    rnd = random.Random(seed)
+    nodes = []
+    for i in range(1, node_count + 1):
+        x, y, z = (rnd.uniform(-5000, 5000) for _ in range(3))
+        nodes.append({
+            "id": i,
+            "name": f"ノード {i}",
+            "group": 1,
+            "style_id": 1,
+            "type": "issue" if i == 1 else "normal",
+            "x": x, "y": y, "z": z,
+            "fx": x, "fy": y, "fz": z,
+            "size_x": 240,
+            "size_y": 80,
+            "index": i - 1,
+        })
+    links = [
+        {"index": i - 2, "source": rnd.randint(1, i - 1), "target": i, "name": ""}
+        for i in range(2, node_count + 1)
+    ]
+    return {"nodes": nodes, "links": links, "globalBackground": "space"}
+
+
+def legacy_save(data, path):
+    # The two debug prints were pure serialization cost (console I/O excluded here).
+    json.dumps(data, indent=2, ensure_ascii=False)
+    json.dumps(data, indent=2, ensure_ascii=False)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(counts):
+    print(f"{'nodes':>8} {'legacy ms':>10} {'stream ms':>10} {'compact ms':>11} {'pretty KB':>10} {'compact KB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "map.json")
+        for count in counts:
+            data = make_map(count)
+            legacy = best_of(lambda: legacy_save(data, path))
+            stream = best_of(lambda: write_map(data, path, compact=False))
+            pretty_size = os.path.getsize(path)
+            compact = best_of(lambda: write_map(data, path, compact=True))
+            compact_size = os.path.getsize(path)
+            print(f"{count:>8} {legacy:>10.1f} {stream:>10.1f} {compact:>11.1f} "
+                  f"{pretty_size / 1024:>10.0f} {compact_size / 1024:>11.0f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 5000, 20000, 50000])
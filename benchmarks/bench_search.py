@@ -0,0 +1,92 @@
+"""Node search latency: SearchIndex vs. the linear scan the Find modal does.
+
+Builds Japanese/English mixed node names at 100k nodes (by default), then
+times index build, an incremental sync after renaming 1% of the nodes, and
+per-query latency (median / p99) for substring, prefix and fuzzy queries
+next to a case-insensitive substring scan over every name.
+
+Usage: python benchmarks/bench_search.py [node_count ...]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from py_src.search_index import SearchIndex  # noqa: E402
+
+WORDS = (
+    "課題", "設計", "実装", "テスト", "レビュー", "仕様", "要件", "会議", "議事録", "担当",
+    "宇宙", "地図", "ノード", "リンク", "グループ", "検索", "保存", "読み込み", "画像", "配置",
+    "顧客", "営業", "開発", "品質", "予算", "期限", "リスク", "対策", "調査", "報告",
+    "SpaceMind", "Root", "Child", "API", "Python", "Eel", "layout", "export", "Markdown", "OPML",
+)
+
+
+def make_names(node_count, seed=0):
+    rnd = random.Random(seed)
+    return [
+        "".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 4))) + (f" {i}" if rnd.random() < 0.5 else "")
+        for i in range(node_count)
+    ]
+
+
+def make_queries(names, count, seed=1):
+    rnd = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rnd.choice(names)
+        start = rnd.randrange(len(name))
+        queries.append(name[start:start + rnd.randint(2, 5)])
+    return queries
+
+
+def timings(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples) * 1e3, samples[int(len(samples) * 0.99) - 1] * 1e3
+
+
+def main(counts):
+    for count in counts:
+        names = make_names(count)
+        nodes = [{"id": i, "name": name} for i, name in enumerate(names)]
+
+        start = time.perf_counter()
+        index = SearchIndex(nodes)
+        build = time.perf_counter() - start
+
+        renamed = [dict(node) for node in nodes]
+        for node in random.Random(2).sample(renamed, count // 100):
+            node["name"] += " 改"
+        start = time.perf_counter()
+        index.sync(renamed)
+        sync = time.perf_counter() - start
+
+        print(f"nodes={count:>7} build={build * 1000:>8.1f}ms sync(1% renamed)={sync * 1000:>7.1f}ms")
+        queries = make_queries(names, 500)
+        lowered = [name.lower() for name in names]
+
+        def linear(query):
+            q = query.lower()
+            return [i for i, name in enumerate(lowered) if q in name][:50]
+
+        rows = [
+            ("linear scan", linear),
+            ("substring", lambda q: index.search(q, 50)),
+            ("prefix", lambda q: index.search(q, 50, "prefix")),
+            ("fuzzy", lambda q: index.search(q, 50, "fuzzy")),
+        ]
+        for label, fn in rows:
+            median, p99 = timings(fn, queries)
+            print(f"  {label:<12} median={median:>8.3f}ms p99={p99:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100000])
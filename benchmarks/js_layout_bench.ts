@@ -0,0 +1,31 @@
+// Times the browser-side layouts on a map written by bench_layout.py.
+// bench_layout.py bundles it with esbuild (installed with vite) and runs: node <bundle.mjs> <map.json> <layout> [repeat]
+// Prints the best wall time in milliseconds.
+import { readFileSync } from 'fs';
+import { performance } from 'perf_hooks';
+import { executeTreeLayout } from '../web_src/layouts/TreeLayout';
+import { executeCircleLayout } from '../web_src/layouts/CircleLayout';
+
+const [, , mapPath, layout, repeatArg] = process.argv;
+const repeat = Number(repeatArg || 3);
+const source = JSON.parse(readFileSync(mapPath, 'utf-8'));
+
+let best = Infinity;
+for (let i = 0; i < repeat; i++) {
+    // force-graph はリンクの source/target をノードオブジェクトに置き換えるので、それに合わせる
+    const data = structuredClone(source);
+    const byId = new Map(data.nodes.map((node: any) => [node.id, node]));
+    data.links.forEach((link: any) => {
+        link.source = byId.get(link.source);
+        link.target = byId.get(link.target);
+    });
+
+    const start = performance.now();
+    if (layout === 'circle') {
+        executeCircleLayout(data);
+    } else {
+        executeTreeLayout(data, layout.replace('-tree', '') as any);
+    }
+    best = Math.min(best, performance.now() - start);
+}
+console.log(best.toFixed(1));
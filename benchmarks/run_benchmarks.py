@@ -0,0 +1,272 @@
+"""Benchmark harness for the Python backend with machine-readable results.
+
+Every case runs on synthetic maps (benchmarks/synthetic.py) at each requested
+size. The case's setup is untimed; the returned callable is timed *repeat*
+times and the minimum, median and mean are reported. Results are written as
+JSON (``--output``, default stdout) together with the Python version,
+platform and git commit, so runs can be kept and compared:
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --output base.json
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --compare base.json
+
+``--compare`` prints the change of each case's minimum against the baseline
+and exits with status 1 when any case got slower by more than
+``--threshold`` (default 20%).
+
+New engines register a case with ``@case("name")``: a function taking a
+``Context`` (the synthetic map, its JSON / .smind / Markdown files and a
+scratch directory) and returning the callable to time, or None to skip (a
+case whose optional dependency is missing is skipped too).
+
+Usage: python benchmarks/run_benchmarks.py [--sizes N ...] [--cases NAME ...]
+           [--repeat R] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import DEFAULT_DEPTH, DEFAULT_FANOUT, make_map, map_to_markdown  # noqa: E402
+
+FORMAT_VERSION = 1
+DEFAULT_SIZES = (1000, 10000, 50000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+
+CASES = {}
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+class Context:
+    def __init__(self, size, tmp, depth, fanout, groups):
+        self.size = size
+        self.tmp = tmp
+        self.data = make_map(size, depth=depth, fanout=fanout, groups=groups)
+        self.json_path = os.path.join(tmp, f"map_{size}.json")
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        self.markdown_path = os.path.join(tmp, f"map_{size}.md")
+        with open(self.markdown_path, "w", encoding="utf-8") as f:
+            f.write(map_to_markdown(self.data))
+        self._smind_path = None
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    @property
+    def smind_path(self):
+        if self._smind_path is None:
+            from py_src.smind_format import write_smind
+            self._smind_path = os.path.join(self.tmp, f"map_{self.size}.smind")
+            write_smind(self.data, self._smind_path)
+        return self._smind_path
+
+
+def _main_module():
+    # main.py は Eel を読み込むので、必要なケースだけで import する
+    import main
+    return main
+
+
+@case("read_json")
+def bench_read_json(ctx):
+    read_json = _main_module().read_json
+    return lambda: read_json(ctx.json_path)
+
+
+@case("read_json_smind")
+def bench_read_json_smind(ctx):
+    read_json = _main_module().read_json
+    path = ctx.smind_path
+    return lambda: read_json(path)
+
+
+@case("save_json")
+def bench_save_json(ctx):
+    save_json = _main_module().save_json
+    out = ctx.path("save.json")
+    return lambda: save_json(ctx.data, out)
+
+
+@case("save_json_smind")
+def bench_save_json_smind(ctx):
+    save_json = _main_module().save_json
+    out = ctx.path("save.smind")
+    return lambda: save_json(ctx.data, out)
+
+
+@case("parse_markdown")
+def bench_parse_markdown(ctx):
+    parse = _main_module().parse_markdown_to_mindmap
+    return lambda: parse(ctx.markdown_path)
+
+
+@case("recent_files")
+def bench_recent_files(ctx):
+    # 1 回の計測で size 件の touch と保存 1 回 (アプリでの開く操作のまとめ保存に相当)
+    from py_src.recent_files import RecentFiles
+    path = ctx.path("recent_files.json")
+    names = [ctx.path(f"map_{i % 50}.json") for i in range(ctx.size)]
+    meta = {"node_count": ctx.size, "link_count": ctx.size - 1, "title": "課題"}
+
+    def run():
+        recent = RecentFiles(path)
+        for name in names:
+            recent.touch(name, **meta)
+        recent.flush()
+        return recent.paths()
+    return run
+
+
+@case("repair_graph")
+def bench_repair_graph(ctx):
+    from py_src.graph_integrity import repair_graph
+    return lambda: repair_graph(ctx.data)
+
+
+@case("search_index")
+def bench_search_index(ctx):
+    from py_src.search_index import SearchIndex
+    nodes = ctx.data["nodes"]
+
+    def run():
+        index = SearchIndex(nodes)
+        for query in ("ノード 1", "課題", "99"):
+            index.search(query)
+    return run
+
+
+@case("subtree_index")
+def bench_subtree_index(ctx):
+    from py_src.graph_index import SubtreeIndex
+
+    def run():
+        index = SubtreeIndex(ctx.data)
+        return index.subtree(2)
+    return run
+
+
+@case("layout_tree")
+def bench_layout_tree(ctx):
+    from py_src.layout import compute_layout
+    return lambda: compute_layout(ctx.data, "right-tree")
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "repeat": repeat,
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(sizes, names, repeat, depth, fanout, groups):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            ctx = Context(size, tmp, depth, fanout, groups)
+            for name in names:
+                try:
+                    func = CASES[name](ctx)
+                except ImportError as e:
+                    print(f"{name:>16} {size:>8}  skipped ({e})", file=sys.stderr)
+                    continue
+                if func is None:
+                    print(f"{name:>16} {size:>8}  skipped", file=sys.stderr)
+                    continue
+                func()  # 初回の import やキャッシュの影響を除く
+                result = dict(case=name, nodes=size, **measure(func, repeat))
+                results.append(result)
+                print(f"{name:>16} {size:>8} {result['min_ms']:>10.1f}ms (median {result['median_ms']:.1f}ms)",
+                      file=sys.stderr)
+    return {
+        "version": FORMAT_VERSION,
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "shape": {"depth": depth, "fanout": fanout, "groups": groups},
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print the change against *baseline*; returns the regressed ``(case, nodes)`` keys."""
+    base = {(r["case"], r["nodes"]): r for r in baseline.get("results", [])}
+    regressed = []
+    for result in report["results"]:
+        key = (result["case"], result["nodes"])
+        old = base.get(key)
+        if old is None or not old["min_ms"]:
+            continue
+        change = result["min_ms"] / old["min_ms"] - 1
+        flag = ""
+        if change > threshold:
+            regressed.append(key)
+            flag = "  REGRESSION"
+        print(f"{key[0]:>16} {key[1]:>8} {old['min_ms']:>10.1f}ms -> {result['min_ms']:>10.1f}ms "
+              f"{change:>+7.1%}{flag}", file=sys.stderr)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--fanout", type=int, default=DEFAULT_FANOUT)
+    parser.add_argument("--groups", type=int, default=4)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.cases, args.repeat, args.depth, args.fanout, args.groups)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
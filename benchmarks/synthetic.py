@@ -0,0 +1,156 @@
+"""Synthetic maps (and Markdown of the same shape) for benchmarks.
+
+``make_map`` builds a tree of *node_count* nodes under one issue node. Nodes
+are filled breadth first, *fanout* children per parent, until *depth* is
+reached; after that the remaining nodes are attached to random parents above
+the last level, so the tree gets wider instead of deeper. With *groups* the
+last ``groups`` children of the root become group nodes (as an H2 does in the
+Markdown importer) and their subtrees carry the group fields.
+
+``map_to_markdown`` writes the same tree as headings and nested bullets, so
+importing it gives a map with the same node count, depth and fan-out.
+
+Usage: python benchmarks/synthetic.py out.json [--nodes N] [--depth D]
+           [--fanout F] [--groups G] [--seed S] [--markdown out.md]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from py_src.graph_index import GraphIndex  # noqa: E402
+from py_src.markdown_import import GROUP_COLORS  # noqa: E402
+
+DEFAULT_DEPTH = 8
+DEFAULT_FANOUT = 4
+
+
+def _tree(node_count, depth, fanout, rnd):
+    """Parent id of every node (None for the root) and each node's depth, indexed by id."""
+    parents = [None, None]  # 1 始まりの id で引く
+    depths = [0, 0]
+    open_parents = [1]  # まだ子を持てる (深さが上限未満の) ノード
+    expandable = [1]
+    child_count = {1: 0}
+    pos = 0
+    for node_id in range(2, node_count + 1):
+        while pos < len(open_parents) and child_count[open_parents[pos]] >= fanout:
+            pos += 1
+        if pos < len(open_parents):
+            parent = open_parents[pos]
+        else:
+            # 深さの上限に達したら、上限未満のノードにランダムに追加していく
+            parent = rnd.choice(expandable)
+        child_count[parent] += 1
+        parents.append(parent)
+        depths.append(depths[parent] + 1)
+        child_count[node_id] = 0
+        if depths[node_id] < depth:
+            open_parents.append(node_id)
+            expandable.append(node_id)
+    return parents, depths
+
+
+def make_map(node_count, depth=DEFAULT_DEPTH, fanout=DEFAULT_FANOUT, groups=0, seed=0):
+    rnd = random.Random(seed)
+    parents, _ = _tree(max(node_count, 1), max(depth, 1), max(fanout, 1), rnd)
+
+    root_children = [i for i in range(2, len(parents)) if parents[i] == 1]
+    group_roots = root_children[len(root_children) - groups:] if groups > 0 else []
+    group_of = {node_id: g for g, node_id in enumerate(group_roots, 1)}
+
+    nodes = []
+    for node_id in range(1, len(parents)):
+        x, y, z = (rnd.uniform(-5000, 5000) for _ in range(3))
+        node = {
+            "id": node_id,
+            "name": f"ノード {node_id}",
+            "group": 1,
+            "style_id": 1,
+            "type": "normal",
+            "x": x, "y": y, "z": z,
+            "fx": x, "fy": y, "fz": z,
+            "size_x": 240,
+            "size_y": 80,
+            "index": node_id - 1,
+        }
+        parent = parents[node_id]
+        if node_id not in group_of and parent is not None and parent in group_of:
+            group_of[node_id] = group_of[parent]
+        group_id = group_of.get(node_id)
+        if group_id is not None:
+            color_idx = (group_id - 1) % len(GROUP_COLORS)
+            node.update(groupId=group_id, groupIds=[group_id], color=GROUP_COLORS[color_idx],
+                        node_bg_color=color_idx, node_pattern_color=color_idx)
+            if node_id in group_roots:
+                node.update(type="group", style_id=4, groupShape="cloud", groupColor=GROUP_COLORS[color_idx])
+        nodes.append(node)
+    nodes[0].update(type="issue", name="課題", size_x=350, size_y=100)
+
+    links = [
+        {"index": node_id - 2, "source": parents[node_id], "target": node_id, "name": ""}
+        for node_id in range(2, len(parents))
+    ]
+    group_list = [
+        {"id": g, "name": f"ノード {node_id}", "color": GROUP_COLORS[(g - 1) % len(GROUP_COLORS)]}
+        for g, node_id in enumerate(group_roots, 1)
+    ]
+    return {
+        "nodes": nodes,
+        "links": links,
+        "groups": group_list,
+        "globalBackground": "space",
+        "layoutMode": "force",
+    }
+
+
+def map_to_markdown(data):
+    """
+    The map as Markdown: the issue node is the H1, group nodes are H2 and
+    everything else is a bullet nested two spaces per level.
+    """
+    index = GraphIndex(data)
+    lines = []
+    group_depth = None
+    for node_id, depth in index.walk():
+        node = index.by_id[node_id]
+        name = node.get("name", "")
+        if depth == 0:
+            lines.append(f"# {name}")
+        elif depth == 1 and node.get("type") == "group":
+            lines.append(f"## {name}")
+            group_depth = 1
+        else:
+            # H2 の下の箇条書きは H2 からの深さで字下げする
+            base = group_depth if group_depth is not None else 0
+            lines.append("  " * (depth - base - 1) + f"- {name}")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out")
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--fanout", type=int, default=DEFAULT_FANOUT)
+    parser.add_argument("--groups", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--markdown", help="also write the same tree as Markdown")
+    args = parser.parse_args(argv)
+
+    data = make_map(args.nodes, args.depth, args.fanout, args.groups, args.seed)
+    depth = max(d for _, d in GraphIndex(data).walk())
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(map_to_markdown(data))
+    print(f"nodes={len(data['nodes'])} links={len(data['links'])} "
+          f"depth={depth} groups={len(data['groups'])}")
+
+
+if __name__ == "__main__":
+    main()
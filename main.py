@@ -5,17 +5,26 @@ npm run build
 python -m eel main.py dist_vite --onefile --splash splashfile.png --path env/lib/site-packages --noconsole --name space-mind-windows-v0.1.0 --icon assets/app_icon.ico
 """
 
+from py_src.contrib import startup_profile
+import atexit
 import json
 import os
-import platform
-import random
 import sys
-import importlib
-import socket, errno
-from py_src.contrib.replace_in_file import replaceInfile, findFileRe
 from py_src.contrib.port_check import find_unused_port
+from py_src.map_writer import write_map
+from py_src.map_schema import project_graph
+from py_src.smind_format import is_smind_path, read_smind, write_smind
+from py_src.map_store import MapStore, DEFAULT_FETCH_LIMIT
+from py_src.markdown_import import parse_markdown_file
+from py_src.map_export import export_map, EXPORT_FORMATS
+from py_src.delta_store import DeltaStore, COMPACT_INTERVAL, journal_path_for
+from py_src.document_registry import DocumentRegistry
+from py_src.search_index import SearchIndex, DEFAULT_SEARCH_LIMIT
+from py_src.graph_index import SubtreeIndex
+from py_src.image_routes import register_image_routes, register_image_store, image_url
 import eel
-import subprocess
+
+startup_profile.mark('imports')
 
 # Windows用のタスクバー・タイトルバーアイコン適用対策 (AppUserModelIDの設定)
 if sys.platform.startswith('win'):
@@ -50,51 +59,218 @@ def get_resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
-g_current_file_path = None  # 現在開いているファイルのパスを保持
+g_documents = None  # 開いているマップ (パス・差分保存・インデックス) を文書 ID ごとに保持
+g_job_scheduler = None  # レイアウト・インポート・エクスポートを別プロセスで実行するスケジューラ
+g_ogp_cache = None  # OGP サムネイルのディスクキャッシュ
+g_node_images = None  # ノード画像のキャッシュ (内容のハッシュ名で保存)
+g_dialog_service = None  # ファイルダイアログを表示する常駐スレッド (Tk のルートを 1 つだけ持つ)
+g_document_cache = None  # 読み込んだマップのキャッシュ (ファイルが変わっていなければ再解析しない)
+g_recent_files = None  # 最近使用したファイルの一覧 (メモリ上で管理し、まとめて保存する)
+g_endpoint_metrics = None  # Eel の公開関数ごとの呼び出し回数・処理時間・データサイズ
+g_map_transfers = None  # マップを分割して送受信するセッション
+g_autosave = None  # 復旧用ディレクトリへの自動保存
 RECENT_FILES_PATH = os.path.expanduser("~/.space_mind_recent_files.json")
 
-def update_recent_files(path):
-    """最近使用したファイルのリストを更新する"""
-    try:
-        if os.path.exists(RECENT_FILES_PATH):
-            with open(RECENT_FILES_PATH, 'r', encoding='utf-8') as f:
-                recent_files = json.load(f)
-        else:
-            recent_files = []
-
-        # 既存のパスを削除
-        if path in recent_files:
-            recent_files.remove(path)
-
-        # 先頭に追加
-        recent_files.insert(0, path)
-
-        # 10件に制限
-        recent_files = recent_files[:10]
+def recent_files():
+    """最近使用したファイルの一覧を初回利用時に読み込む (以降はメモリ上で管理する)"""
+    global g_recent_files
+    if g_recent_files is None:
+        from py_src.recent_files import RecentFiles, LOCK_TIMEOUT
+        g_recent_files = RecentFiles(RECENT_FILES_PATH)
+        # 終了時はイベントループが止まっているので、他のインスタンスのロックを待ってよい
+        atexit.register(g_recent_files.flush, timeout=LOCK_TIMEOUT)
+    return g_recent_files
+
+def update_recent_files(path, data=None, **metadata):
+    """
+    最近使用したファイルのリストを更新する (保存は少し遅らせてまとめて行う)
 
-        with open(RECENT_FILES_PATH, 'w', encoding='utf-8') as f:
-            json.dump(recent_files, f, ensure_ascii=False, indent=2)
+    Args:
+        path: 開いたファイルのパス
+        data: 読み込んだマップ。渡した場合はノード数などをメニュー表示用に記録する
+        metadata: node_count / link_count / title を直接指定する場合
+    """
+    try:
+        if data is not None:
+            from py_src.recent_files import map_metadata
+            metadata = {**map_metadata(data), **metadata}
+        recent_files().touch(path, **metadata)
     except Exception as e:
         print(f"Error updating recent files: {e}")
 
 @eel.expose
 def get_recent_files():
     """最近使用したファイルのリストを取得する"""
-    if os.path.exists(RECENT_FILES_PATH):
-        with open(RECENT_FILES_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    return recent_files().paths()
+
+@eel.expose
+def get_recent_file_entries():
+    """
+    最近使用したファイルをメニュー表示用の情報付きで取得する (マップは開かない)
+
+    Returns:
+        list: 新しい順の {"path", "last_opened", "node_count", "link_count", "title"}
+    """
+    return recent_files().entries()
+
+def flush_recent_files_loop():
+    """最近使用したファイルの変更を一定時間ごとにまとめて保存する"""
+    from py_src.recent_files import DEBOUNCE
+
+    while True:
+        eel.sleep(DEBOUNCE)
+        try:
+            recent_files().maybe_flush()
+        except Exception as e:
+            print(f"Error saving recent files: {e}")
+
+def documents():
+    """開いているマップの一覧を初回利用時に作る (終了時に未反映の差分を書き戻す)"""
+    global g_documents
+    if g_documents is None:
+        g_documents = DocumentRegistry()
+        atexit.register(g_documents.close_all)
+    return g_documents
+
+def document(doc_id=None):
+    """doc_id のマップ。省略した場合は最後に開いたマップ (新規の未保存マップでは None)"""
+    if doc_id:
+        return documents().get(doc_id)
+    return documents().active
+
+def current_path(doc_id=None):
+    doc = document(doc_id)
+    return doc.path if doc is not None else None
+
+@eel.expose
+def get_open_documents():
+    """
+    開いているマップの一覧
+
+    Returns:
+        list: 最近使った順の {doc_id, path, dirty, repairs, view, memory, active}。
+              repairs は読み込み時に修復してまだ保存していない内容
+    """
+    return documents().infos()
+
+@eel.expose
+def activate_document(doc_id):
+    """文書 ID を省略した呼び出しの対象を doc_id のマップにする"""
+    doc = documents().get(doc_id)
+    if doc is None:
+        return False
+    documents().activate(doc)
+    return True
+
+@eel.expose
+def close_document(doc_id):
+    """マップを閉じる (未反映の差分はファイルに書き戻す)"""
+    return documents().close(doc_id)
 
 @eel.expose
 def load_json_by_path(path):
     """指定されたパスからJSONファイルを読み込む"""
-    global g_current_file_path
     if os.path.exists(path):
-        g_current_file_path = path
-        update_recent_files(path)
-        return load_json(path)
+        return open_document(path)
     return None
 
+def open_document(path):
+    """
+    path のマップを開いて以降の呼び出しの対象にし、(修復済みの) ドキュメントを返す。
+    既に開いていて、ファイルがその後変更されていなければ読み直さない
+    """
+    registry = documents()
+    doc = registry.open(path)
+    if doc.delta_store is not None and not doc.changed_on_disk():
+        data = doc.delta_store.document()
+        update_recent_files(path, data)
+        return data
+    doc.close()
+    data, repairs = repair_document(path, load_json(path))
+    update_recent_files(path, data)
+    data = open_delta_store(doc, data)
+    if repairs:
+        doc.repairs = repairs
+        eel.spawn(push_job_event, 'on_map_repaired', doc.doc_id, path, repairs)
+    registry.evict()
+    return data
+
+def ask_open_map_path():
+    """マップを開くファイル選択ダイアログを表示する。キャンセルした場合は空文字列"""
+    return dialog_service().ask(
+        'askopenfilename',
+        filetypes=[
+            ('JSON files', '*.json'),
+            ('SpaceMind binary files', '*.smind'),
+            ('All files', '*.*')
+        ]
+    )
+
+@eel.expose
+def open_map_view(path):
+    """
+    大規模マップをグラフ全体を返さずに開く
+
+    ファイルをメモリマップしてノード座標の空間インデックスを構築し、ノード数・範囲・
+    カメラなどのトップレベルの情報のみを返す。ノードとリンクは fetch_map_region /
+    fetch_map_neighborhood で表示範囲ごとに取得する。
+
+    Returns:
+        dict: doc_id, path, node_count, link_count, bounds, fields。ファイルがない場合は None
+    """
+    if not os.path.exists(path):
+        return None
+    registry = documents()
+    doc = registry.open(path)
+    doc.close()
+    if os.path.exists(journal_path_for(path)):
+        # 前回のセッションの未反映の差分を先にメインファイルへ書き戻す
+        open_delta_store(doc, load_json(path))
+        doc.close_delta_store()
+    doc.map_store = MapStore(path)
+    doc.synced()
+    summary = doc.map_store.summary()
+    summary['doc_id'] = doc.doc_id
+    update_recent_files(path, node_count=summary.get('node_count'), link_count=summary.get('link_count'))
+    registry.evict()
+    return summary
+
+@eel.expose
+def fetch_map_region(bbox, limit=DEFAULT_FETCH_LIMIT, known_ids=None, doc_id=None):
+    """
+    バウンディングボックス内のノードと、それらに接続するリンクを返す
+
+    Args:
+        bbox: {"min": {"x", "y", "z"}, "max": {"x", "y", "z"}}。省略した軸 (または bbox 全体) は範囲制限なし
+        limit: 返すノードの最大数
+        known_ids: フロントエンドが既に持っているノードの id (結果から除外する)
+        doc_id: 対象のマップ (省略した場合は最後に開いたマップ)
+
+    Returns:
+        dict: nodes, links, truncated (limit で打ち切られたかどうか)
+    """
+    doc = document(doc_id)
+    if doc is None or doc.map_store is None:
+        return None
+    return doc.map_store.fetch_box(bbox, limit=limit, known_ids=known_ids)
+
+@eel.expose
+def fetch_map_neighborhood(node_id, hops=1, limit=DEFAULT_FETCH_LIMIT, known_ids=None, doc_id=None):
+    """指定したノードから hops 以内のノードと、それらに接続するリンクを返す"""
+    doc = document(doc_id)
+    if doc is None or doc.map_store is None:
+        return None
+    return doc.map_store.fetch_neighborhood(node_id, hops=hops, limit=limit, known_ids=known_ids)
+
+def dialog_service():
+    """ファイルダイアログ用のスレッドを初回利用時に起動する"""
+    global g_dialog_service
+    if g_dialog_service is None:
+        from py_src.dialog_service import DialogService
+        g_dialog_service = DialogService()
+        atexit.register(g_dialog_service.close)
+    return g_dialog_service
+
 @eel.expose
 def select_folder():
     """
@@ -103,20 +279,9 @@ def select_folder():
     Returns:
         str: 選択されたフォルダのパス。キャンセルされた場合は空文字列
     """
-    import tkinter as tk
-    from tkinter import filedialog
-
-    # Create and configure main Tkinter window
-    root = tk.Tk()
-    root.withdraw()
-    
-    # Make it appear on top of other windows
-    root.attributes('-topmost', True)
-    root.lift()
-    
     # Show folder selection dialog
-    folder_path = filedialog.askdirectory(
-        parent=root,
+    folder_path = dialog_service().ask(
+        'askdirectory',
         title='フォルダを選択',
         mustexist=True
     )
@@ -131,20 +296,9 @@ def select_any_file():
     Returns:
         str: 選択されたファイルのパス。キャンセルされた場合は空文字列
     """
-    import tkinter as tk
-    from tkinter import filedialog
-
-    # Create and configure main Tkinter window
-    root = tk.Tk()
-    root.withdraw()
-    
-    # Make it appear on top of other windows
-    root.attributes('-topmost', True)
-    root.lift()
-    
     # Show file dialog and get selected file path
-    file_path = filedialog.askopenfilename(
-        parent=root,
+    file_path = dialog_service().ask(
+        'askopenfilename',
         title='ファイルを選択',
         filetypes=[('All files', '*.*')]
     )
@@ -153,49 +307,17 @@ def select_any_file():
 
 @eel.expose
 def select_file_dialog():
-    import tkinter as tk
-    from tkinter import filedialog
-
-    # Create and configure main Tkinter window
-    root = tk.Tk()
-    root.withdraw()
-    
-    # Make it appear on top of other windows
-    root.attributes('-topmost', True)
-    root.lift()
-    
     # Show file dialog and get selected file path
-    file_path = filedialog.askopenfilename(
-        parent=root,
-        filetypes=[
-            ('JSON files', '*.json'),
-            ('All files', '*.*')
-        ]
-    )
-    
+    file_path = ask_open_map_path()
     if file_path:
-        global g_current_file_path
-        g_current_file_path = file_path
-        update_recent_files(file_path)
-        return load_json(file_path)
+        return open_document(file_path)
     return None
 
 @eel.expose
 def import_markdown_dialog():
-    import tkinter as tk
-    from tkinter import filedialog
-
-    # Create and configure main Tkinter window
-    root = tk.Tk()
-    root.withdraw()
-    
-    # Make it appear on top of other windows
-    root.attributes('-topmost', True)
-    root.lift()
-    
     # Show file dialog and get selected file path
-    file_path = filedialog.askopenfilename(
-        parent=root,
+    file_path = dialog_service().ask(
+        'askopenfilename',
         filetypes=[
             ('Markdown files', '*.md'),
             ('All files', '*.*')
@@ -203,10 +325,8 @@ def import_markdown_dialog():
     )
     
     if file_path:
-        # インポートなので、g_current_file_path は None にリセットして
-        # 新規ファイル扱いとする。
-        global g_current_file_path
-        g_current_file_path = None
+        # インポートなので、開いているマップを対象から外して新規ファイル扱いとする。
+        documents().activate(None)
         data = load_json(file_path)
         return [data, file_path]
     return None
@@ -224,6 +344,9 @@ def open_file(file_path):
     """
     try:
         if os.path.exists(file_path.replace('/', os.sep).replace('\\', os.sep)):
+            import platform
+            import subprocess
+
             # OSに応じて適切なコマンドを使用
             if platform.system() == 'Windows':
                 os.startfile(file_path)
@@ -252,6 +375,9 @@ def open_folder(folder_path):
     """
     try:
         if os.path.exists(folder_path.replace('/', os.sep).replace('\\', os.sep)):
+            import platform
+            import subprocess
+
             # OSに応じて適切なコマンドを使用
             if platform.system() == 'Windows':
                 os.startfile(folder_path)
@@ -268,264 +394,29 @@ def open_folder(folder_path):
         return False
 
 def parse_markdown_to_mindmap(filepath):
-    import re
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-    except Exception as e:
-        print(f"Error reading markdown file: {e}")
-        return None
-        
-    nodes = []
-    links = []
-    groups = []
-    
-    # 階層スタック。各要素は (level, node_id, group_id)
-    stack = []
-    
-    node_id_counter = 1
-    link_id_counter = 0
-    group_id_counter = 1
-    
-    # フロントエンドの EMPHASIS_BG_COLORS と完全に同じカラーパレット
-    group_colors = [
-        '#2255aa', # 青系
-        '#226644', # 緑系
-        '#886600', # 黄系
-        '#aa4400', # 橙系
-        '#993366', # ピンク系
-        '#553399', # 紫系
-        '#444444'  # グレー系
-    ]
-    
-    current_h_level = 1
-    
-    for line_raw in lines:
-        line_clean = line_raw.strip()
-        if not line_clean:
-            continue
-            
-        if line_clean == "---" or line_clean == "***":
-            continue
-            
-        # 見出し判定
-        if line_clean.startswith("#"):
-            parts = line_clean.split(" ", 1)
-            hashes = parts[0]
-            if not all(c == "#" for c in hashes):
-                continue
-            h_len = len(hashes)
-            title = parts[1].strip() if len(parts) > 1 else ""
-            if not title:
-                continue
-                
-            current_h_level = h_len
-            level = h_len * 4
-            
-            node_id = node_id_counter
-            node_id_counter += 1
-            
-            node = {
-                "id": node_id,
-                "name": title,
-                "group": 1,
-                "style_id": 1,
-                "x": 0.0,
-                "y": 0.0,
-                "z": 0.0,
-                "fx": 0.0,
-                "fy": 0.0,
-                "fz": -300.0,
-                "type": "normal"
-            }
-            
-            if node_id == 1:
-                # 最初の見出し（ルート）は課題ノード
-                node["type"] = "issue"
-                node["size_x"] = 350
-                node["size_y"] = 100
-                nodes.append(node)
-                stack.append((level, node_id, None))
-                continue
-                
-            # 親を見つける
-            while stack and stack[-1][0] >= level:
-                stack.pop()
-                
-            parent_id = stack[-1][1] if stack else 1
-            parent_group_id = stack[-1][2] if stack else None
-            
-            current_group_id = parent_group_id
-            if h_len == 2:
-                # 新グループ
-                current_group_id = group_id_counter
-                group_id_counter += 1
-                color = group_colors[(current_group_id - 1) % len(group_colors)]
-                groups.append({
-                    "id": current_group_id,
-                    "name": title,
-                    "color": color
-                })
-                
-                # 新しいグループタイプのノード仕様に対応
-                node["type"] = "group"
-                node["groupShape"] = "cloud"
-                node["groupColor"] = color
-                
-            if current_group_id is not None:
-                color_idx = (current_group_id - 1) % len(group_colors)
-                node["groupId"] = current_group_id
-                node["groupIds"] = [current_group_id]
-                node["color"] = group_colors[color_idx]
-                node["node_bg_color"] = color_idx
-                node["node_pattern_color"] = color_idx
-                node["style_id"] = 4 if h_len == 2 else 1 # H2(グループのトップレベル)のみ強調スタイル、それ以外はノーマルスタイル
-                node["size_x"] = 240
-                node["size_y"] = 80
-            else:
-                node["size_x"] = 240
-                node["size_y"] = 80
-                
-            nodes.append(node)
-            
-            links.append({
-                "index": link_id_counter,
-                "source": parent_id,
-                "target": node_id,
-                "name": ""
-            })
-            link_id_counter += 1
-            
-            stack.append((level, node_id, current_group_id))
-            
-        # 箇条書きリスト判定
-        elif line_clean.startswith(("- ", "* ", "+ ")):
-            lspace = len(line_raw) - len(line_raw.lstrip())
-            text = line_clean[2:].strip()
-            
-            # 太字装飾 (**項目名**)
-            match_bold = re.match(r"\*\*(.*?)\*\*", text)
-            if match_bold:
-                text_clean = match_bold.group(1)
-                rest = text[match_bold.end():].strip()
-                if rest:
-                    if rest.startswith(":") or rest.startswith("："):
-                        rest = rest[1:].strip()
-                    text_clean = f"【{text_clean}】\n{rest}"
-            else:
-                text_clean = text
-                
-            if not text_clean:
-                continue
-                
-            level = (current_h_level * 4) + 4 + lspace
-            
-            while stack and stack[-1][0] >= level:
-                stack.pop()
-                
-            parent_id = stack[-1][1] if stack else 1
-            parent_group_id = stack[-1][2] if stack else None
-            
-            node_id = node_id_counter
-            node_id_counter += 1
-            
-            node = {
-                "id": node_id,
-                "name": text_clean,
-                "group": 1,
-                "style_id": 1,
-                "x": 0.0,
-                "y": 0.0,
-                "z": 0.0,
-                "fx": 0.0,
-                "fy": 0.0,
-                "fz": -300.0,
-                "type": "normal"
-            }
-            
-            if parent_group_id is not None:
-                color_idx = (parent_group_id - 1) % len(group_colors)
-                node["groupId"] = parent_group_id
-                node["groupIds"] = [parent_group_id]
-                node["color"] = group_colors[color_idx]
-                node["node_bg_color"] = color_idx
-                node["node_pattern_color"] = color_idx
-                node["style_id"] = 1 # 配下はノーマルスタイル(style_id=1)にする
-                node["size_x"] = 240
-                node["size_y"] = 80
-            else:
-                node["size_x"] = 240
-                node["size_y"] = 80
-                
-            nodes.append(node)
-            
-            links.append({
-                "index": link_id_counter,
-                "source": parent_id,
-                "target": node_id,
-                "name": ""
-            })
-            link_id_counter += 1
-            
-            stack.append((level, node_id, parent_group_id))
-            
-    if not nodes:
-        nodes = [{
-            "id": 1,
-            "name": "新規マインドマップ",
-            "group": 1,
-            "style_id": 1,
-            "x": 0.0, "y": 0.0, "z": 0.0,
-            "fx": 0.0, "fy": 0.0, "fz": -300.0,
-            "type": "issue"
-        }]
-        
-    return {
-        "nodes": nodes,
-        "links": links,
-        "groups": groups,
-        "globalBackground": "sky",
-        "layoutMode": "force"
-    }
+    # 行単位でストリーム処理する (見出し・箇条書き・番号付きリスト・コードブロックに対応)
+    return parse_markdown_file(filepath)
 
 def read_json(json_path):
     if json_path.lower().endswith('.md'):
         return parse_markdown_to_mindmap(json_path)
+    if is_smind_path(json_path):
+        return read_smind(json_path)
     with open(json_path, "r", encoding="utf-8") as f:
         node_data = json.load(f)
     return node_data
 
-def save_json(data, json_path):
-    print("--- Saving data to:", json_path)
-    print("--- Original data:", json.dumps(data, indent=2, ensure_ascii=False))
-    
-    # data["nodes"]の各要素のキーはid,name,group,x,y,color,index,fx,fyのみ、それ以外は削除
-    for node in data["nodes"]:
-        node_keys = list(node.keys())
-        for key in node_keys:
-            if key not in ["id","name","group","x","y","z","fx","fy","fz","img","icon_img","style_id","color","index","deadline","priority","urgency","disabled","type","url","file_path","folder_path","scale","background", "size_x", "size_y", "rot_x", "rot_y", "groupId", "groupIds", "node_bg_color", "node_pattern_color", "groupShape", "groupColor", "collapsed"]:
-                del node[key]
-
-    # data["links"]の各要素のキーはsource,target,__indexColor,index,__controlPointsのみ、それ以外は削除、ただしsource,targetはidに変換
-    for link in data["links"]:
-        link_keys = list(link.keys())
-        for key in link_keys:
-            if key not in ["source","target","index","name"]:
-                del link[key]
-
-        #source,targetをidに変換
-        #link["source"]がハッシュ配列型であるかつidキーがある場合のみ変換
-        if isinstance(link["source"], dict) and "id" in link["source"]:
-            link["source"] = link["source"]["id"]
-        #link["target"]がハッシュ配列型であるかつidキーがある場合のみ変換
-        if isinstance(link["target"], dict) and "id" in link["target"]:
-            link["target"] = link["target"]["id"]
-    
-    print("--- Cleaned data:", json.dumps(data, indent=2, ensure_ascii=False))
+def save_json(data, json_path, compact=None):
+    # ホワイトリストに含まれるキーだけで新しいノード/リンクを組み立てる (呼び出し元の data は変更しない)
+    # リンクの source/target がノードオブジェクトの場合は同じパスで id に変換される
+    data = project_graph(data)
 
     try:
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 一時ファイルへストリーム書き込みしてからリネームする (途中でクラッシュしても元ファイルは壊れない)
+        if is_smind_path(json_path):
+            write_smind(data, json_path)
+        else:
+            write_map(data, json_path, compact=compact)
         return True
     except Exception as e:
         print(f"--- Error saving file: {e}")
@@ -574,11 +465,30 @@ def say_hello_py(x):
     # eel.say_hello_js('') # JavaScript側で未定義のため無効化
     pass
 
+def document_cache():
+    """読み込んだマップのキャッシュを初回利用時に作る"""
+    global g_document_cache
+    if g_document_cache is None:
+        from py_src.document_cache import DocumentCache
+        g_document_cache = DocumentCache(read_json)
+        atexit.register(g_document_cache.close)
+    return g_document_cache
+
 @eel.expose
 def load_json(path):
-    node_data = read_json(path)
+    # 同じファイルを開き直したときは、変更がなければ解析済みのドキュメントを返す
+    node_data = document_cache().get(path)
     return node_data
 
+def warm_recent_document():
+    """最後に開いたマップを起動中に別スレッドで読み込んでおく"""
+    try:
+        recent_files = get_recent_files()
+    except Exception:
+        return
+    if recent_files and os.path.exists(recent_files[0]):
+        document_cache().warm(recent_files[0])
+
 @eel.expose
 def load_data(node_data):
     return node_data
@@ -586,112 +496,852 @@ def load_data(node_data):
 
 
 @eel.expose
-def save_data(data):
-    """現在のファイルパスにデータを保存する"""
-    global g_current_file_path
+def save_data(data, doc_id=None):
+    """マップのファイルパスにデータを保存する (doc_id を省略した場合は最後に開いたマップ)"""
+    doc = document(doc_id)
 
-    if g_current_file_path:
+    if doc is not None and doc.path:
         # Markdownファイル（.md）としてロードされた状態で保存された場合は、マニュアルファイルを上書きしないよう拡張子を.jsonに変更する
-        if g_current_file_path.lower().endswith('.md'):
-            g_current_file_path = os.path.splitext(g_current_file_path)[0] + '.json'
+        if doc.path.lower().endswith('.md'):
+            documents().rename(doc, os.path.splitext(doc.path)[0] + '.json')
             
-        print(f"--- g_current_file_path in save_data: {g_current_file_path}")
-        if save_json(data, g_current_file_path):
-            return [True, g_current_file_path]
+        print(f"--- file path in save_data: {doc.path}")
+        if save_json(data, doc.path):
+            open_delta_store(doc, data)
+            autosave_saved(doc)
+            return [True, doc.path]
         else:
             return [False, None]
     else:
-        return save_as_data(data)
+        return save_as_data(data, doc_id)
 
 @eel.expose
-def save_as_data(data):
-    global g_current_file_path
-    import tkinter as tk
-    from tkinter import filedialog
-
+def save_as_data(data, doc_id=None):
     # 保存ダイアログを表示
-    root = tk.Tk()
-    root.withdraw()
-    root.attributes('-topmost', True)
-    root.lift()
-    
-    file_path = filedialog.asksaveasfilename(
-        parent=root,
+    file_path = dialog_service().ask(
+        'asksaveasfilename',
         defaultextension='.json',
-        filetypes=[('JSON files', '*.json'), ('All files', '*.*')]
+        filetypes=[('JSON files', '*.json'), ('SpaceMind binary files', '*.smind'), ('All files', '*.*')]
     )
     
     if file_path:
-        g_current_file_path = file_path
-        save_json(data, file_path)
+        registry = documents()
+        doc = document(doc_id)
+        if doc is None:
+            doc = registry.open(file_path)
+        else:
+            # 同じ文書 ID のまま新しいパスのマップになる
+            registry.rename(doc, file_path)
+            registry.activate(doc)
+        if save_json(data, file_path):
+            open_delta_store(doc, data)
+            autosave_saved(doc)
         return [True, file_path]
     return [False, None]
 
+def map_transfers():
+    global g_map_transfers
+    if g_map_transfers is None:
+        from py_src.map_transfer import TransferSessions
+        g_map_transfers = TransferSessions()
+    return g_map_transfers
+
+@eel.expose
+def start_load_transfer(path=None, chunk_size=None):
+    """
+    マップを開き、ノード・リンクを分割して受け取るためのセッションを作る (大きなマップを 1 つのメッセージで送らない)
+
+    Args:
+        path: 開くファイルのパス。省略した場合はファイル選択ダイアログを表示する
+        chunk_size: 1 チャンクあたりのノード/リンク数
+
+    Returns:
+        dict: session, doc_id, path, fields (nodes/links 以外のトップレベルの値), node_count, link_count, chunk_count, chunk_size。
+              キャンセルした場合やファイルがない場合は None。チャンクは fetch_transfer_chunk で順に取得する
+    """
+    from py_src.map_transfer import DEFAULT_CHUNK_ITEMS
+
+    if not path:
+        path = ask_open_map_path()
+    if not path or not os.path.exists(path):
+        return None
+    data = open_document(path)
+    if data is None:
+        return None
+    header = map_transfers().open_download(data, chunk_size or DEFAULT_CHUNK_ITEMS)
+    header['path'] = path
+    header['doc_id'] = documents().active.doc_id
+    return header
+
+@eel.expose
+def fetch_transfer_chunk(session, seq):
+    """
+    読み込みセッションの seq 番目のチャンクを返す (ノードのチャンクが先、リンクのチャンクが後)
+
+    Returns:
+        dict: seq, nodes, links, last。セッションが無い・範囲外の場合は None
+    """
+    return map_transfers().chunk(session, seq)
+
+@eel.expose
+def start_save_transfer(fields=None):
+    """分割して保存するセッションを作る。fields は nodes/links 以外のトップレベルの値"""
+    return map_transfers().open_upload(fields)
+
+@eel.expose
+def push_transfer_chunk(session, seq, nodes=None, links=None):
+    """保存セッションに seq 番目のチャンクを追加する。受け取ったチャンク数 (セッションが無い場合は None) を返す"""
+    return map_transfers().push(session, seq, nodes, links)
+
+@eel.expose
+def finish_save_transfer(session, chunk_count, save_as=False, doc_id=None):
+    """
+    受け取ったチャンクをつなげて save_data / save_as_data と同じように保存する
+
+    Returns:
+        list: [成功したかどうか, 保存先パス]。チャンクが欠けている場合は [False, None]
+              (セッションは残るので、欠けたチャンクを送り直せる)
+    """
+    data = map_transfers().finish_upload(session, chunk_count)
+    if data is None:
+        return [False, None]
+    return save_as_data(data, doc_id) if save_as else save_data(data, doc_id)
+
+@eel.expose
+def close_transfer(session):
+    """転送セッションを破棄する (読み込みでは最後のチャンクを受け取った後に呼ぶ)"""
+    map_transfers().close(session)
+
+def autosave():
+    global g_autosave
+    if g_autosave is None:
+        from py_src.autosave import Autosave
+        g_autosave = Autosave()
+        atexit.register(autosave_at_exit)
+    return g_autosave
+
+def autosave_session():
+    """現在のマップの自動保存セッション。無ければ現在のファイルを基準に作る (未保存のマップでは None)"""
+    store = autosave()
+    session = store.session
+    path = current_path()
+    if session is not None and session.source_path == path:
+        return session
+    if not path:
+        return None
+    base = current_document()
+    if base is None:
+        return None
+    flush_autosave(force=True)
+    return store.begin(base, path)
+
+def flush_autosave(force=False):
+    """まとめた変更が書き込み時期になっていれば自動保存のスレッドで書き込む"""
+    store = autosave()
+    job = store.due(force)
+    if job is None:
+        return
+    session, delta = job
+    try:
+        store.charge(store.run(session.write, delta))
+    except Exception as e:
+        print(f"--- Error writing autosave: {e}")
+
+def autosave_loop():
+    """一定時間ごとに自動保存の書き込み時期を確認する"""
+    while True:
+        eel.sleep(1.0)
+        if g_autosave is not None:
+            flush_autosave()
+
+def autosave_at_exit():
+    """終了時に未書き込みの変更を書き込む (イベントループは止まっているのでこのスレッドで書く)"""
+    job = g_autosave.due(force=True)
+    if job is not None:
+        try:
+            job[0].write(job[1])
+        except Exception as e:
+            print(f"--- Error writing autosave: {e}")
+
+@eel.expose
+def autosave_delta(delta):
+    """
+    編集の差分を自動保存する。差分はメモリ上でまとめ、編集が止まってから (または一定時間ごとに) 追記する。
+    リンクは index ではなく autosave.link_identities のキーで指定する
+
+    Returns:
+        bool: 受け付けたかどうか。未保存のマップで基準がない場合は False
+              (マップ全体を start_save_transfer / push_transfer_chunk / finish_autosave_transfer で送る)
+    """
+    if autosave_session() is None:
+        return False
+    return autosave().record(delta)
+
+@eel.expose
+def autosave_document(data):
+    """
+    マップ全体を受け取り、前回の自動保存との差分だけを自動保存する (差分の計算は自動保存のスレッドで行う)。
+    未保存のマップは最初の 1 回だけ全体を書き出す。
+    UI が送るのは autosave_delta を受け付けられない (未保存のマップの) ときだけで、
+    大きなマップは finish_autosave_transfer を通して分割して送る
+    """
+    store = autosave()
+    session = autosave_session()
+    try:
+        if session is None:
+            if store.session is None or store.session.source_path is not None:
+                flush_autosave(force=True)
+                session = store.begin(data)
+                store.charge(store.run(session.snapshot))
+                return True
+            session = store.session
+        delta = store.run(session.store.diff, data)
+        session.coalescer.replace(delta)
+        return True
+    except Exception as e:
+        print(f"--- Error autosaving: {e}")
+        return False
+
+@eel.expose
+def finish_autosave_transfer(session, chunk_count):
+    """
+    受け取ったチャンクをつなげて autosave_document と同じように自動保存する
+
+    Returns:
+        bool: 受け付けたかどうか。チャンクが欠けている場合は False
+    """
+    data = map_transfers().finish_upload(session, chunk_count)
+    if data is None:
+        return False
+    return autosave_document(data)
+
+def autosave_saved(doc):
+    """doc をファイルに保存できたので、それが自動保存しているマップならセッションを削除する"""
+    if g_autosave is not None and doc is documents().active:
+        g_autosave.discard()
+
+@eel.expose
+def get_recovery_sessions():
+    """
+    前回までに自動保存されたまま保存されていないマップの一覧
+
+    Returns:
+        list: 新しい順の {key, source_path, source_changed, title, node_count, updated_at}
+    """
+    return autosave().sessions()
+
+@eel.expose
+def recover_session(key):
+    """
+    自動保存されたマップを復元して返す。元のファイルがあればそれを現在のファイルにする
+    (復元した内容はまだファイルに保存されていないので、新しい自動保存セッションに引き継ぐ)
+    """
+    store = autosave()
+    meta = next((m for m in store.sessions() if m['key'] == key), None)
+    if meta is None:
+        return None
+    try:
+        data = store.run(store.recover, key, read_json)
+    except Exception as e:
+        print(f"--- Error recovering autosave {key}: {e}")
+        return None
+    if data is None:
+        return None
+    source_path = meta.get('source_path')
+    if source_path and os.path.exists(source_path):
+        # 復元した内容はファイルと異なるので、保存するまで差分保存しない
+        documents().open(source_path).close()
+    else:
+        documents().activate(None)
+    path = current_path()
+    flush_autosave(force=True)
+    session = store.begin(data, path)
+    store.charge(store.run(session.snapshot))
+    store.discard_key(key)
+    return {'path': path, 'data': data}
+
+@eel.expose
+def discard_recovery_session(key):
+    autosave().discard_key(key)
+    return True
+
+def offer_recovery():
+    """復旧できる自動保存があればフロントエンドに通知する (on_recovery_available)"""
+    try:
+        sessions = autosave().sessions()
+    except Exception as e:
+        print(f"--- Error listing autosave sessions: {e}")
+        return
+    if sessions:
+        push_job_event('on_recovery_available', sessions)
+
+def open_delta_store(doc, data):
+    """
+    doc の差分保存の基準となるドキュメントを設定する
+
+    前回のセッションのジャーナルが残っていれば適用してから返す。
+    JSON/.smind 以外のファイル（Markdownなど）は差分保存の対象外。
+    """
+    path = doc.path
+    doc.adjacency = None
+    doc.subtree_index = None
+    doc.repairs = None
+    if doc.delta_store is not None:
+        doc.delta_store.reset(data)
+        doc.synced()
+        return index_document(doc, data)
+
+    if data is None or not (path.lower().endswith('.json') or is_smind_path(path)):
+        doc.synced()
+        return index_document(doc, data)
+
+    doc.delta_store = DeltaStore(path, data, writer=doc.track_writes(save_json))
+    doc.synced()
+    try:
+        if doc.delta_store.replay_journal():
+            print(f"--- Recovered unsaved changes from {doc.delta_store.journal_path}")
+            return index_document(doc, doc.delta_store.document())
+    except Exception as e:
+        print(f"--- Error replaying journal: {e}")
+    return index_document(doc, data)
+
+def repair_document(path, data):
+    """
+    読み込んだマップのリンク切れ・重複した id・古いリンクの index をメモリ上で修復する
+
+    フロントエンド (d3) はリンクの index を配列の位置に振り直し、差分保存もその index で届くので、
+    差分保存の基準 (open_delta_store) には修復後のドキュメントを渡す。
+    ファイルには書き込まない (ユーザーが保存したときに修復後の内容が保存される)。
+    修復は決まった結果になるので、前回のジャーナルは次に読み込んだときの修復後のドキュメントにそのまま適用できる
+
+    Returns:
+        tuple: (修復後のドキュメント, 修復した内容。修復が不要なら None)
+    """
+    from py_src.graph_integrity import repair_graph
+
+    if data is None:
+        return None, None
+    repaired, report = repair_graph(data)
+    if repaired is data:
+        return data, None
+    report = {k: v for k, v in report.items() if v}
+    print(f"--- Repaired {path} in memory: " + ", ".join(f"{k}={v}" for k, v in report.items()))
+    return repaired, report
+
+@eel.expose
+def get_graph_adjacency(doc_id=None):
+    """
+    マップの隣接リストを返す (ノードの位置で参照する。フロントエンドでリンクを走査せずに使える)
+
+    Returns:
+        dict: node_ids, children, parents, links。マップを開いていない場合は None
+    """
+    from py_src.graph_integrity import adjacency_payload
+
+    doc = document(doc_id)
+    if doc is None:
+        return None
+    if doc.adjacency is None:
+        data = current_document(doc_id)
+        if data is None:
+            return None
+        doc.adjacency = adjacency_payload(data)
+    return doc.adjacency
+
+def editable_store(doc_id=None):
+    """マップの (doc, DeltaStore)。差分保存できないマップ (未保存・Markdown など) では (doc, None)"""
+    doc = document(doc_id)
+    if doc is None:
+        return None, None
+    if doc.delta_store is None and doc.map_store is not None:
+        # open_map_view で開いた場合は最初の差分保存時に基準ドキュメントを作る
+        open_delta_store(doc, doc.map_store.document())
+    return doc, doc.delta_store
+
+@eel.expose
+def save_delta(delta, doc_id=None):
+    """
+    変更差分のみをマップのファイルに保存する
+
+    Args:
+        delta: nodes/links の added・modified・removed と fields を持つ差分
+        doc_id: 対象のマップ (省略した場合は最後に開いたマップ)
+
+    Returns:
+        list: [成功したかどうか, 保存先パス]。差分保存できない場合は [False, None] を返すので
+              呼び出し側は save_data にフォールバックする
+
+    (現在の UI はまだ使っておらず、保存は save_data / 分割転送でマップ全体を送る)
+    """
+    doc, store = editable_store(doc_id)
+    if store is None:
+        return [False, None]
+    try:
+        store.apply(delta)
+        doc.adjacency = None
+        if doc.search_index is not None:
+            doc.search_index.apply_delta(delta)
+        if doc.subtree_index is not None:
+            doc.subtree_index.apply_delta(delta)
+        return [True, doc.path]
+    except Exception as e:
+        print(f"--- Error saving delta: {e}")
+        return [False, None]
+
+def subtree_index(doc_id=None):
+    """マップの (DeltaStore, SubtreeIndex)。初回だけドキュメント全体から作り、以降は差分保存で更新する"""
+    doc, store = editable_store(doc_id)
+    if store is None:
+        return None, None
+    if doc.subtree_index is None:
+        doc.subtree_index = SubtreeIndex(store.document(), path=store.path)
+    return store, doc.subtree_index
+
+@eel.expose
+def get_subtree(node_id, doc_id=None):
+    """
+    ノードとその子孫のノード id・リンク index を返す (折りたたみ・コピー/切り取りに使う)
+
+    Returns:
+        dict: {"node_ids": [...], "link_indexes": [...]}。マップを差分保存できない場合は None
+    """
+    _, index = subtree_index(doc_id)
+    if index is None:
+        return None
+    node_ids, link_indexes = index.subtree(node_id)
+    return {"node_ids": node_ids, "link_indexes": link_indexes}
+
+@eel.expose
+def get_hidden_nodes(doc_id=None):
+    """折りたたまれたノードの下にあって表示しないノードの id のリストを返す"""
+    _, index = subtree_index(doc_id)
+    if index is None:
+        return None
+    return list(index.hidden_nodes())
+
+@eel.expose
+def extract_subtree(node_id, out_path=None, doc_id=None):
+    """
+    ノードとその子孫を新しいマップファイルに書き出す (元のマップは変更しない)
+
+    Args:
+        node_id: 部分木の根になるノードの id
+        out_path: 出力先パス。省略した場合は保存ダイアログを表示する
+
+    Returns:
+        list: [成功したかどうか, 出力先パス]
+    """
+    store, index = subtree_index(doc_id)
+    if index is None or node_id not in index:
+        return [False, None]
+    if not out_path:
+        out_path = dialog_service().ask(
+            'asksaveasfilename',
+            defaultextension='.json',
+            filetypes=[('JSON files', '*.json'), ('SpaceMind binary files', '*.smind'), ('All files', '*.*')]
+        )
+        if not out_path:
+            return [False, None]
+    node_ids, link_indexes = index.subtree(node_id)
+    nodes = [store.node(i) for i in node_ids]
+    # 新しいファイルではリンクの index を配列の位置に振り直す
+    links = [dict(store.link(i), index=position) for position, i in enumerate(link_indexes)]
+    if not save_json({"nodes": nodes, "links": links}, out_path):
+        return [False, None]
+    return [True, out_path]
+
+@eel.expose
+def reparent_node(node_id, new_parent_id, doc_id=None):
+    """
+    ノードを子孫ごと別の親の下へ移動する (現在の親へのリンクを削除し、新しい親からのリンクを追加する)
+
+    Returns:
+        list: [成功したかどうか, 適用した差分]。循環する移動や存在しないノードの場合は [False, None]
+    """
+    _, index = subtree_index(doc_id)
+    if index is None:
+        return [False, None]
+    delta = index.reparent_delta(node_id, new_parent_id)
+    if delta is None:
+        return [False, None]
+    ok, _ = save_delta(delta, doc_id)
+    return [ok, delta if ok else None]
+
+def refresh_search_index(doc, data):
+    """検索インデックスを作成する。同じファイルなら変更のあったノードだけを更新する"""
+    if data is None:
+        return
+    if doc.search_index is not None and doc.search_index.path == doc.path:
+        doc.search_index.sync(data.get('nodes', []))
+    else:
+        doc.search_index = SearchIndex(data.get('nodes', []), path=doc.path)
+
+def index_document(doc, data):
+    """読み込み・保存の応答を返した後で検索インデックスを更新する"""
+    if data is not None:
+        eel.spawn(refresh_search_index, doc, data)
+    return data
+
+@eel.expose
+def search_nodes(query, limit=DEFAULT_SEARCH_LIMIT, mode='substring', doc_id=None):
+    """
+    ノード名を検索する
+
+    Args:
+        query: 検索文字列 (全角/半角・大文字/小文字を区別しない)
+        limit: 返す件数の上限
+        mode: 'substring' (部分一致) / 'prefix' (前方一致) / 'fuzzy' (あいまい検索)
+
+    Returns:
+        list: 順位順の [{"id", "name"}]。インデックスを作れない場合 (未保存のマップなど) は None
+    """
+    doc = document(doc_id)
+    if doc is None:
+        return None
+    if doc.search_index is None or doc.search_index.path != doc.path:
+        data = current_document(doc_id)
+        if data is None:
+            return None
+        refresh_search_index(doc, data)
+    try:
+        return doc.search_index.search(query, limit, mode)
+    except ValueError as e:
+        print(f"--- Error searching nodes: {e}")
+        return None
+
+def compact_journal_loop():
+    """一定時間ごとにジャーナルをメインファイルへ書き戻し、使われていないマップを閉じる"""
+    while True:
+        eel.sleep(COMPACT_INTERVAL)
+        if g_documents is None:
+            continue
+        for doc in g_documents:
+            if doc.delta_store is not None:
+                try:
+                    doc.delta_store.maybe_compact()
+                except Exception as e:
+                    print(f"--- Error compacting journal: {e}")
+        g_documents.evict()
+
+def current_document(doc_id=None):
+    """マップのドキュメント (未反映の差分を含む)。開いていなければ None"""
+    doc = document(doc_id)
+    if doc is None:
+        return None
+    if doc.delta_store is not None:
+        return doc.delta_store.document()
+    if doc.map_store is not None:
+        return doc.map_store.document()
+    if doc.path and os.path.exists(doc.path):
+        return read_json(doc.path)
+    return None
+
+@eel.expose
+def export_map_file(fmt, out_path=None, doc_id=None):
+    """
+    現在のマップを Markdown / OPML / CSV(エッジリスト) に書き出す
+
+    Args:
+        fmt: 'md' / 'opml' / 'csv'
+        out_path: 出力先パス。省略した場合は保存ダイアログを表示する
+
+    Returns:
+        list: [成功したかどうか, 出力先パス]
+    """
+    if fmt not in EXPORT_FORMATS:
+        return [False, None]
+    data = current_document(doc_id)
+    if data is None:
+        return [False, None]
+
+    if not out_path:
+        labels = {'md': 'Markdown files', 'opml': 'OPML files', 'csv': 'CSV files'}
+        out_path = dialog_service().ask(
+            'asksaveasfilename',
+            defaultextension='.' + fmt,
+            filetypes=[(labels[fmt], '*.' + fmt), ('All files', '*.*')]
+        )
+        if not out_path:
+            return [False, None]
+
+    try:
+        export_map(data, out_path, fmt)
+        return [True, out_path]
+    except Exception as e:
+        print(f"--- Error exporting map: {e}")
+        return [False, None]
+
+@eel.expose
+def compute_layout(layout, options=None, data=None, doc_id=None):
+    """
+    ノード配置を Python 側 (NumPy) で計算する
+
+    Args:
+        layout: 'right-tree' / 'left-tree' / 'upper-tree' / 'lower-tree' / 'circle' / 'force'
+        options: z_layer, selected_ids, root_id, iterations などのオプション
+        data: 配置対象のマップ。省略した場合は現在のマップを使う
+
+    Returns:
+        list: [成功したかどうか, {"ids", "fx", "fy", "fz"}]
+    """
+    # NumPy の読み込みは起動時間に響くので、初めて使うときに読み込む
+    from py_src.layout import compute_layout as run_layout
+
+    if data is None:
+        data = current_document(doc_id)
+    if data is None:
+        return [False, None]
+    try:
+        return [True, run_layout(data, layout, options)]
+    except Exception as e:
+        print(f"--- Error computing layout: {e}")
+        return [False, None]
+
+def push_job_event(name, *args):
+    """フロントエンドが公開している JS 関数 (on_job_progress / on_job_done) を呼ぶ"""
+    js_function = getattr(eel, name, None)
+    if js_function is None:
+        return
+    try:
+        js_function(*args)
+    except Exception as e:
+        print(f"--- Error pushing {name}: {e}")
+
+def job_scheduler():
+    """ジョブスケジューラを初回利用時に起動する"""
+    global g_job_scheduler
+    if g_job_scheduler is None:
+        from py_src.job_pool import JobScheduler
+
+        g_job_scheduler = JobScheduler(
+            on_progress=lambda info, partial: push_job_event('on_job_progress', info, partial),
+            on_done=lambda info, result: push_job_event('on_job_done', info, result),
+        )
+        eel.spawn(g_job_scheduler.run, eel.sleep)
+        atexit.register(g_job_scheduler.shutdown)
+    return g_job_scheduler
+
+@eel.expose
+def start_layout_job(layout, options=None, data=None, doc_id=None):
+    """
+    compute_layout を別プロセスで実行し、すぐにジョブ ID を返す。
+    同じマップで実行中のレイアウトは、同じ条件なら再利用し、異なる条件なら取り消す
+
+    Returns:
+        list: [成功したかどうか, ジョブID]
+    """
+    from py_src.job_pool import layout_job
+
+    if data is None:
+        data = current_document(doc_id)
+    if data is None:
+        return [False, None]
+    signature = json.dumps([layout, options], sort_keys=True, default=str)
+    job_id = job_scheduler().submit('layout', current_path(doc_id), layout_job, data, layout, options,
+                                    signature=signature)
+    return [True, job_id]
+
+@eel.expose
+def start_import_markdown_job(file_path):
+    """
+    Markdown の取り込みを別プロセスで実行する。結果は on_job_done で [data, file_path] として届く
+
+    Returns:
+        list: [成功したかどうか, ジョブID]
+    """
+    from py_src.job_pool import import_markdown_job
+
+    if not file_path or not os.path.exists(file_path):
+        return [False, None]
+
+    def on_result(data):
+        # import_markdown_dialog と同じく、取り込んだマップは新規ファイル扱いとする
+        if data is not None:
+            documents().activate(None)
+
+    job_id = job_scheduler().submit('import', file_path, import_markdown_job, file_path,
+                                    signature=file_path, on_result=on_result)
+    return [True, job_id]
+
+@eel.expose
+def start_export_job(fmt, out_path, doc_id=None):
+    """
+    export_map_file を別プロセスで実行する
+
+    Returns:
+        list: [成功したかどうか, ジョブID]
+    """
+    from py_src.job_pool import export_job
+
+    if fmt not in EXPORT_FORMATS or not out_path:
+        return [False, None]
+    data = current_document(doc_id)
+    if data is None:
+        return [False, None]
+    job_id = job_scheduler().submit('export', current_path(doc_id), export_job, data, out_path, fmt,
+                                    signature=json.dumps([fmt, out_path]))
+    return [True, job_id]
+
+@eel.expose
+def cancel_job(job_id):
+    """実行中または待機中のジョブを取り消す"""
+    if g_job_scheduler is None:
+        return False
+    return g_job_scheduler.cancel(job_id)
+
+@eel.expose
+def get_job_status(job_id):
+    """ジョブの状態 (id, kind, status, done, total, error)。不明なジョブは None"""
+    if g_job_scheduler is None:
+        return None
+    return g_job_scheduler.get(job_id)
+
 @eel.expose
 def expand_user(folder):
     """Return the full path to display in the UI."""
     return '{}/*'.format(os.path.expanduser(folder))
 
+def ogp_cache():
+    """OGP サムネイルのキャッシュを初回利用時に開く"""
+    global g_ogp_cache
+    if g_ogp_cache is None:
+        from py_src.ogp_cache import OgpCache
+        g_ogp_cache = OgpCache()
+        atexit.register(g_ogp_cache.flush)
+    return g_ogp_cache
+
+def ogp_image_url(url, entry):
+    """キャッシュ済み OGP 画像の URL。キャッシュから消えていても src から取り直せるようにする"""
+    if not entry:
+        return None
+    return image_url('ogp', entry['hash'], src=url)
+
+def resolve_ogp_image(digest, query):
+    """
+    /_img/ogp/<hash> で返すファイル。画像がキャッシュから消えていれば src から取り直すが、
+    取り直すのは索引にあるページだけ (任意の URL を取りに行く入口にしない)
+    """
+    cache = ogp_cache()
+    if not os.path.exists(cache.object_path(digest)):
+        src = query.get('src')
+        entry = cache.get(src) if src and src in cache else None
+        if not entry:
+            return None
+        digest = entry['hash']
+    return cache.object_path(digest), cache.content_type(digest), digest
+
+register_image_store('ogp', resolve_ogp_image)
+
 @eel.expose
 def get_ogp_image(url):
-    """URLからOGP画像を取得してBase64形式で返す"""
-    import requests
-    from bs4 import BeautifulSoup
-    import base64
-
+    """URLからOGP画像を取得して、画像を配信する URL (/_img/ogp/...) を返す"""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Cache-Control": "max-age=0",
-            "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-            "Sec-Ch-Ua-Mobile": "?0",
-            "Sec-Ch-Ua-Platform": '"Windows"',
-            "Upgrade-Insecure-Requests": "1",
-        }
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # OGP画像タグを探す
-        og_image = soup.find("meta", property="og:image")
-        if not og_image:
-            og_image = soup.find("meta", attrs={"name": "twitter:image"})
-        if not og_image:
-            # ファビコンをバックアップとして探す
-            og_image = soup.find("link", rel=lambda x: x and 'icon' in x.lower())
-            if og_image:
-                og_image["content"] = og_image.get("href")
-            
-        if og_image and (og_image.get("content") or og_image.get("href")):
-            img_url = og_image.get("content") or og_image.get("href")
-            
-            # 相対パスの場合は絶対パスに変換
-            if not img_url.startswith(('http://', 'https://')):
-                from urllib.parse import urljoin
-                img_url = urljoin(url, img_url)
-
-            # 画像をダウンロード
-            img_response = requests.get(img_url, headers=headers, timeout=10)
-            img_response.raise_for_status()
-            
-            # Base64エンコード
-            img_base64 = base64.b64encode(img_response.content).decode("utf-8")
-            return f"data:{img_response.headers.get('Content-Type', 'image/png')};base64,{img_base64}"
-            
-        return None
+        return ogp_image_url(url, ogp_cache().get(url))
     except Exception as e:
         print(f"Error fetching OGP image: {e}")
         return None
 
+@eel.expose
+def get_ogp_images(urls):
+    """
+    複数の URL の OGP 画像をまとめて取得する (キャッシュ済みのものは通信しない)
+
+    Returns:
+        dict: URL -> 画像を配信する URL。画像がない URL は None
+    """
+    try:
+        entries = ogp_cache().get_many(urls)
+    except Exception as e:
+        print(f"Error fetching OGP images: {e}")
+        return {url: None for url in urls}
+    return {url: ogp_image_url(url, entry) for url, entry in entries.items()}
+
+def node_image_cache():
+    """ノード画像のキャッシュを初回利用時に開く"""
+    global g_node_images
+    if g_node_images is None:
+        from py_src.node_images import NodeImageCache
+        g_node_images = NodeImageCache()
+    return g_node_images
+
+def resolve_node_image(digest, query):
+    """/_img/node/<hash> で返すファイル"""
+    path = node_image_cache().object_path(digest)
+    if not os.path.exists(path):
+        return None
+    return path, 'image/png', digest
+
+register_image_store('node', resolve_node_image)
+
+@eel.expose
+def start_node_image_job(nodes=None, doc_id=None):
+    """
+    ノード画像をまとめて生成する。名前・スタイル・サイズ・色が同じノードは 1 枚の画像を共有し、
+    生成済みの画像は描き直さない。足りない画像だけを別プロセスのジョブで描画する
+
+    Args:
+        nodes: 対象のノード。省略した場合は現在のマップの全ノード
+
+    Returns:
+        list: [成功したかどうか, {"job": ジョブID (描画するものが無ければ None),
+               "images": ノードID -> 画像の URL (/_img/node/<ハッシュ>), "pending": 描画待ちのノードID}]。
+              描画が終わると on_job_done に ノードID -> ハッシュ (失敗は None) が届く
+    """
+    from py_src.job_pool import node_image_job
+
+    if nodes is None:
+        data = current_document(doc_id)
+        if data is None:
+            return [False, None]
+        nodes = data.get('nodes', [])
+    cache = node_image_cache()
+    keys, misses = cache.plan(nodes)
+    ids_by_key = {}
+    for node_id, key in keys.items():
+        if key in misses:
+            ids_by_key.setdefault(key, []).append(node_id)
+    job_id = None
+    if misses:
+        job_id = job_scheduler().submit('node_images', current_path(doc_id), node_image_job,
+                                        misses, ids_by_key, cache.cache_dir,
+                                        signature=json.dumps(sorted(misses)))
+    return [True, {
+        "job": job_id,
+        "images": {node_id: image_url('node', key) for node_id, key in keys.items()},
+        "pending": [node_id for ids in ids_by_key.values() for node_id in ids],
+    }]
+
+@eel.expose
+def gc_node_images(doc_id=None):
+    """
+    現在のマップから参照されていないノード画像を削除する (最近使われた画像は残す)
+
+    Returns:
+        list: [成功したかどうか, 削除した画像の数]
+    """
+    from py_src.node_images import image_key
+
+    data = current_document(doc_id)
+    if data is None:
+        return [False, None]
+    try:
+        referenced = {image_key(node) for node in data.get('nodes', [])}
+        return [True, node_image_cache().gc(referenced)]
+    except Exception as e:
+        print(f"--- Error collecting node images: {e}")
+        return [False, None]
+
 @eel.expose
 def init():
     print('Initalized')
-    global g_current_file_path
-    g_current_file_path = None
+    startup_profile.report('first page init')
+    # 開いているマップは閉じずに残す (同じマップを開き直したときに読み直さない)
+    documents().activate(None)
+    if g_autosave is not None:
+        # ページを読み込み直した場合、それまでのマップは復旧の候補として残す
+        flush_autosave(force=True)
+        g_autosave.detach()
+    eel.spawn(offer_recovery)
 
     return True
 
@@ -703,10 +1353,38 @@ def pick_file(folder):
         listFiles = [_f for _f in os.listdir(folder) if not os.path.isdir(os.path.join(folder, _f))]
         if len(listFiles) == 0:
             return 'No Files found in {}'.format(folder)
+        import random
         return random.choice(listFiles)
     else:
         return '{} is not a valid folder'.format(folder)
 
+@eel.expose
+def get_backend_metrics():
+    """
+    公開関数ごとの呼び出し回数・処理時間 (ハンドラ / JSON 変換 / 送信) のヒストグラム・送受信サイズと、
+    イベントループがブロックされた時間を返す。--profile-slow-calls=<ms> を指定した場合は遅い呼び出しのスタックも含む
+    """
+    if g_endpoint_metrics is None:
+        return None
+    return g_endpoint_metrics.snapshot()
+
+def install_endpoint_metrics():
+    """すべての @eel.expose 関数を計測する (公開関数をすべて定義した後、eel.start の前に呼ぶ)"""
+    global g_endpoint_metrics
+    from py_src.contrib import endpoint_metrics
+
+    g_endpoint_metrics = endpoint_metrics.EndpointMetrics().install(eel)
+    eel.spawn(g_endpoint_metrics.monitor_loop, eel.sleep)
+    log_path = endpoint_metrics.option_value(endpoint_metrics.LOG_FLAG)
+    if log_path:
+        eel.spawn(g_endpoint_metrics.dump_loop, log_path, eel.sleep)
+    threshold = endpoint_metrics.option_value(endpoint_metrics.PROFILE_FLAG)
+    if threshold:
+        try:
+            g_endpoint_metrics.start_sampler(float(threshold))
+        except ValueError:
+            print(f"--- Invalid {endpoint_metrics.PROFILE_FLAG} value: {threshold}")
+
 def start_eel(develop):
     """Start Eel with either production or development configuration."""
 
@@ -722,34 +1400,29 @@ def start_eel(develop):
 
         # find a unused port to host the eel server/websocket
         eel_port = find_unused_port()
+        startup_profile.mark('find port')
 
-        # Determine path to build files for replacement
+        # Determine path to build files
         try:
             base_path = sys._MEIPASS
         except Exception:
             base_path = os.path.abspath(".")
 
-        # replace the port in the web files
-        assets_dir = os.path.join(base_path, "dist_vite/assets")
-        index_file = os.path.join(base_path, "dist_vite/index.html")
-        
-        replace_file = findFileRe(assets_dir, "index.*.js")
-        if replace_file:
-            replaceInfile(os.path.join(assets_dir, replace_file), 'ws://localhost:....', f"ws://localhost:{eel_port}")
-        
-        if os.path.exists(index_file):
-            replaceInfile(index_file, 'http://localhost:.....eel.js', f"http://localhost:{eel_port}/eel.js")
+        # index.html と バンドルのポートは配信時に差し替える (ファイルは書き換えない)
+        from py_src.web_assets import register_port_injection
+        register_port_injection(os.path.join(base_path, "dist_vite"), eel_port)
+        startup_profile.mark('port injection')
 
     eel.init(directory, ['.tsx', '.ts', '.jsx', '.js', '.html'])
+    startup_profile.mark('eel.init')
 
     # Close splash screen after initialization
-    if importlib.util.find_spec("pyi_splash"):
-        try:
-            import pyi_splash
-            pyi_splash.update_text('UI Loaded ...')
-            pyi_splash.close()
-        except Exception:
-            pass
+    try:
+        import pyi_splash
+        pyi_splash.update_text('UI Loaded ...')
+        pyi_splash.close()
+    except Exception:
+        pass
 
     # These will be queued until the first connection is made, but won't be repeated on a page reload
     # say_hello_py('')  # JavaScript側で未定義のため無効化
@@ -759,6 +1432,16 @@ def start_eel(develop):
 
     #create images
 
+    eel.spawn(compact_journal_loop)
+    eel.spawn(flush_recent_files_loop)
+    eel.spawn(autosave_loop)
+
+    # 画像は base64 ではなく /_img/... の URL で配信する (Eel の静的ファイルより先に登録する)
+    register_image_routes()
+    warm_recent_document()
+    install_endpoint_metrics()
+    startup_profile.mark('routes')
+
     eel_kwargs = dict(
         host='localhost',
         port=eel_port,
@@ -768,6 +1451,8 @@ def start_eel(develop):
     try:
         eel.start(page, mode=app, **eel_kwargs)
     except EnvironmentError:
+        import platform
+
         # If Chrome isn't found, fallback to Microsoft Edge on Win10 or greater
         if sys.platform in ['win32', 'win64'] and int(platform.release()) >= 10:
             eel.start(page, mode='edge', **eel_kwargs)
@@ -776,6 +1461,12 @@ def start_eel(develop):
 
 if __name__ == '__main__':
     import sys
+    import multiprocessing
+
+    # PyInstaller でビルドした実行ファイルからジョブ用のワーカープロセスを起動できるようにする
+    multiprocessing.freeze_support()
 
-    # Pass any second argument to enable debugging
-    start_eel(develop=len(sys.argv) == 2)
+    # Pass any second argument to enable debugging (--profile-startup は起動時間の内訳を表示する)
+    # --metrics-log=<path> は公開関数の計測値を JSON Lines で追記し、--profile-slow-calls=<ms> は遅い呼び出しのスタックを記録する
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    start_eel(develop=len(args) == 1)
@@ -0,0 +1,430 @@
+"""Background autosave into a recovery directory, with bounded disk I/O.
+
+Edits reach the backend as deltas built by the UI (``record``) and are
+coalesced in memory: repeated edits to the same node or link collapse into
+one entry. Links are keyed by their endpoints rather than by their index
+(``link_identities``), which the UI renumbers on every deletion.
+A flush writes the coalesced delta as one journal line once the edits have
+paused for DEBOUNCE seconds (or after MAX_DELAY while edits keep coming), so
+typing costs one small append every few seconds, never a full rewrite.
+
+Each autosaved map is a session in ``~/.space_mind_recovery``::
+
+    <key>.meta.json          source path, title, node count, last write time
+    <key>.json.journal       coalesced deltas (DeltaStore journal format)
+    <key>.<n>.json           compact snapshots, the newest KEEP_SNAPSHOTS kept
+
+A map opened from a file uses that file as its base, so nothing but deltas
+is written until the journal grows past DeltaStore's compaction limits;
+only then is a compact snapshot written into the recovery directory (the
+user's file is never touched). An untitled map needs one snapshot of its
+own when its session starts.
+
+Writes are paid for from a token bucket (BANDWIDTH bytes per second, up to
+BURST): while it is empty, edits keep coalescing instead of being written.
+``Autosave.due`` runs on the event loop; the writes, and diffs of whole
+documents (only sent, through the chunked transfer, to start the session
+of an untitled map), run one at a time on a dedicated worker thread
+(``Autosave.run``).
+
+A session is removed when its map is saved for real; sessions still on disk
+at start-up are offered for recovery (``sessions`` / ``recover``).
+"""
+import hashlib
+import json
+import os
+import secrets
+import time
+
+from py_src.delta_store import DeltaStore, journal_path_for
+from py_src.graph_integrity import repair_graph
+from py_src.map_schema import endpoint_id, project_link, project_node
+from py_src.map_writer import atomic_write_chunks, write_map
+
+DEFAULT_DIR = os.path.expanduser("~/.space_mind_recovery")
+DEBOUNCE = 3.0
+MAX_DELAY = 30.0
+# ディスクへの書き込み量の上限 (バイト/秒) と、まとめて書ける量
+BANDWIDTH = 2 * 1024 * 1024
+BURST = 8 * 1024 * 1024
+KEEP_SNAPSHOTS = 3
+META_SUFFIX = ".meta.json"
+
+
+def session_key(source_path):
+    """
+    A new session key. Every session gets its own key, so opening a map
+    again never appends to (or overwrites) an older session of the same file.
+    """
+    if source_path:
+        prefix = "map-" + hashlib.sha1(os.path.abspath(source_path).encode("utf-8")).hexdigest()[:12]
+    else:
+        prefix = "untitled"
+    return f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def link_identities(links):
+    """
+    Copies of *links* whose ``index`` is replaced by a key that survives the
+    UI renumbering link indexes: both endpoints and the position among the
+    links between the same endpoints, e.g. ``"3>7#0"``.
+    """
+    seen = {}
+    out = []
+    for link in links:
+        pair = (endpoint_id(link.get("source")), endpoint_id(link.get("target")))
+        count = seen.get(pair, 0)
+        seen[pair] = count + 1
+        out.append(dict(link, index=f"{pair[0]}>{pair[1]}#{count}"))
+    return out
+
+
+def _with_link_identities(data):
+    return dict(data, links=link_identities(data.get("links") or []))
+
+
+class AutosaveStore(DeltaStore):
+    """
+    DeltaStore whose links are keyed by ``link_identities``. Deleting a link
+    renumbers every later index in the UI; keyed by index, one deletion would
+    journal all of those links again.
+    Deltas sent to it must use the same keys; ``document()`` numbers the
+    links from 0 again.
+    """
+
+    def _reset(self, data):
+        super()._reset(_with_link_identities(data))
+
+    def diff(self, data):
+        return super().diff(_with_link_identities(data))
+
+    def document(self):
+        doc = super().document()
+        doc["links"] = [dict(link, index=i) for i, link in enumerate(doc["links"])]
+        return doc
+
+
+class DeltaCoalescer:
+    """Merges save deltas so that only the latest state of each node / link is written."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        # (added, modified, removed) をノードは id、リンクは index (link_identities のキー) で持つ
+        self._nodes = ({}, {}, [])
+        self._links = ({}, {}, [])
+        self._fields = {}
+        self._removed_fields = set()
+        self.first_at = None
+        self.last_at = None
+
+    def __bool__(self):
+        return self.first_at is not None
+
+    @staticmethod
+    def _merge(section, delta, key, project):
+        added, modified, removed = section
+        for item_key in delta.get("removed", ()):
+            added.pop(item_key, None)
+            modified.pop(item_key, None)
+            removed.append(item_key)
+        for item in delta.get("added", ()):
+            item = project(item)
+            added[item[key]] = item
+            modified.pop(item[key], None)
+        for patch in delta.get("modified", ()):
+            patch = project(patch)
+            target = added.get(patch[key])
+            if target is None:
+                target = modified.setdefault(patch[key], {})
+            target.update(patch)
+
+    def add(self, delta):
+        self._merge(self._nodes, delta.get("nodes") or {}, "id", project_node)
+        self._merge(self._links, delta.get("links") or {}, "index", project_link)
+        for key in delta.get("removed_fields", ()):
+            self._fields.pop(key, None)
+            self._removed_fields.add(key)
+        for key, value in (delta.get("fields") or {}).items():
+            self._removed_fields.discard(key)
+            self._fields[key] = value
+        now = time.monotonic()
+        if self.first_at is None:
+            self.first_at = now
+        self.last_at = now
+
+    def replace(self, delta):
+        """Drop what is buffered and keep *delta* (a diff that already contains it)."""
+        self._reset()
+        if any(delta.values()):
+            self.add(delta)
+
+    def take(self):
+        """The coalesced delta (in the format DeltaStore applies); clears the buffer."""
+        delta = {}
+        for name, (added, modified, removed) in (("nodes", self._nodes), ("links", self._links)):
+            if added or modified or removed:
+                # DeltaStore は removed -> added -> modified の順に適用する
+                delta[name] = {
+                    "removed": list(dict.fromkeys(removed)),
+                    "added": list(added.values()),
+                    "modified": list(modified.values()),
+                }
+        if self._fields:
+            delta["fields"] = self._fields
+        if self._removed_fields:
+            delta["removed_fields"] = sorted(self._removed_fields)
+        self._reset()
+        return delta
+
+
+class _TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._at) * self.rate)
+        self._at = now
+
+    def ready(self, size):
+        self._refill()
+        # バケットより大きな書き込みは満杯になるまで待たせる
+        return self.tokens >= min(size, self.burst)
+
+    def spend(self, size):
+        self._refill()
+        self.tokens -= size
+
+
+class AutosaveSession:
+    def __init__(self, directory, key, base, source_path=None):
+        self.directory = directory
+        self.key = key
+        self.source_path = source_path
+        self.meta_path = os.path.join(directory, key + META_SUFFIX)
+        self.coalescer = DeltaCoalescer()
+        self.written = 0  # 直前の書き込みのバイト数
+        self.meta = {
+            "key": key,
+            "source_path": source_path,
+            "source_stamp": _stamp(source_path),
+            "snapshots": [],
+            "title": _title(base),
+            "node_count": len(base.get("nodes") or []),
+            "updated_at": None,
+        }
+        self.store = AutosaveStore(os.path.join(directory, key + ".json"), base, writer=self._write_snapshot)
+
+    @property
+    def journal_path(self):
+        return self.store.journal_path
+
+    def _write_snapshot(self, document, _path):
+        snapshots = self.meta["snapshots"]
+        number = int(snapshots[-1].rsplit(".", 2)[-2]) + 1 if snapshots else 1
+        name = f"{self.key}.{number}.json"
+        write_map(document, os.path.join(self.directory, name), compact=True)
+        self.written += os.path.getsize(os.path.join(self.directory, name))
+        snapshots.append(name)
+        for old in snapshots[:-KEEP_SNAPSHOTS]:
+            _remove(os.path.join(self.directory, old))
+        del snapshots[:-KEEP_SNAPSHOTS]
+        self.meta["node_count"] = len(document.get("nodes") or [])
+        self.meta["title"] = _title(document)
+        self._write_meta()
+        return True
+
+    def _write_meta(self):
+        self.meta["updated_at"] = time.time()
+        payload = json.dumps(self.meta, ensure_ascii=False)
+        atomic_write_chunks(self.meta_path, [payload])
+        self.written += len(payload)
+
+    def snapshot(self):
+        """Write the whole current state as a snapshot (runs on a worker thread). Returns the bytes written."""
+        self.written = 0
+        self.store.compact(force=True)
+        return self.written
+
+    def write(self, delta):
+        """Append *delta* to the journal (runs on a worker thread). Returns the bytes written."""
+        self.written = 0
+        before = _size(self.journal_path)
+        self.store.apply(delta)
+        self.written += max(_size(self.journal_path) - before, 0)
+        self._write_meta()
+        return self.written
+
+    def remove(self):
+        for name in self.meta["snapshots"]:
+            _remove(os.path.join(self.directory, name))
+        _remove(self.journal_path)
+        _remove(self.meta_path)
+
+
+class Autosave:
+    def __init__(self, directory=DEFAULT_DIR, rate=BANDWIDTH, burst=BURST):
+        self.directory = directory
+        self.session = None
+        self._bucket = _TokenBucket(rate, burst)
+        self._pool = None
+
+    def run(self, func, *args):
+        """Run *func* on the autosave thread, blocking only the calling greenlet."""
+        if self._pool is None:
+            from gevent.threadpool import ThreadPool
+            self._pool = ThreadPool(1)
+        return self._pool.apply(func, args)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.kill()
+            self._pool = None
+
+    def begin(self, base, source_path=None):
+        """
+        Start a session for a map whose current state is *base* and return it.
+        Nothing is written here: the caller writes what is still pending in
+        the previous session first (``due(force=True)``), and an untitled map,
+        having no file to replay the journal against, needs its ``snapshot()``.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.session = AutosaveSession(self.directory, session_key(source_path), base, source_path)
+        return self.session
+
+    def record(self, delta):
+        """Coalesce *delta* into the current session; False when no session has been started."""
+        if self.session is None:
+            return False
+        self.session.coalescer.add(delta)
+        return True
+
+    def due(self, force=False):
+        """
+        ``(session, delta)`` to write now, or None while edits are still coming
+        in or the bandwidth budget is used up. Call on the event loop.
+        """
+        session = self.session
+        if session is None or not session.coalescer:
+            return None
+        coalescer = session.coalescer
+        now = time.monotonic()
+        if not force and now - coalescer.last_at < DEBOUNCE and now - coalescer.first_at < MAX_DELAY:
+            return None
+        delta = coalescer.take()
+        size = len(json.dumps(delta, ensure_ascii=False, separators=(",", ":")))
+        if not force and not self._bucket.ready(size):
+            # 予算が戻るまで書かずにまとめ続ける
+            coalescer.add(delta)
+            return None
+        return session, delta
+
+    def charge(self, written):
+        self._bucket.spend(written)
+
+    def detach(self):
+        """Stop autosaving the current map; its session stays on disk for recovery."""
+        self.session = None
+
+    def discard(self):
+        """Remove the current session (after a real save)."""
+        session = self.session
+        if session is not None:
+            session.coalescer.take()
+            session.remove()
+            self.session = None
+
+    def discard_key(self, key):
+        meta = _read_json(os.path.join(self.directory, key + META_SUFFIX))
+        if meta is None:
+            return
+        for name in meta.get("snapshots", []):
+            _remove(os.path.join(self.directory, name))
+        _remove(journal_path_for(os.path.join(self.directory, key + ".json")))
+        _remove(os.path.join(self.directory, key + META_SUFFIX))
+
+    def sessions(self, exclude_current=True):
+        """Recoverable sessions, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        current = self.session.key if exclude_current and self.session is not None else None
+        found = []
+        for name in names:
+            if not name.endswith(META_SUFFIX):
+                continue
+            meta = _read_json(os.path.join(self.directory, name))
+            if meta is None or meta.get("key") == current:
+                continue
+            journal = journal_path_for(os.path.join(self.directory, meta["key"] + ".json"))
+            if not meta.get("snapshots") and not os.path.exists(journal):
+                continue
+            meta["source_changed"] = bool(meta.get("source_path")) and _stamp(meta["source_path"]) != (
+                tuple(meta["source_stamp"]) if meta.get("source_stamp") else None)
+            found.append(meta)
+        found.sort(key=lambda m: m.get("updated_at") or 0, reverse=True)
+        return found
+
+    def recover(self, key, reader):
+        """
+        The recovered document of session *key*: the newest snapshot (or the
+        source file, read with *reader*) with the journal replayed on top.
+        The source file is repaired with ``repair_graph`` first, as it was
+        when the session started from it (``repair_document`` in main.py):
+        the journal refers to the repaired ids and links.
+        """
+        meta = _read_json(os.path.join(self.directory, key + META_SUFFIX))
+        if meta is None:
+            return None
+        if meta.get("snapshots"):
+            base = reader(os.path.join(self.directory, meta["snapshots"][-1]))
+        elif meta.get("source_path") and os.path.exists(meta["source_path"]):
+            base, _report = repair_graph(reader(meta["source_path"]))
+        else:
+            return None
+        store = AutosaveStore(os.path.join(self.directory, key + ".json"), base, writer=lambda *_: True)
+        store.replay_journal(compact=False)
+        return store.document()
+
+
+def _title(document):
+    for node in document.get("nodes") or []:
+        if isinstance(node, dict) and node.get("type") == "issue":
+            return node.get("name")
+    return None
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
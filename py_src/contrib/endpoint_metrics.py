@@ -0,0 +1,334 @@
+"""Call counts, latency histograms and payload sizes for every Eel endpoint.
+
+``EndpointMetrics.install(eel)`` wraps every function in Eel's exposed
+function table (so only calls coming from the UI are counted, not Python
+code calling the same function directly) and hooks Eel's message handling
+to split each call into three parts:
+
+    handler   the Python function itself
+    encode    JSON encoding of the return value
+    send      writing the response to the websocket
+
+Request and response sizes are the lengths of the JSON messages Eel already
+decodes and encodes, so measuring them costs nothing extra. Time spent in
+the browser and on the wire before a message arrives cannot be seen from
+here.
+
+``monitor_loop`` runs as a greenlet and measures how late the gevent loop
+wakes it up; any lag above BLOCK_THRESHOLD means some greenlet held the loop
+(usually a CPU-bound handler) for that long.
+
+With ``--profile-slow-calls=<ms>`` a sampler thread records the Python
+stacks of calls that have been running for longer than that threshold.
+Stacks are aggregated per endpoint as ``frame;frame;...`` -> sample count.
+``--metrics-log=<path>`` appends a snapshot as one JSON line every
+DUMP_INTERVAL seconds.
+"""
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+LOG_FLAG = "--metrics-log"
+PROFILE_FLAG = "--profile-slow-calls"
+
+# ヒストグラムのバケットの上限 (ms)
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+LOOP_INTERVAL = 0.05
+# これ以上イベントループの再開が遅れたらブロックされていたとみなす
+BLOCK_THRESHOLD = 0.02
+DUMP_INTERVAL = 10.0
+SAMPLE_INTERVAL = 0.005
+MAX_STACKS = 50
+MAX_STACK_DEPTH = 30
+
+_SIZE_KEY = "_metrics_bytes_in"
+
+
+def option_value(flag, argv=None):
+    """Value of ``flag=value`` on the command line, or None."""
+    prefix = flag + "="
+    for arg in sys.argv[1:] if argv is None else argv:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return None
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the *q* quantile, capped at the maximum seen."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS_MS[i], round(self.max, 3)) if i < len(BUCKETS_MS) else round(self.max, 3)
+        return round(self.max, 3)
+
+    def snapshot(self):
+        labels = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class _Endpoint:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.handler = Histogram()
+        self.encode = Histogram()
+        self.send = Histogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.max_bytes_in = 0
+        self.max_bytes_out = 0
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "handler": self.handler.snapshot(),
+            "encode": self.encode.snapshot(),
+            "send": self.send.snapshot(),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "max_bytes_in": self.max_bytes_in,
+            "max_bytes_out": self.max_bytes_out,
+        }
+
+
+class _SizedJson:
+    """Stands in for Eel's ``json`` module to record the size of each incoming call."""
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+    def loads(self, text, **kwargs):
+        value = json.loads(text, **kwargs)
+        if isinstance(value, dict) and "call" in value:
+            value[_SIZE_KEY] = len(text)
+        return value
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = {}
+        self.loop_lag = Histogram()
+        self.blocked_count = 0
+        self.blocked_ms = 0.0
+        self.sampler = None
+        self._responses = {}  # 呼び出しを処理している greenlet -> エンドポイントの統計
+
+    def endpoint(self, name):
+        stats = self.endpoints.get(name)
+        if stats is None:
+            stats = self.endpoints[name] = _Endpoint(name)
+        return stats
+
+    def wrap(self, name, func):
+        stats = self.endpoint(name)
+
+        @functools.wraps(func)
+        def instrumented(*args, **kwargs):
+            # サンプラーはこのフレームのローカル変数 (stats, start) から呼び出し中のエンドポイントを知る
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.calls += 1
+                stats.handler.add((time.perf_counter() - start) * 1000)
+
+        instrumented.__metrics_name__ = name
+        return instrumented
+
+    def install(self, eel):
+        """Wrap every exposed function and hook Eel's message handling (call after all ``@eel.expose``)."""
+        exposed = eel._exposed_functions
+        for name, func in list(exposed.items()):
+            if getattr(func, "__metrics_name__", None) is None:
+                exposed[name] = self.wrap(name, func)
+        try:
+            self._hook_transport(eel)
+        except AttributeError as e:
+            # Eel の内部構成が変わった場合はハンドラの計測だけにする
+            print(f"--- Endpoint metrics: transport timing disabled ({e})")
+        return self
+
+    def _hook_transport(self, eel):
+        from gevent import getcurrent
+
+        process_message = eel._process_message
+        safe_json = eel._safe_json
+        repeated_send = eel._repeated_send
+        responses = self._responses
+
+        def _process_message(message, ws):
+            size = message.pop(_SIZE_KEY, None)
+            if "call" not in message:
+                return process_message(message, ws)
+            name = message.get("name")
+            stats = self.endpoint(name)
+            if size is not None:
+                stats.bytes_in += size
+                stats.max_bytes_in = max(stats.max_bytes_in, size)
+            current = getcurrent()
+            responses[current] = stats
+            try:
+                return process_message(message, ws)
+            finally:
+                responses.pop(current, None)
+
+        def _safe_json(obj):
+            stats = responses.get(getcurrent())
+            # ハンドラの中から JS の関数を呼んだ場合のメッセージは数えない
+            if stats is None or not isinstance(obj, dict) or "return" not in obj:
+                return safe_json(obj)
+            start = time.perf_counter()
+            text = safe_json(obj)
+            stats.encode.add((time.perf_counter() - start) * 1000)
+            stats.bytes_out += len(text)
+            stats.max_bytes_out = max(stats.max_bytes_out, len(text))
+            return text
+
+        def _repeated_send(ws, msg):
+            stats = responses.get(getcurrent())
+            if stats is None or not msg.startswith('{"return"'):
+                return repeated_send(ws, msg)
+            start = time.perf_counter()
+            try:
+                return repeated_send(ws, msg)
+            finally:
+                stats.send.add((time.perf_counter() - start) * 1000)
+
+        eel._process_message = _process_message
+        eel._safe_json = _safe_json
+        eel._repeated_send = _repeated_send
+        eel.jsn = _SizedJson()
+
+    def monitor_loop(self, sleep, interval=LOOP_INTERVAL):
+        """Run as a greenlet: records how late the loop resumes it after each *interval*."""
+        while True:
+            start = time.perf_counter()
+            sleep(interval)
+            lag = max(time.perf_counter() - start - interval, 0.0)
+            self.loop_lag.add(lag * 1000)
+            if lag >= BLOCK_THRESHOLD:
+                self.blocked_count += 1
+                self.blocked_ms += lag * 1000
+
+    def dump_loop(self, path, sleep, interval=DUMP_INTERVAL):
+        """Run as a greenlet: appends a snapshot to *path* as one JSON line every *interval* seconds."""
+        while True:
+            sleep(interval)
+            try:
+                line = json.dumps(self.snapshot(), ensure_ascii=False, separators=(",", ":"))
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except Exception as e:
+                print(f"--- Error writing metrics: {e}")
+
+    def start_sampler(self, threshold_ms, interval=SAMPLE_INTERVAL):
+        """Sample the stacks of calls running longer than *threshold_ms* (call from the loop's thread)."""
+        if self.sampler is None:
+            self.sampler = SlowCallSampler(threading.get_ident(), threshold_ms, interval)
+            self.sampler.start()
+        return self.sampler
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "uptime_s": round(time.time() - self.started, 3),
+            "endpoints": {name: stats.snapshot() for name, stats in self.endpoints.items() if stats.calls},
+            "loop": {
+                "lag": self.loop_lag.snapshot(),
+                "blocked_count": self.blocked_count,
+                "blocked_ms": round(self.blocked_ms, 3),
+            },
+            "slow_calls": self.sampler.snapshot() if self.sampler is not None else None,
+        }
+
+
+class SlowCallSampler(threading.Thread):
+    """
+    Samples the event loop's thread from a separate OS thread. The stack of
+    the running greenlet is recorded when it is inside an instrumented call
+    that started more than *threshold_ms* ago.
+    """
+
+    def __init__(self, thread_id, threshold_ms, interval=SAMPLE_INTERVAL):
+        super().__init__(name="slow-call-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.samples = {}  # エンドポイント名 -> {折りたたんだスタック: サンプル数}
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+
+    def _sample(self, frame):
+        stack = []
+        while frame is not None:
+            if frame.f_code.co_name == "instrumented":
+                local = frame.f_locals
+                if "start" in local and time.perf_counter() - local["start"] >= self.threshold:
+                    self._record(local["stats"].name, stack)
+                return
+            stack.append(frame)
+            frame = frame.f_back
+
+    def _record(self, name, frames):
+        frames = frames[-MAX_STACK_DEPTH:]
+        key = ";".join(
+            f"{f.f_code.co_name} ({os.path.basename(f.f_code.co_filename)}:{f.f_lineno})"
+            for f in reversed(frames)
+        )
+        stacks = self.samples.setdefault(name, {})
+        if key in stacks or len(stacks) < MAX_STACKS:
+            stacks[key] = stacks.get(key, 0) + 1
+
+    def stop(self):
+        self._stopped.set()
+
+    def snapshot(self):
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "interval_ms": self.interval * 1000,
+            "stacks": {
+                name: dict(sorted(stacks.items(), key=lambda item: -item[1]))
+                for name, stacks in list(self.samples.items())
+            },
+        }
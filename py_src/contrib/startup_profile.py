@@ -0,0 +1,38 @@
+"""Per-phase startup timing, printed when main.py runs with ``--profile-startup``.
+
+Import this module before anything else: the clock starts when it is loaded.
+``mark(phase)`` records the time spent since the previous mark and
+``report()`` prints the breakdown once.
+"""
+import sys
+import time
+
+FLAG = "--profile-startup"
+
+enabled = FLAG in sys.argv
+_started = time.perf_counter()
+_last = _started
+_phases = []
+_reported = False
+
+
+def mark(phase):
+    global _last
+    now = time.perf_counter()
+    _phases.append((phase, now - _last))
+    _last = now
+
+
+def report(final_phase=None):
+    global _reported
+    if final_phase:
+        mark(final_phase)
+    if not enabled or _reported:
+        return
+    _reported = True
+    total = _last - _started
+    print("--- Startup profile")
+    for phase, elapsed in _phases:
+        share = elapsed / total * 100 if total else 0.0
+        print(f"    {phase:<24} {elapsed * 1000:>8.1f}ms {share:>5.1f}%")
+    print(f"    {'total':<24} {total * 1000:>8.1f}ms")
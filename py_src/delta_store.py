@@ -0,0 +1,260 @@
+"""Incremental saves for the currently open map.
+
+The last saved document is kept in memory with nodes keyed by ``id`` and links
+keyed by ``index``. Each delta sent to ``save_delta`` is appended as one
+line to ``<map>.journal`` (fsynced) and then applied to that state; the
+journal is folded back into the
+main JSON file (compaction) once it grows past a threshold, after an interval,
+or when the app closes. Applying a delta therefore costs O(size of the edit),
+not O(size of the map).
+
+Delta format::
+
+    {
+        "nodes": {"added": [node, ...], "modified": [partial node with id, ...], "removed": [id, ...]},
+        "links": {"added": [link, ...], "modified": [partial link with index, ...], "removed": [index, ...]},
+        "fields": {"globalBackground": "sky", "camera": {...}},
+        "removed_fields": ["groups", ...]
+    }
+
+Every section is optional.
+
+The desktop UI does not send save deltas yet (it still saves whole
+documents through ``save_data`` / the chunked transfer); ``save_delta`` is
+a backend endpoint, and the autosave journal (py_src/autosave.py) uses the
+same store.
+"""
+import json
+import os
+import time
+
+from py_src.map_schema import project_graph, project_link, project_node
+
+JOURNAL_SUFFIX = ".journal"
+
+# ジャーナルがこの件数/サイズ/経過時間を超えたらメインのJSONへ書き戻す
+COMPACT_EVERY = 200
+COMPACT_BYTES = 4 * 1024 * 1024
+COMPACT_INTERVAL = 30.0
+
+_MISSING = object()
+
+
+def journal_path_for(path):
+    return path + JOURNAL_SUFFIX
+
+
+def _check_delta(delta):
+    """Raise ValueError when *delta* could not be applied (checked before it is journaled)."""
+    if not isinstance(delta, dict):
+        raise ValueError("delta must be an object")
+    for name, key in (("nodes", "id"), ("links", "index")):
+        section = delta.get(name) or {}
+        if not isinstance(section, dict):
+            raise ValueError(f"delta {name} must be an object")
+        for kind in ("added", "modified"):
+            for record in section.get(kind) or ():
+                if not isinstance(record, dict) or key not in record:
+                    raise ValueError(f"delta {name} {kind} entries need {key!r}")
+    if not isinstance(delta.get("fields") or {}, dict):
+        raise ValueError("delta fields must be an object")
+
+
+class DeltaStore:
+    """In-memory copy of the last saved map plus its append-only journal."""
+
+    def __init__(self, path, data, writer):
+        """
+        Args:
+            path: メインのJSONファイルのパス
+            data: 最後に保存(または読み込み)されたドキュメント
+            writer: ``writer(data, path) -> bool`` の形でドキュメント全体を書き出す関数
+        """
+        self.path = path
+        self.journal_path = journal_path_for(path)
+        self._writer = writer
+        self._reset(data)
+
+    def _reset(self, data):
+        data = project_graph(data)
+        self._fields = {k: v for k, v in data.items() if k not in ("nodes", "links")}
+        self._nodes = {node["id"]: node for node in data.get("nodes", [])}
+        self._links = {link.get("index", i): link for i, link in enumerate(data.get("links", []))}
+        self._pending = 0
+        self._pending_bytes = 0
+        self._first_pending_at = None
+        self.seq = 0
+
+    @property
+    def pending(self):
+        """Number of journaled deltas not yet compacted into the main file."""
+        return self._pending
+
+    def document(self):
+        """Materialize the current state as a regular map document."""
+        doc = {"nodes": list(self._nodes.values()), "links": list(self._links.values())}
+        doc.update(self._fields)
+        return doc
+
+    def node(self, node_id):
+        """Current state of one node, or None (read-only)."""
+        return self._nodes.get(node_id)
+
+    def link(self, index):
+        """Current state of one link, or None (read-only)."""
+        return self._links.get(index)
+
+    def diff(self, data):
+        """
+        Delta that turns the current state into *data*. Changed nodes and
+        links are sent whole as ``added`` (which replaces the record), so
+        keys deleted in *data* are deleted here too; top-level keys missing
+        from *data* are listed in ``removed_fields``.
+
+        Links are matched by their ``index`` like everywhere in this store.
+        The UI renumbers indexes when a link is deleted, so a caller diffing
+        whole documents from the UI should key links by something stable
+        first (see ``autosave.AutosaveStore``).
+        """
+        data = project_graph(data)
+        delta = {}
+        nodes = {node["id"]: node for node in data.get("nodes", [])}
+        links = {link.get("index", i): link for i, link in enumerate(data.get("links", []))}
+        for name, old, new in (("nodes", self._nodes, nodes), ("links", self._links, links)):
+            removed = [key for key in old if key not in new]
+            added = [record for key, record in new.items() if old.get(key) != record]
+            if removed or added:
+                delta[name] = {"removed": removed, "added": added}
+        fields = {k: v for k, v in data.items() if k not in ("nodes", "links") and self._fields.get(k, _MISSING) != v}
+        if fields:
+            delta["fields"] = fields
+        removed_fields = [k for k in self._fields if k not in data]
+        if removed_fields:
+            delta["removed_fields"] = removed_fields
+        return delta
+
+    def _apply(self, delta):
+        nodes = delta.get("nodes") or {}
+        for node_id in nodes.get("removed", ()):
+            self._nodes.pop(node_id, None)
+        for node in nodes.get("added", ()):
+            self._nodes[node["id"]] = project_node(node)
+        for patch in nodes.get("modified", ()):
+            patch = project_node(patch)
+            target = self._nodes.get(patch["id"])
+            if target is None:
+                self._nodes[patch["id"]] = patch
+            else:
+                target.update(patch)
+
+        links = delta.get("links") or {}
+        for index in links.get("removed", ()):
+            self._links.pop(index, None)
+        for link in links.get("added", ()):
+            link = project_link(link)
+            self._links[link["index"]] = link
+        for patch in links.get("modified", ()):
+            patch = project_link(patch)
+            target = self._links.get(patch["index"])
+            if target is None:
+                self._links[patch["index"]] = patch
+            else:
+                target.update(patch)
+
+        for key in delta.get("removed_fields", ()):
+            self._fields.pop(key, None)
+        self._fields.update(delta.get("fields") or {})
+
+    def apply(self, delta):
+        """
+        Append *delta* to the journal, then apply it in memory. The line is
+        fsynced first, so a compaction never writes a delta that was not
+        journaled; when the write fails, neither the journal nor the state
+        changes.
+        """
+        _check_delta(delta)
+        line = json.dumps({"seq": self.seq + 1, "delta": delta}, ensure_ascii=False, separators=(",", ":")) + "\n"
+        data = line.encode("utf-8")
+        self._append(data)
+        self.seq += 1
+        self._apply(delta)
+        self._pending += 1
+        self._pending_bytes += len(data)
+        if self._first_pending_at is None:
+            self._first_pending_at = time.monotonic()
+        if self._pending >= COMPACT_EVERY or self._pending_bytes >= COMPACT_BYTES:
+            self.compact()
+
+    def _append(self, data):
+        with open(self.journal_path, "ab") as f:
+            start = f.tell()
+            try:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                # 書きかけの行を残さない (残すと後から追記した行も読めなくなる)
+                try:
+                    f.truncate(start)
+                except OSError:
+                    pass
+                raise
+
+    def replay_journal(self, compact=True):
+        """
+        Re-apply a journal left behind by a previous session (e.g. after a crash)
+        and fold it into the main file (with ``compact=False`` the journal is
+        only read). A truncated trailing line is ignored.
+        Returns the number of deltas replayed.
+        """
+        if not os.path.exists(self.journal_path):
+            return 0
+        replayed = 0
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._apply(entry["delta"])
+                replayed += 1
+        if not compact:
+            return replayed
+        if replayed:
+            self._pending = replayed
+            self.compact()
+        else:
+            self._discard_journal()
+        return replayed
+
+    def maybe_compact(self, interval=COMPACT_INTERVAL):
+        """Compact when deltas have been pending for longer than *interval* seconds."""
+        if self._first_pending_at is not None and time.monotonic() - self._first_pending_at >= interval:
+            return self.compact()
+        return True
+
+    def compact(self, force=False):
+        """Write the full document to the main file and truncate the journal."""
+        if not self._pending and not force:
+            return True
+        if not self._writer(self.document(), self.path):
+            return False
+        self._discard_journal()
+        self._pending = 0
+        self._pending_bytes = 0
+        self._first_pending_at = None
+        return True
+
+    def reset(self, data):
+        """Adopt *data* as the new baseline after a full save."""
+        self._reset(data)
+        self._discard_journal()
+
+    def close(self):
+        return self.compact()
+
+    def _discard_journal(self):
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,74 @@
+"""Native file dialogs from one long-lived, hidden Tk root.
+
+Every dialog endpoint used to create a new ``tk.Tk()`` and never destroy it,
+leaking a Tcl interpreter and a window per call and paying the Tk start-up
+cost before each dialog. DialogService runs every dialog on one dedicated
+thread (a gevent ThreadPool of size 1, whose task queue serializes the
+requests) that creates a single withdrawn root on first use and keeps it for
+the life of the app. The calling greenlet waits for the result without
+blocking the Eel loop, so other calls keep being served while a dialog is
+open.
+
+Tk has to stay on the thread that created it. On macOS it must be the main
+thread, which Eel's event loop occupies, so there the dialogs run inline on
+a root that is still created only once.
+"""
+import sys
+
+DIALOGS = ("askopenfilename", "asksaveasfilename", "askdirectory")
+
+
+class DialogService:
+    def __init__(self):
+        self._pool = None
+        self._root = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from gevent.threadpool import ThreadPool
+            self._pool = ThreadPool(1)
+        return self._pool
+
+    def _show(self, kind, options):
+        import tkinter as tk
+        from tkinter import filedialog
+
+        if self._root is None:
+            self._root = tk.Tk()
+            self._root.withdraw()
+        root = self._root
+        # 他のウィンドウより手前に表示する
+        root.attributes("-topmost", True)
+        root.lift()
+        path = getattr(filedialog, kind)(parent=root, **options)
+        # 閉じたダイアログのイベントを処理しておく
+        root.update()
+        # キャンセル時は環境によって "" や () が返る
+        return path if isinstance(path, str) else ""
+
+    def ask(self, kind, **options):
+        """
+        Show ``tkinter.filedialog.<kind>`` and return the chosen path ("" when
+        cancelled). Blocks only the calling greenlet.
+        """
+        if kind not in DIALOGS:
+            raise ValueError(f"Unknown dialog: {kind}")
+        if sys.platform == "darwin":
+            return self._show(kind, options)
+        return self.pool.apply(self._show, (kind, options))
+
+    def _destroy_root(self):
+        if self._root is not None:
+            root, self._root = self._root, None
+            root.destroy()
+
+    def close(self):
+        if self._pool is None:
+            return
+        try:
+            self.pool.apply(self._destroy_root)
+        except Exception:
+            pass
+        self._pool.kill()
+        self._pool = None
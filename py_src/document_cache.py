@@ -0,0 +1,160 @@
+"""LRU cache of parsed map documents, validated against the file on disk.
+
+Reopening a map (recent-files list, dialogs) used to parse the whole file
+again even when it had not changed. DocumentCache keeps parsed documents
+keyed by path and validated by a stamp of (mtime_ns, size, inode, device):
+a lookup costs one ``os.stat`` and only a changed file is parsed again.
+
+* The cache is bounded by an estimate of the parsed size (MEMORY_FACTOR
+  times the file size); least-recently-used documents go first.
+* When ``watchdog`` is installed, the directories of cached files are
+  watched (inotify / ReadDirectoryChangesW / FSEvents) and entries are
+  dropped as soon as their file is modified, moved or deleted, so stale
+  documents do not hold memory. Without it the stat check alone keeps
+  lookups correct.
+* ``warm(path)`` parses a file ahead of time on a worker thread (main.py
+  warms the most recently opened map at startup).
+
+Cached documents are shared: callers must treat them as read-only
+(DeltaStore and save_json already copy through project_graph).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+# 読み込んだ JSON は Python のオブジェクトとしてファイルサイズのおよそ 4 倍のメモリを使う
+MEMORY_FACTOR = 4
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino, stat.st_dev
+
+
+# 読み込みだけのイベント (opened / closed_no_write) では捨てない
+CHANGE_EVENTS = ("created", "modified", "moved", "deleted", "closed")
+
+
+class _Watcher:
+    """Drops cache entries when watchdog reports a change to their file."""
+
+    def __init__(self, on_change):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in CHANGE_EVENTS:
+                    return
+                on_change(os.path.abspath(event.src_path))
+                dest = getattr(event, "dest_path", None)
+                if dest:
+                    on_change(os.path.abspath(dest))
+
+        self._handler = Handler()
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._observer.start()
+
+    def watch(self, directory):
+        with self._lock:
+            if directory not in self._watches:
+                self._watches[directory] = self._observer.schedule(self._handler, directory, recursive=False)
+
+    def stop(self):
+        self._observer.stop()
+
+
+class DocumentCache:
+    def __init__(self, loader, max_bytes=MAX_CACHE_BYTES, watch=True):
+        """
+        Args:
+            loader: ``loader(path) -> document`` (main.read_json)
+            max_bytes: 推定メモリ使用量の上限
+            watch: watchdog があればファイルの変更を監視する
+        """
+        self._loader = loader
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # 絶対パス -> (stamp, document, 推定サイズ)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._watcher = None
+        if watch:
+            try:
+                self._watcher = _Watcher(self.invalidate)
+            except Exception:
+                # watchdog が無い環境では stat による検証だけで十分に正しい
+                self._watcher = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._entries
+
+    def get(self, path):
+        """Parsed document for *path*, parsing it only when the file changed since it was cached."""
+        key = os.path.abspath(path)
+        stamp = file_stamp(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+        document = self._loader(path)
+        # 読み込み中に書き換えられた場合はキャッシュしない
+        if file_stamp(key) == stamp:
+            self._put(key, stamp, document)
+        return document
+
+    def warm(self, path):
+        """Parse *path* into the cache on a worker thread (no-op when already cached)."""
+        from gevent import get_hub
+
+        def load():
+            try:
+                self.get(path)
+            except Exception as e:
+                print(f"--- Error warming document cache: {e}")
+
+        return get_hub().threadpool.spawn(load)
+
+    def _put(self, key, stamp, document):
+        size = stamp[1] * MEMORY_FACTOR
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (stamp, document, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        # 監視スレッドは self._lock を取って invalidate するので、ロックの外で登録する
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.watch(os.path.dirname(key))
+
+    def _drop(self, key):
+        # 呼び出し側で self._lock を保持していること
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[2]
+
+    def invalidate(self, path):
+        with self._lock:
+            self._drop(os.path.abspath(path))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def close(self):
+        self.clear()
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
@@ -0,0 +1,238 @@
+"""Open map documents keyed by a document id.
+
+The backend used to track one map through a handful of module globals (the
+current path, its DeltaStore, MapStore, search index, adjacency and subtree
+index), so opening a second map threw away everything built for the first.
+A ``Document`` now owns all of that state for one map, and the
+``DocumentRegistry`` keeps several of them open at once:
+
+    open(path)      the document of *path* (the same one if already open)
+    get(doc_id)     a document by id, or None
+    active          the document the UI last opened (None for an untitled map)
+    rename(doc, p)  the document was saved under another path
+    evict()         keep within the memory budget and drop idle documents
+
+Endpoints take an optional document id and fall back to the active
+document, so a single window keeps working without knowing about ids.
+
+Memory is estimated from the size of the file on disk (a parsed map takes
+several times its JSON size, each index adds more). Over MEMORY_BUDGET or
+MAX_DOCUMENTS, the least recently used documents other than the active one
+lose their indexes first and are closed next; a closed document writes its
+pending journal back to its file, so documents with pending deltas are
+evicted last. Documents unused for IDLE_TIMEOUT seconds are closed as well.
+"""
+import itertools
+import os
+import time
+
+MEMORY_BUDGET = 1536 * 1024 * 1024
+MAX_DOCUMENTS = 12
+IDLE_TIMEOUT = 30 * 60.0
+# ファイルサイズに対するメモリ使用量の目安 (解析済みのドキュメント / インデックス 1 つあたり / メモリマップ)
+LOADED_FACTOR = 6
+INDEX_FACTOR = 2
+MAPPED_FACTOR = 1
+
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Document:
+    def __init__(self, doc_id, path):
+        self.doc_id = doc_id
+        self.path = path
+        self.delta_store = None  # 差分保存の基準 (JSON/.smind を開いた場合)
+        self.map_store = None  # open_map_view で開いた場合の空間インデックス付きマップ
+        self.search_index = None
+        self.adjacency = None  # get_graph_adjacency の応答 (編集されたら作り直す)
+        self.subtree_index = None
+        self.stamp = None  # 最後に読み込み・書き込みしたときのファイルの (mtime, size)
+        self.repairs = None  # 読み込み時にメモリ上で修復した内容 (repair_graph の報告)。保存されるまで残る
+        self.last_used = time.monotonic()
+
+    @property
+    def dirty(self):
+        """Deltas journaled but not yet written back, or a load-time repair not saved yet."""
+        return bool(self.repairs) or (self.delta_store is not None and self.delta_store.pending > 0)
+
+    @property
+    def disk_size(self):
+        return self.stamp[1] if self.stamp else 0
+
+    def memory(self):
+        """Rough number of bytes held for this document."""
+        size = self.disk_size
+        total = 0
+        if self.delta_store is not None:
+            total += size * LOADED_FACTOR
+        if self.map_store is not None:
+            total += size * MAPPED_FACTOR
+        indexes = sum(x is not None for x in (self.search_index, self.adjacency, self.subtree_index))
+        return total + indexes * size * INDEX_FACTOR
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def synced(self):
+        """Remember the file as it is now (after reading or writing it)."""
+        self.stamp = file_stamp(self.path)
+
+    def changed_on_disk(self):
+        """True when the file was modified by someone else since it was last read or written."""
+        return self.stamp is None or file_stamp(self.path) != self.stamp
+
+    def track_writes(self, writer):
+        """Wrap a DeltaStore writer so that compactions keep ``stamp`` up to date."""
+        def write(data, path):
+            ok = writer(data, path)
+            if ok:
+                self.synced()
+                self.repairs = None
+            return ok
+        return write
+
+    def drop_indexes(self):
+        self.search_index = None
+        self.adjacency = None
+        self.subtree_index = None
+
+    def close_delta_store(self):
+        """Write pending journal entries back to the file and drop the DeltaStore."""
+        if self.delta_store is not None:
+            try:
+                self.delta_store.close()
+            except Exception as e:
+                print(f"--- Error compacting journal: {e}")
+            self.delta_store = None
+
+    def close(self):
+        self.close_delta_store()
+        self.map_store = None
+        self.drop_indexes()
+
+    def info(self):
+        return {
+            "doc_id": self.doc_id,
+            "path": self.path,
+            "dirty": self.dirty,
+            "repairs": self.repairs,
+            "view": self.map_store is not None,
+            "memory": self.memory(),
+        }
+
+
+class DocumentRegistry:
+    def __init__(self, budget=MEMORY_BUDGET, max_documents=MAX_DOCUMENTS, idle_timeout=IDLE_TIMEOUT):
+        self.budget = budget
+        self.max_documents = max_documents
+        self.idle_timeout = idle_timeout
+        self.active = None
+        self._documents = {}
+        self._ids = itertools.count(1)
+
+    def __iter__(self):
+        return iter(list(self._documents.values()))
+
+    def __len__(self):
+        return len(self._documents)
+
+    def get(self, doc_id):
+        document = self._documents.get(doc_id)
+        if document is not None:
+            document.touch()
+        return document
+
+    def find(self, path):
+        """The open document of *path*, or None."""
+        key = _path_key(path)
+        for document in self._documents.values():
+            if _path_key(document.path) == key:
+                return document
+        return None
+
+    def open(self, path, activate=True):
+        """The document of *path*, registering a new (empty) one if it is not open yet."""
+        document = self.find(path)
+        if document is None:
+            document = Document(f"doc-{next(self._ids)}", path)
+            self._documents[document.doc_id] = document
+        document.touch()
+        if activate:
+            self.active = document
+        return document
+
+    def activate(self, document):
+        """Make *document* the one endpoints use without a document id (None: an untitled map)."""
+        if document is not None:
+            document.touch()
+        self.active = document
+
+    def rename(self, document, path):
+        """
+        *document* is saved as *path* from now on: its stores and indexes
+        belong to the old file and are dropped, as is another open document
+        of *path* (its file is about to be overwritten).
+        """
+        other = self.find(path)
+        if other is not None and other is not document:
+            self.close(other.doc_id)
+        document.close()
+        document.path = path
+        document.stamp = None
+
+    def close(self, doc_id):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return False
+        document.close()
+        if self.active is document:
+            self.active = None
+        return True
+
+    def close_all(self):
+        for document in self:
+            self.close(document.doc_id)
+
+    def memory(self):
+        return sum(document.memory() for document in self._documents.values())
+
+    def evict(self):
+        """Drop indexes and close idle documents until within budget. Returns the closed ids."""
+        closed = []
+        now = time.monotonic()
+        # アクティブな文書以外を、未反映の差分がないもの・古いものから順に
+        candidates = sorted(
+            (d for d in self._documents.values() if d is not self.active),
+            key=lambda d: (d.dirty, d.last_used),
+        )
+        for document in candidates:
+            if now - document.last_used >= self.idle_timeout:
+                self.close(document.doc_id)
+                closed.append(document.doc_id)
+        for document in candidates:
+            if self.memory() <= self.budget:
+                break
+            document.drop_indexes()
+        for document in candidates:
+            if document.doc_id in closed:
+                continue
+            if self.memory() <= self.budget and len(self._documents) <= self.max_documents:
+                break
+            self.close(document.doc_id)
+            closed.append(document.doc_id)
+        return closed
+
+    def infos(self):
+        """Open documents, most recently used first."""
+        documents = sorted(self._documents.values(), key=lambda d: d.last_used, reverse=True)
+        return [dict(d.info(), active=d is self.active) for d in documents]
+
+
+def _path_key(path):
+    return os.path.normcase(os.path.abspath(path)) if path else None
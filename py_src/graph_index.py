@@ -0,0 +1,200 @@
+"""Hash-map indexes over a map document.
+
+``GraphIndex`` is built once in O(V + E) and answers "node by id", "children
+of", "parents of" and "links touching" in O(1) per lookup, so walks over the
+graph never rescan the link list.
+
+``SubtreeIndex`` keeps the same parent / children maps for the open map,
+keyed by link index and updated from save deltas, for subtree operations
+(collapse, copy/cut, extract, reparent).
+"""
+from py_src.map_schema import endpoint_id
+
+
+class GraphIndex:
+    def __init__(self, data):
+        self.nodes = data.get("nodes", [])
+        self.links = data.get("links", [])
+        self.by_id = {}
+        for node in self.nodes:
+            self.by_id.setdefault(node.get("id"), node)
+
+        # リンクは source -> target を親 -> 子として扱う
+        self.children = {}
+        self.parents = {}
+        self.link_ids = {}
+        for i, link in enumerate(self.links):
+            source = endpoint_id(link.get("source"))
+            target = endpoint_id(link.get("target"))
+            self.children.setdefault(source, []).append(target)
+            self.parents.setdefault(target, []).append(source)
+            self.link_ids.setdefault(source, []).append(i)
+            if target != source:
+                self.link_ids.setdefault(target, []).append(i)
+
+    def root_id(self):
+        """The issue node, or the first node when the map has none."""
+        for node in self.nodes:
+            if node.get("type") == "issue":
+                return node.get("id")
+        return self.nodes[0].get("id") if self.nodes else None
+
+    def walk(self, start=None):
+        """
+        Depth-first pre-order walk yielding ``(node_id, depth)``. Every node is
+        visited once, so cycles and nodes with several parents are safe; nodes
+        not reachable from *start* are walked afterwards as extra roots.
+        """
+        seen = set()
+        starts = [start if start is not None else self.root_id()]
+        starts += [node.get("id") for node in self.nodes]
+        for root in starts:
+            if root is None or root in seen or root not in self.by_id:
+                continue
+            seen.add(root)
+            stack = [(root, 0)]
+            while stack:
+                node_id, depth = stack.pop()
+                yield node_id, depth
+                children = self.children.get(node_id, ())
+                for child in reversed(children):
+                    if child not in seen and child in self.by_id:
+                        seen.add(child)
+                        stack.append((child, depth + 1))
+
+
+class SubtreeIndex:
+    """
+    Parent / children index of the open map, kept up to date from save deltas.
+
+    Links are addressed by their ``index`` like in DeltaStore. A subtree
+    query walks only the nodes below the root (O(subtree size)), and
+    ``apply_delta`` costs O(size of the edit), so collapse, copy/cut and
+    reparenting never rescan the whole link list while the map stays open.
+    """
+
+    def __init__(self, data, path=None):
+        self.path = path
+        self.nodes = set()
+        self.collapsed = set()
+        self.links = {}     # link index -> (source, target)
+        self.children = {}  # node id -> {link index: child id}
+        self.parents = {}   # node id -> {link index: parent id}
+        self._next_index = 0
+        for node in data.get("nodes", []):
+            self._add_node(node)
+        for i, link in enumerate(data.get("links", [])):
+            self._add_link(link.get("index", i), link)
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def _add_node(self, node):
+        node_id = node.get("id")
+        self.nodes.add(node_id)
+        if node.get("collapsed"):
+            self.collapsed.add(node_id)
+        else:
+            self.collapsed.discard(node_id)
+
+    def _remove_node(self, node_id):
+        # リンクは差分の links.removed で別に消える
+        self.nodes.discard(node_id)
+        self.collapsed.discard(node_id)
+
+    def _add_link(self, index, link):
+        self._remove_link(index)
+        source = endpoint_id(link.get("source"))
+        target = endpoint_id(link.get("target"))
+        self.links[index] = (source, target)
+        self.children.setdefault(source, {})[index] = target
+        self.parents.setdefault(target, {})[index] = source
+        if isinstance(index, int) and index >= self._next_index:
+            self._next_index = index + 1
+
+    def _remove_link(self, index):
+        ends = self.links.pop(index, None)
+        if ends is None:
+            return
+        source, target = ends
+        self.children[source].pop(index, None)
+        self.parents[target].pop(index, None)
+
+    def apply_delta(self, delta):
+        """Apply a save_delta payload (same format as DeltaStore)."""
+        nodes = delta.get("nodes") or {}
+        for node_id in nodes.get("removed", ()):
+            self._remove_node(node_id)
+        for node in nodes.get("added", ()):
+            self._add_node(node)
+        for patch in nodes.get("modified", ()):
+            if "collapsed" in patch:
+                self._add_node(patch)
+
+        links = delta.get("links") or {}
+        for index in links.get("removed", ()):
+            self._remove_link(index)
+        for link in links.get("added", ()):
+            self._add_link(link["index"], link)
+        for patch in links.get("modified", ()):
+            if "source" in patch or "target" in patch:
+                source, target = self.links.get(patch["index"], (None, None))
+                self._add_link(patch["index"], {
+                    "source": patch.get("source", source),
+                    "target": patch.get("target", target),
+                })
+
+    def next_link_index(self):
+        """Index for a new link (one past the largest index in use)."""
+        return self._next_index
+
+    def subtree(self, root_id):
+        """
+        ``(node_ids, link_indexes)`` of *root_id* and everything below it, in
+        breadth-first order. Links are those whose both ends are in the
+        subtree; cycles and nodes with several parents are visited once.
+        """
+        if root_id not in self.nodes:
+            return [], []
+        seen = {root_id}
+        order = [root_id]
+        for node_id in order:
+            for child in self.children.get(node_id, {}).values():
+                if child not in seen and child in self.nodes:
+                    seen.add(child)
+                    order.append(child)
+        link_indexes = [
+            index
+            for node_id in order
+            for index, child in self.children.get(node_id, {}).items()
+            if child in seen
+        ]
+        return order, link_indexes
+
+    def hidden_nodes(self):
+        """Ids hidden under a collapsed ancestor (only collapsed subtrees are walked)."""
+        hidden = set()
+        for root_id in self.collapsed:
+            if root_id in hidden:
+                continue
+            node_ids, _ = self.subtree(root_id)
+            hidden.update(node_ids[1:])
+        return hidden
+
+    def reparent_delta(self, node_id, new_parent_id):
+        """
+        Delta moving *node_id* (with its subtree) under *new_parent_id*: the
+        links from its current parents are removed and one parent link is
+        added. Returns None when either node is missing or the move would
+        create a cycle.
+        """
+        if node_id not in self.nodes or new_parent_id not in self.nodes:
+            return None
+        if new_parent_id == node_id or new_parent_id in self.subtree(node_id)[0]:
+            return None
+        return {
+            "links": {
+                "removed": list(self.parents.get(node_id, {})),
+                "added": [{"source": new_parent_id, "target": node_id, "index": self._next_index}],
+            },
+        }
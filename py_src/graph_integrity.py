@@ -0,0 +1,142 @@
+"""Integrity check and repair for map documents, run once when a map is loaded.
+
+Saved maps can contain links whose ``source`` / ``target`` name a node that
+no longer exists, nodes sharing an id, and link ``index``
+values that no longer match the link's position. The UI used to resolve
+these with O(V * E) scans. d3's forceLink also renumbers ``link.index`` to
+the array position on load, so a file with stale indexes made the UI's save
+deltas address the wrong links in DeltaStore.
+
+``repair_graph`` makes one O(V + E) pass with an id -> node hash map:
+
+* nodes without an id, and nodes reusing an id with different content,
+  get a fresh id; exact duplicates are dropped;
+* dict-valued link endpoints are reduced to ids; links whose endpoint is
+  missing are dropped (repeated (source, target) pairs are kept: they may
+  be intended parallel edges);
+* a link ``index`` that disagrees with the link's position is renumbered
+  to it; links without an index are numbered by position anyway and are
+  left as they are.
+
+The input is never modified (it may be shared through the document cache).
+When nothing needs fixing the same document object is returned. The repair
+is deterministic, so repairing the same file again gives the same link
+indexes; callers keep the result in memory and leave the file alone until
+the user saves.
+
+``adjacency_payload`` returns position-based adjacency lists that the UI can
+use directly, instead of rebuilding them from the link list.
+"""
+from py_src.map_schema import endpoint_id
+
+
+def _next_id_factory(ids):
+    numeric = [i for i in ids if isinstance(i, int) and not isinstance(i, bool)]
+    counter = [max(numeric) + 1 if numeric else 1]
+
+    def next_id():
+        while counter[0] in ids:
+            counter[0] += 1
+        new_id = counter[0]
+        ids.add(new_id)
+        return new_id
+
+    return next_id
+
+
+def repair_graph(data):
+    """
+    Returns ``(document, report)``. *report* counts each kind of repair
+    (``renamed_nodes``, ``dropped_nodes``, ``dangling_links``,
+    ``reindexed_links``, ``resolved_endpoints``);
+    all zero means *document* is *data* itself.
+    """
+    nodes = data.get("nodes") or []
+    links = data.get("links") or []
+    report = {
+        "renamed_nodes": 0,
+        "dropped_nodes": 0,
+        "dangling_links": 0,
+        "reindexed_links": 0,
+        "resolved_endpoints": 0,
+    }
+
+    ids = {node.get("id") for node in nodes if isinstance(node, dict)}
+    ids.discard(None)
+    next_id = _next_id_factory(ids)
+    by_id = {}
+    new_nodes = []
+    for node in nodes:
+        if not isinstance(node, dict):
+            report["dropped_nodes"] += 1
+            continue
+        node_id = node.get("id")
+        first = by_id.get(node_id) if node_id is not None else None
+        if node_id is not None and first is None:
+            by_id[node_id] = node
+            new_nodes.append(node)
+        elif first is not None and first == node:
+            # 完全に同じノードが重複している
+            report["dropped_nodes"] += 1
+        else:
+            # id が無い、または内容の異なるノードが同じ id を使っている (リンクは最初のノードにつながる)
+            node = dict(node, id=next_id())
+            by_id[node["id"]] = node
+            new_nodes.append(node)
+            report["renamed_nodes"] += 1
+
+    new_links = []
+    for link in links:
+        if not isinstance(link, dict):
+            report["dangling_links"] += 1
+            continue
+        source = endpoint_id(link.get("source"))
+        target = endpoint_id(link.get("target"))
+        if source not in by_id or target not in by_id:
+            report["dangling_links"] += 1
+            continue
+        position = len(new_links)
+        if source is not link.get("source") or target is not link.get("target"):
+            report["resolved_endpoints"] += 1
+            link = dict(link, source=source, target=target)
+        if "index" in link and link["index"] != position:
+            # index が無いリンクは位置で数える (d3 も DeltaStore も同じ) ので修復ではない
+            report["reindexed_links"] += 1
+            link = dict(link, index=position)
+        new_links.append(link)
+
+    if not any(report.values()):
+        return data, report
+    out = dict(data)
+    out["nodes"] = new_nodes
+    out["links"] = new_links
+    return out, report
+
+
+def adjacency_payload(data):
+    """
+    Adjacency of a repaired document, addressed by node position::
+
+        {"node_ids": [...],            # ノードの id (配列の位置で参照する)
+         "children": [[pos, ...]],     # source -> target
+         "parents": [[pos, ...]],
+         "links": [[link index, ...]]} # そのノードに接続するリンク
+    """
+    nodes = data.get("nodes") or []
+    node_ids = [node.get("id") for node in nodes]
+    position = {node_id: i for i, node_id in enumerate(node_ids)}
+    children = [[] for _ in nodes]
+    parents = [[] for _ in nodes]
+    node_links = [[] for _ in nodes]
+    for i, link in enumerate(data.get("links") or []):
+        source = position.get(endpoint_id(link.get("source")))
+        target = position.get(endpoint_id(link.get("target")))
+        if source is None or target is None:
+            continue
+        index = link.get("index", i)
+        children[source].append(target)
+        parents[target].append(source)
+        node_links[source].append(index)
+        if target != source:
+            node_links[target].append(index)
+    return {"node_ids": node_ids, "children": children, "parents": parents, "links": node_links}
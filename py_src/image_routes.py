@@ -0,0 +1,69 @@
+"""Serve cached images over HTTP from the Eel (bottle) server.
+
+Exposed functions used to hand images to the UI as base64 data URIs inside
+websocket messages, which are JSON-encoded again and hold up every other
+Eel call while they travel. They now return short root-relative URLs such as
+``/_img/ogp/<sha256>``, and the browser fetches the bytes over plain HTTP.
+Names are content hashes, so responses are marked immutable and carry the
+hash as ETag.
+
+Each kind of image is a *store*: ``register_image_store(name, resolver)``
+where ``resolver(digest, query)`` returns ``(path, content_type, digest)`` for
+the file to send (the returned digest may differ when the image had to be
+fetched again), or None.
+"""
+import os
+import re
+from urllib.parse import urlencode
+
+import bottle
+
+IMAGE_ROUTE_PREFIX = "/_img"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_NAME_RE = re.compile(r"([0-9a-f]{64})(\.[a-z]+)?")
+_stores = {}
+
+
+def register_image_store(store, resolver):
+    _stores[store] = resolver
+
+
+def image_url(store, digest, **query):
+    """Root-relative URL of a stored image (independent of the Eel port, so it can be saved in maps)."""
+    url = f"{IMAGE_ROUTE_PREFIX}/{store}/{digest}"
+    query = {k: v for k, v in query.items() if v is not None}
+    if query:
+        url += "?" + urlencode(query)
+    return url
+
+
+def serve_image(store, name):
+    resolver = _stores.get(store)
+    match = _NAME_RE.fullmatch(name)
+    if resolver is None or match is None:
+        return bottle.HTTPError(404, "Not found")
+    digest = match.group(1)
+    etag = f'"{digest}"'
+    if bottle.request.headers.get("If-None-Match") == etag:
+        response = bottle.HTTPResponse(status=304)
+        response.set_header("ETag", etag)
+        response.set_header("Cache-Control", CACHE_CONTROL)
+        return response
+
+    found = resolver(digest, bottle.request.query)
+    if not found:
+        return bottle.HTTPError(404, "Not found")
+    path, content_type, served = found
+    response = bottle.static_file(os.path.basename(path), root=os.path.dirname(path), mimetype=content_type)
+    if response.status_code == 200:
+        response.set_header("ETag", f'"{served}"')
+        # 取り直して別の画像になった場合は、この URL をキャッシュさせない
+        response.set_header("Cache-Control", CACHE_CONTROL if served == digest else "no-cache")
+    return response
+
+
+def register_image_routes(app=None):
+    """Add the image route; call before ``eel.start`` so it wins over Eel's catch-all static route."""
+    app = app or bottle.default_app()
+    app.route(f"{IMAGE_ROUTE_PREFIX}/<store>/<name>", "GET", serve_image)
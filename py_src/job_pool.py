@@ -0,0 +1,293 @@
+"""Process-pool scheduler for long-running backend jobs (layouts, imports, exports,
+node images).
+
+Exposed Eel functions must not run heavy work inline: Eel serves every
+request from one gevent loop, so a multi-second layout freezes the whole UI.
+``JobScheduler.submit`` hands the work to a ``ProcessPoolExecutor`` and
+returns a job id at once. A poller greenlet drains progress messages from the
+workers and reports progress, partial results and completion through the
+``on_progress`` / ``on_done`` callbacks (main.py forwards them to the
+frontend).
+
+Jobs carry a *key* (map path + job kind). Submitting a job whose key matches
+a queued or running job either returns the existing id (same *signature*,
+i.e. a duplicate request) or cancels the stale job and schedules the new one,
+so clicking "Tree layout" twice only ever runs the latest request.
+
+Cancellation reaches a running worker through a shared flag array that the
+worker's progress reporter checks; queued jobs are simply dropped. Every
+job function passes the reporter down to its loop (layout iterations,
+imported lines, exported nodes, rendered images) and stops when it returns
+True.
+"""
+import itertools
+import multiprocessing
+import os
+import queue as queue_module
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+POLL_INTERVAL = 0.05
+IDLE_POLL_INTERVAL = 0.25
+PROGRESS_INTERVAL = 0.1
+PARTIAL_INTERVAL = 1.0
+CANCEL_SLOTS = 1024
+FINISHED_KEEP = 64
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ---- ワーカープロセス側 ----
+
+_progress_queue = None
+_cancel_flags = None
+
+
+def _init_worker(progress_queue, cancel_flags):
+    global _progress_queue, _cancel_flags
+    _progress_queue = progress_queue
+    _cancel_flags = cancel_flags
+
+
+class _Reporter:
+    """
+    Progress callback handed to job functions as ``progress(done, total, snapshot=None)``.
+    Messages are throttled; *snapshot* is a zero-argument callable returning a
+    partial result and is only evaluated every PARTIAL_INTERVAL seconds.
+    Returns True once the job has been cancelled.
+    """
+
+    def __init__(self, job_id, slot):
+        self.job_id = job_id
+        self.slot = slot
+        self.last_progress = 0.0
+        self.last_partial = time.monotonic()
+
+    def cancelled(self):
+        return bool(_cancel_flags[self.slot])
+
+    def __call__(self, done, total, snapshot=None):
+        now = time.monotonic()
+        partial = None
+        if snapshot is not None and now - self.last_partial >= PARTIAL_INTERVAL:
+            partial = snapshot()
+            self.last_partial = now
+        if partial is not None or done >= total or now - self.last_progress >= PROGRESS_INTERVAL:
+            _progress_queue.put((self.job_id, done, total, partial))
+            self.last_progress = now
+        return self.cancelled()
+
+
+def _run_job(job_id, slot, func, args, kwargs):
+    reporter = _Reporter(job_id, slot)
+    if reporter.cancelled():
+        raise JobCancelled()
+    result = func(*args, progress=reporter, **kwargs)
+    if reporter.cancelled():
+        raise JobCancelled()
+    return result
+
+
+# ---- 組み込みのジョブ関数 (ワーカーで実行される) ----
+
+def layout_job(data, layout, options=None, progress=None):
+    from py_src.layout import compute_layout
+    result = compute_layout(data, layout, options, progress=progress)
+    progress(1, 1)
+    return result
+
+
+def import_markdown_job(path, progress=None):
+    from py_src.markdown_import import parse_markdown_file
+    data = parse_markdown_file(path, progress=progress)
+    progress(1, 1)
+    return data
+
+
+def export_job(data, path, fmt=None, progress=None):
+    from py_src.map_export import export_map
+    fmt = export_map(data, path, fmt, progress=progress)
+    progress(1, 1)
+    return fmt
+
+
+def node_image_job(misses, ids_by_key, cache_dir, progress=None):
+    """Render missing node images. Returns ``{node_id: key or None}`` for the rendered nodes."""
+    from py_src.node_images import NodeImageCache
+    # 描画用のブラウザはワーカープロセスごとに一度だけ起動し、以降のジョブで使い回す
+    rendered = NodeImageCache(cache_dir).render(misses, progress=progress)
+    progress(1, 1)
+    return {
+        node_id: key if ok else None
+        for key, ok in rendered.items()
+        for node_id in ids_by_key.get(key, ())
+    }
+
+
+# ---- メインプロセス側 ----
+
+class Job:
+    __slots__ = ("id", "kind", "key", "signature", "status", "done", "total",
+                 "error", "future", "slot", "on_result")
+
+    def __init__(self, job_id, kind, key, signature, slot, on_result):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.signature = signature
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.error = None
+        self.future = None
+        self.slot = slot
+        self.on_result = on_result
+
+    def info(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+        }
+
+
+class JobScheduler:
+    def __init__(self, on_progress=None, on_done=None, max_workers=MAX_WORKERS):
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.max_workers = max_workers
+        self._executor = None
+        self._queue = None
+        self._flags = None
+        self._seq = itertools.count(1)
+        self._active = {}
+        self._by_key = {}
+        self._finished = {}
+
+    def _ensure_pool(self):
+        if self._executor is None:
+            # fork はスレッドを持つプロセスでは安全でないため、全 OS で spawn を使う
+            ctx = multiprocessing.get_context("spawn")
+            self._queue = ctx.Queue()
+            self._flags = ctx.Array("b", CANCEL_SLOTS, lock=False)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self._queue, self._flags),
+            )
+        return self._executor
+
+    def submit(self, kind, key, func, *args, signature=None, on_result=None, **kwargs):
+        """
+        Schedule ``func(*args, progress=..., **kwargs)`` in a worker process.
+        *func* must be a module-level function. *on_result(result)* runs in
+        the main process when the job succeeds. Returns the job id.
+        """
+        job_key = (kind, key)
+        current = self._by_key.get(job_key)
+        if current is not None and current.status in (QUEUED, RUNNING):
+            if signature is not None and current.signature == signature:
+                return current.id
+            self.cancel(current.id)
+
+        executor = self._ensure_pool()
+        job_id = next(self._seq)
+        slot = job_id % CANCEL_SLOTS
+        self._flags[slot] = 0
+        job = Job(job_id, kind, key, signature, slot, on_result)
+        job.future = executor.submit(_run_job, job_id, slot, func, args, kwargs)
+        self._active[job_id] = job
+        self._by_key[job_key] = job
+        return job_id
+
+    def cancel(self, job_id):
+        job = self._active.get(job_id)
+        if job is None:
+            return False
+        self._flags[job.slot] = 1
+        if job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def get(self, job_id):
+        job = self._active.get(job_id) or self._finished.get(job_id)
+        return job.info() if job is not None else None
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.error = error
+        self._active.pop(job.id, None)
+        if self._by_key.get((job.kind, job.key)) is job:
+            del self._by_key[(job.kind, job.key)]
+        job.future = None
+        self._finished[job.id] = job
+        while len(self._finished) > FINISHED_KEEP:
+            self._finished.pop(next(iter(self._finished)))
+
+        if status == DONE and job.on_result is not None:
+            try:
+                job.on_result(result)
+            except Exception as e:
+                print(f"--- Error handling result of job {job.id}: {e}")
+        if self.on_done is not None:
+            self.on_done(job.info(), result if status == DONE else None)
+
+    def poll(self):
+        """Deliver pending progress and completions. Returns True while jobs are active."""
+        if self._executor is None:
+            return False
+
+        while True:
+            try:
+                job_id, done, total, partial = self._queue.get_nowait()
+            except queue_module.Empty:
+                break
+            job = self._active.get(job_id)
+            if job is None or self._flags[job.slot]:
+                continue
+            job.status = RUNNING
+            job.done, job.total = done, total
+            if self.on_progress is not None:
+                self.on_progress(job.info(), partial)
+
+        for job in [j for j in self._active.values() if j.future.done()]:
+            if job.future.cancelled() or self._flags[job.slot]:
+                self._finish(job, CANCELLED)
+                continue
+            error = job.future.exception()
+            if isinstance(error, JobCancelled):
+                self._finish(job, CANCELLED)
+            elif error is not None:
+                message = "".join(traceback.format_exception_only(type(error), error)).strip()
+                self._finish(job, FAILED, error=message)
+            else:
+                self._finish(job, DONE, result=job.future.result())
+        return bool(self._active)
+
+    def run(self, sleep):
+        """Poll forever; *sleep* must yield to the event loop (e.g. ``eel.sleep``)."""
+        while True:
+            active = self.poll()
+            sleep(POLL_INTERVAL if active else IDLE_POLL_INTERVAL)
+
+    def shutdown(self):
+        if self._executor is None:
+            return
+        for job_id in list(self._active):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
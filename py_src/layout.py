@@ -0,0 +1,524 @@
+"""Vectorized layout engine (tree / circle / force) computed on the Python side.
+
+The parent/child forest is built once in O(V + E) with the same rules as
+``web_src/layouts/TreeLayout.ts`` and ``CircleLayout.ts`` (``friend`` links
+are ignored, the first parent in link order wins, selected roots come first,
+then roots by ascending id). Every per-node metric is then computed one tree
+level at a time with NumPy, so the cost is O(V) array work instead of
+per-node JavaScript on the UI thread.
+
+The force layout approximates repulsion on a uniform grid: nodes sharing a
+cell repel each other exactly, the 26 neighbouring cells act as point masses
+at their centroids, and farther cells are ignored, so an iteration is O(V)
+instead of O(V^2).
+
+All entry points return ``{"ids": [...], "fx": [...], "fy": [...], "fz": [...]}``.
+"""
+import math
+
+import numpy as np
+
+from py_src.map_schema import endpoint_id
+
+TREE_DIRECTIONS = ("right", "left", "upper", "lower")
+LAYOUTS = tuple(f"{d}-tree" for d in TREE_DIRECTIONS) + ("circle", "force")
+
+Z_LAYER = -300.0
+
+# TreeLayout.ts と同じ余白
+TREE_PADDING_THICKNESS = 40.0
+TREE_PADDING_LENGTH = 80.0
+TREE_ROOT_PADDING = 200.0
+
+# CircleLayout.ts と同じ基準値
+CIRCLE_BASE_RADIUS = 150.0
+CIRCLE_RADIUS_INCREMENT = 150.0
+CIRCLE_PADDING = 15.0
+CIRCLE_ROOT_PADDING = 150.0
+
+# 斥力計算のグリッド 1 セルあたりの平均ノード数の目安
+FORCE_CELL_OCCUPANCY = 8
+# これより多くのノードが入ったセルは細かいグリッドに分割する (外れ値があると大半のノードが 1 セルに入るため)
+FORCE_MAX_CELL_OCCUPANCY = 64
+FORCE_MAX_SUBDIVISION = 12
+
+
+def _tree_default_size(node):
+    node_type = node.get("type")
+    if node_type == "issue":
+        return 300.0, 200.0
+    if node_type == "task":
+        return 250.0, 150.0
+    if node_type == "3dobject":
+        return 120.0, 120.0
+    if node_type and node_type != "normal":
+        return 250.0, 100.0
+    return 200.0, 120.0
+
+
+def _circle_default_size(node):
+    return 200.0, 80.0
+
+
+def _sort_key(node_id):
+    # id は通常数値だが、文字列が混在しても比較できるようにする
+    return (0, node_id, "") if isinstance(node_id, (int, float)) else (1, 0, str(node_id))
+
+
+class Forest:
+    """Parent/child forest of a map, stored level by level as index arrays."""
+
+    def __init__(self, data, selected_ids=(), default_size=_tree_default_size, reverse_children=False):
+        nodes = data.get("nodes", [])
+        self.nodes = nodes
+        self.ids = [node.get("id") for node in nodes]
+        self.n = n = len(nodes)
+        index_of = {}
+        for i, node_id in enumerate(self.ids):
+            index_of.setdefault(node_id, i)
+        self.index_of = index_of
+
+        width = np.empty(n)
+        height = np.empty(n)
+        for i, node in enumerate(nodes):
+            default_w, default_h = default_size(node)
+            width[i] = node.get("size_x") or default_w
+            height[i] = node.get("size_y") or default_h
+        self.width = width
+        self.height = height
+
+        adjacency = [[] for _ in range(n)]
+        is_target = np.zeros(n, dtype=bool)
+        for link in data.get("links", []):
+            if link.get("type") == "friend":
+                continue
+            source = index_of.get(endpoint_id(link.get("source")))
+            target = index_of.get(endpoint_id(link.get("target")))
+            if source is None or target is None:
+                continue
+            adjacency[source].append(target)
+            is_target[target] = True
+
+        selected = set(selected_ids or ())
+        roots = [i for i in range(n) if not is_target[i]]
+        roots.sort(key=lambda i: (self.ids[i] not in selected, _sort_key(self.ids[i])))
+
+        # BFS で親を割り当てる (リンクの定義順で最初に到達した親が優先)
+        parent = np.full(n, -1, dtype=np.int64)
+        visited = np.zeros(n, dtype=bool)
+        children = [[] for _ in range(n)]
+
+        def traverse(root):
+            visited[root] = True
+            queue = [root]
+            head = 0
+            while head < len(queue):
+                p = queue[head]
+                head += 1
+                for c in adjacency[p]:
+                    if not visited[c]:
+                        visited[c] = True
+                        parent[c] = p
+                        children[p].append(c)
+                        queue.append(c)
+
+        for root in roots:
+            traverse(root)
+        # 親を持たない循環だけの成分は、ノード順で最初のノードを始祖とする
+        for i in range(n):
+            if not visited[i]:
+                roots.append(i)
+                traverse(i)
+
+        if reverse_children:
+            for c in children:
+                c.reverse()
+
+        self.parent = parent
+        self.children = children
+        self.roots = np.array(roots, dtype=np.int64)
+        self.child_count = np.array([len(c) for c in children], dtype=np.int64)
+
+        # 表示順 (兄弟順) で並べたレベルごとのノード配列。各レベルは親ごとに連続する
+        levels = []
+        current = self.roots
+        while len(current):
+            levels.append(current)
+            nxt = [c for p in current for c in children[p]]
+            current = np.array(nxt, dtype=np.int64)
+        self.levels = levels
+
+        tree = np.empty(n, dtype=np.int64)
+        tree[self.roots] = np.arange(len(self.roots))
+        depth = np.zeros(n, dtype=np.int64)
+        for level_no, level in enumerate(levels[1:], start=1):
+            tree[level] = tree[parent[level]]
+            depth[level] = level_no
+        self.tree = tree
+        self.depth = depth
+
+    def subtree(self, root):
+        """Indices of *root* and all of its descendants."""
+        out = [root]
+        head = 0
+        while head < len(out):
+            out.extend(self.children[out[head]])
+            head += 1
+        return np.array(out, dtype=np.int64)
+
+
+def _group_exclusive_cumsum(values, groups):
+    """Exclusive running sum of *values* restarted whenever *groups* changes."""
+    if len(values) == 0:
+        return values
+    cum = np.cumsum(values) - values
+    starts = np.ones(len(groups), dtype=bool)
+    starts[1:] = groups[1:] != groups[:-1]
+    base_pos = np.maximum.accumulate(np.where(starts, np.arange(len(groups)), 0))
+    return cum - cum[base_pos]
+
+
+def _first_last_child(level, parent):
+    """For a level grouped by parent: (parents, first child, last child)."""
+    p = parent[level]
+    starts = np.ones(len(level), dtype=bool)
+    starts[1:] = p[1:] != p[:-1]
+    ends = np.ones(len(level), dtype=bool)
+    ends[:-1] = p[1:] != p[:-1]
+    return p[starts], level[starts], level[ends]
+
+
+def _original_position(node, z_layer):
+    x = node.get("fx") if node.get("fx") is not None else (node.get("x") or 0.0)
+    y = node.get("fy") if node.get("fy") is not None else (node.get("y") or 0.0)
+    if node.get("fz") is not None:
+        z = node["fz"]
+    else:
+        z = node.get("z") if node.get("z") is not None else z_layer
+    return float(x), float(y), float(z)
+
+
+def _result(forest, indices, fx, fy, fz):
+    return {
+        "ids": [forest.ids[i] for i in indices],
+        "fx": fx[indices].tolist(),
+        "fy": fy[indices].tolist(),
+        "fz": fz[indices].tolist(),
+    }
+
+
+def tree_layout(data, direction="right", z_layer=Z_LAYER, selected_ids=(), root_id=None,
+                camera_position=None, camera_right=None, camera_up=None):
+    """
+    Tidy tree in one of four directions (same spacing rules as TreeLayout.ts).
+    With *root_id*, only that subtree is laid out and it is anchored at the
+    root's current position (on the camera plane when camera axes are given).
+    """
+    if direction not in TREE_DIRECTIONS:
+        raise ValueError(f"Unknown tree direction: {direction}")
+    forest = Forest(data, selected_ids, _tree_default_size, reverse_children=True)
+    n = forest.n
+    if n == 0:
+        return {"ids": [], "fx": [], "fy": [], "fz": []}
+
+    vertical = direction in ("upper", "lower")
+    thickness = forest.width if vertical else forest.height
+    length = forest.height if vertical else forest.width
+    parent, levels = forest.parent, forest.levels
+    leaf = forest.child_count == 0
+
+    # 直交方向: 葉は厚み+余白を占有し、内部ノードは子の占有幅の合計
+    extent = np.where(leaf, thickness + TREE_PADDING_THICKNESS, 0.0)
+    for level in reversed(levels[1:]):
+        np.add.at(extent, parent[level], extent[level])
+
+    start = np.zeros(n)
+    for level in levels[1:]:
+        start[level] = start[parent[level]] + _group_exclusive_cumsum(extent[level], parent[level])
+
+    ortho = np.where(leaf, start + thickness / 2, 0.0)
+    for level in reversed(levels[1:]):
+        parents, first, last = _first_last_child(level, parent)
+        ortho[parents] = (ortho[first] + ortho[last]) / 2
+
+    # 進行方向: 親子の長さに応じた適応的な余白
+    offset = np.zeros(n)
+    for level in levels[1:]:
+        p = parent[level]
+        padding = np.maximum(TREE_PADDING_LENGTH, np.maximum(length[p], length[level]) * 0.12)
+        offset[level] = offset[p] + length[p] / 2 + padding + length[level] / 2
+
+    # 独立したツリーを進行方向に並べる
+    tree_count = len(forest.roots)
+    tree_max = np.full(tree_count, -np.inf)
+    np.maximum.at(tree_max, forest.tree, offset + length / 2)
+    shift = np.concatenate(([0.0], np.cumsum(tree_max + TREE_ROOT_PADDING)[:-1]))
+    offset = offset + shift[forest.tree]
+
+    if direction == "right":
+        x, y = offset, ortho
+    elif direction == "left":
+        x, y = -offset, ortho
+    elif direction == "upper":
+        x, y = ortho, -offset
+    else:
+        x, y = ortho, offset
+
+    root = forest.index_of.get(root_id) if root_id is not None else None
+    if root is None:
+        return _result(forest, np.arange(n), x, y, np.full(n, float(z_layer)))
+
+    indices = forest.subtree(root)
+    orig_x, orig_y, orig_z = _original_position(forest.nodes[root], z_layer)
+    if camera_position and abs(orig_z - z_layer) > 0.1:
+        # 画面上の見かけの位置を保ったまま z_layer の平面へ投影する
+        denom = orig_z - camera_position["z"]
+        if abs(denom) > 0.1:
+            t = (z_layer - camera_position["z"]) / denom
+            orig_x = camera_position["x"] + t * (orig_x - camera_position["x"])
+            orig_y = camera_position["y"] + t * (orig_y - camera_position["y"])
+
+    rx = x - x[root]
+    ry = y - y[root]
+    if camera_right and camera_up:
+        fx = orig_x + rx * camera_right["x"] + ry * camera_up["x"]
+        fy = orig_y + rx * camera_right["y"] + ry * camera_up["y"]
+        fz = z_layer + rx * camera_right["z"] + ry * camera_up["z"]
+    else:
+        fx = orig_x + rx
+        fy = orig_y + ry
+        fz = np.full(n, float(z_layer))
+    fx[root], fy[root], fz[root] = orig_x, orig_y, z_layer
+    return _result(forest, indices, fx, fy, fz)
+
+
+def circle_layout(data, z_layer=Z_LAYER, selected_ids=(), base_radius=CIRCLE_BASE_RADIUS,
+                  radius_increment=CIRCLE_RADIUS_INCREMENT):
+    """Radial layout: leaf-count weighted sectors, one ring per tree level."""
+    forest = Forest(data, selected_ids, _circle_default_size)
+    n = forest.n
+    if n == 0:
+        return {"ids": [], "fx": [], "fy": [], "fz": []}
+    parent, levels = forest.parent, forest.levels
+    size = np.maximum(forest.width, forest.height)
+
+    leaves = np.where(forest.child_count == 0, 1.0, 0.0)
+    for level in reversed(levels[1:]):
+        np.add.at(leaves, parent[level], leaves[level])
+
+    span = np.zeros(n)
+    begin = np.zeros(n)
+    angle = np.full(n, math.pi)
+    span[forest.roots] = 2 * math.pi
+    for level in levels[1:]:
+        p = parent[level]
+        span[level] = span[p] * leaves[level] / leaves[p]
+        begin[level] = begin[p] + _group_exclusive_cumsum(span[level], p)
+        angle[level] = begin[level] + span[level] / 2
+
+    # リング半径: レベルごとの最大ノードサイズと、リング上に並ぶノードの合計幅から決める
+    tree_count = len(forest.roots)
+    depth_count = len(levels)
+    key = forest.tree * depth_count + forest.depth
+    ring_max = np.zeros(tree_count * depth_count)
+    np.maximum.at(ring_max, key, size)
+    ring_sum = np.bincount(key, weights=size + CIRCLE_PADDING * 2, minlength=tree_count * depth_count)
+    ring_max = ring_max.reshape(tree_count, depth_count)
+    ring_sum = ring_sum.reshape(tree_count, depth_count)
+
+    radius = np.zeros((tree_count, depth_count))
+    for d in range(1, depth_count):
+        if d == 1:
+            ring = base_radius + ring_max[:, d] / 2
+        else:
+            step = np.maximum(radius_increment, (ring_max[:, d - 1] + ring_max[:, d]) / 2 + CIRCLE_PADDING * 2)
+            ring = radius[:, d - 1] + step
+        radius[:, d] = np.maximum(ring, ring_sum[:, d] / (2 * math.pi))
+
+    r = radius[forest.tree, forest.depth]
+    x = r * np.cos(angle)
+    y = r * np.sin(angle)
+
+    # ツリー同士を X 方向に並べる
+    half = forest.width / 2
+    min_x = np.full(tree_count, np.inf)
+    max_x = np.full(tree_count, -np.inf)
+    np.minimum.at(min_x, forest.tree, x - half)
+    np.maximum.at(max_x, forest.tree, x + half)
+    widths = max_x - min_x
+    offsets = np.concatenate(([0.0], np.cumsum(widths + CIRCLE_ROOT_PADDING)[:-1]))
+    x = x + (offsets - min_x)[forest.tree]
+
+    return _result(forest, np.arange(n), x, y, np.full(n, float(z_layer)))
+
+
+def _grid_repulsion(pos, cell, k2, max_occupancy=FORCE_MAX_CELL_OCCUPANCY, depth=0):
+    """
+    Repulsive displacement on a uniform grid: exact pairwise forces inside a
+    node's own cell; between neighbouring cells (3**dims - 1 of them) the force
+    is evaluated centroid to centroid and shared by every node of the cell.
+    Farther cells are ignored. A cell holding more than *max_occupancy* nodes
+    is handled by the same scheme on a finer grid of its own, so the pairwise
+    pass stays at most ``n * max_occupancy`` pairs however clustered the
+    nodes are.
+    """
+    n, dims = pos.shape
+    cells = np.floor(pos / cell).astype(np.int64)
+    cells -= cells.min(axis=0)
+    extent = cells.max(axis=0) + 3
+    key = np.zeros(n, dtype=np.int64)
+    for d in range(dims):
+        key = key * extent[d] + (cells[:, d] + 1)
+    stride = np.ones(dims, dtype=np.int64)
+    for d in range(dims - 2, -1, -1):
+        stride[d] = stride[d + 1] * extent[d + 1]
+
+    order = np.argsort(key, kind="stable")
+    uniq, first, inverse, counts = np.unique(key[order], return_index=True, return_inverse=True,
+                                             return_counts=True)
+    slot_of = np.empty(n, dtype=np.int64)
+    slot_of[order] = inverse
+    centroid = np.empty((len(uniq), dims))
+    for d in range(dims):
+        centroid[:, d] = np.bincount(slot_of, weights=pos[:, d], minlength=len(uniq)) / counts
+
+    disp = np.zeros_like(pos)
+
+    crowded = counts > max_occupancy if depth < FORCE_MAX_SUBDIVISION else np.zeros(len(uniq), dtype=bool)
+    for slot in np.nonzero(crowded)[0]:
+        members = order[first[slot]:first[slot] + counts[slot]]
+        # 一様に分布していれば 1 セルが max_occupancy 個程度になる大きさに分割する
+        split = np.ceil((counts[slot] / max_occupancy) ** (1.0 / dims))
+        disp[members] += _grid_repulsion(pos[members], cell / max(split, 2.0), k2, max_occupancy, depth + 1)
+
+    # 同じセル内は全ペアを厳密に計算する (分割したセルは除く)
+    cnt = np.where(crowded[slot_of], 0, counts[slot_of])
+    total = int(cnt.sum())
+    src = np.repeat(np.arange(n), cnt)
+    within = np.arange(total) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+    dst = order[np.repeat(first[slot_of], cnt) + within]
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+    delta = pos[src] - pos[dst]
+    scale = k2 / np.maximum((delta * delta).sum(axis=1), 1e-2)
+    for d in range(dims):
+        disp[:, d] += np.bincount(src, weights=delta[:, d] * scale, minlength=n)
+
+    # 隣接セルは重心に集めた質量として扱い、セル単位で一度だけ計算する
+    field = np.zeros((len(uniq), dims))
+    for offset in np.array(np.meshgrid(*([[-1, 0, 1]] * dims), indexing="ij")).reshape(dims, -1).T:
+        if not offset.any():
+            continue
+        target = uniq + int(np.dot(offset, stride))
+        slot = np.minimum(np.searchsorted(uniq, target), len(uniq) - 1)
+        hit = np.nonzero(uniq[slot] == target)[0]
+        if not len(hit):
+            continue
+        delta = centroid[hit] - centroid[slot[hit]]
+        scale = counts[slot[hit]] * k2 / np.maximum((delta * delta).sum(axis=1), 1e-2)
+        field[hit] += delta * scale[:, None]
+    disp += field[slot_of]
+    return disp
+
+
+def force_layout(data, z_layer=Z_LAYER, iterations=100, link_distance=300.0, dims=3,
+                 gravity=0.02, seed=0, cell_occupancy=FORCE_CELL_OCCUPANCY, progress=None):
+    """
+    Fruchterman-Reingold style force layout starting from the current positions.
+    Repulsion is evaluated on a grid whose cell is ``3 * link_distance``, or
+    smaller in dense maps so that a cell holds about *cell_occupancy* nodes.
+    ``progress(done, total, snapshot)`` is called after every iteration when
+    given (``snapshot()`` returns the current positions as a partial result);
+    it may return True to stop early.
+    """
+    nodes = data.get("nodes", [])
+    n = len(nodes)
+    forest_ids = [node.get("id") for node in nodes]
+    if n == 0:
+        return {"ids": [], "fx": [], "fy": [], "fz": []}
+    index_of = {}
+    for i, node_id in enumerate(forest_ids):
+        index_of.setdefault(node_id, i)
+
+    rng = np.random.default_rng(seed)
+    pos = np.empty((n, dims))
+    for i, node in enumerate(nodes):
+        x, y, z = _original_position(node, z_layer)
+        pos[i] = (x, y, z)[:dims]
+    # 同じ座標に重なっているノードを散らす
+    spread = link_distance * max(1.0, n ** (1.0 / dims))
+    pos += rng.uniform(-0.5, 0.5, pos.shape) * (link_distance * 0.1)
+    if np.ptp(pos, axis=0).max() < link_distance:
+        pos = rng.uniform(-spread / 2, spread / 2, pos.shape)
+        if dims == 3:
+            pos[:, 2] = pos[:, 2] * 0.25 + z_layer
+
+    src, dst = [], []
+    for link in data.get("links", []):
+        s = index_of.get(endpoint_id(link.get("source")))
+        t = index_of.get(endpoint_id(link.get("target")))
+        if s is not None and t is not None and s != t:
+            src.append(s)
+            dst.append(t)
+    src = np.array(src, dtype=np.int64)
+    dst = np.array(dst, dtype=np.int64)
+
+    k = float(link_distance)
+    cutoff = 3 * k
+    temperature = spread / 10
+    cooling = temperature / max(iterations, 1)
+    center = pos.mean(axis=0)
+
+    for step in range(iterations):
+        disp = np.zeros_like(pos)
+
+        volume = np.prod(np.maximum(np.ptp(pos, axis=0), k))
+        cell = min(cutoff, (volume / n * cell_occupancy) ** (1.0 / dims))
+        disp += _grid_repulsion(pos, cell, k * k)
+
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.maximum(np.sqrt((delta * delta).sum(axis=1)), 1e-2)
+            pull = delta * (dist / k)[:, None]
+            for d in range(dims):
+                w = pull[:, d]
+                disp[:, d] -= np.bincount(src, weights=w, minlength=n)
+                disp[:, d] += np.bincount(dst, weights=w, minlength=n)
+
+        disp -= (pos - center) * gravity
+
+        length = np.maximum(np.sqrt((disp * disp).sum(axis=1)), 1e-9)
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature = max(temperature - cooling, k * 0.01)
+
+        if progress is not None and progress(step + 1, iterations, lambda: _force_result(forest_ids, pos, z_layer)):
+            break
+
+    return _force_result(forest_ids, pos, z_layer)
+
+
+def _force_result(ids, pos, z_layer):
+    fz = pos[:, 2] if pos.shape[1] == 3 else np.full(len(pos), float(z_layer))
+    return {
+        "ids": ids,
+        "fx": pos[:, 0].tolist(),
+        "fy": pos[:, 1].tolist(),
+        "fz": fz.tolist(),
+    }
+
+
+def compute_layout(data, layout, options=None, progress=None):
+    """
+    Dispatch by layout name: ``right-tree`` / ``left-tree`` / ``upper-tree`` /
+    ``lower-tree`` / ``circle`` / ``force`` (the names used by arrangeNodes).
+    """
+    options = dict(options or {})
+    z_layer = options.pop("z_layer", Z_LAYER)
+    selected_ids = options.pop("selected_ids", ())
+    if layout.endswith("-tree"):
+        return tree_layout(data, layout.split("-")[0], z_layer=z_layer, selected_ids=selected_ids, **options)
+    if layout == "circle":
+        return circle_layout(data, z_layer=z_layer, selected_ids=selected_ids, **options)
+    if layout == "force":
+        return force_layout(data, z_layer=z_layer, progress=progress, **options)
+    raise ValueError(f"Unknown layout: {layout}")
@@ -0,0 +1,152 @@
+"""Export a saved map to Markdown, OPML or an edge-list CSV.
+
+The graph is walked from the ``type == "issue"`` root through a GraphIndex
+built once in O(V + E), and output is written while walking, so export time
+is linear in map size. Each node is emitted once (cycles and multi-parent
+links do not duplicate subtrees); nodes not reachable from the root follow
+as additional top-level entries. The CSV lists every link.
+
+A ``progress(done, total)`` callback (a job's reporter) is called every
+PROGRESS_EVERY nodes or links; when it returns True the export stops and
+the partly written file is removed.
+
+Usage: python -m py_src.map_export input.json output.{md,opml,csv}
+"""
+import csv
+import json
+import os
+import re
+import sys
+
+from py_src.graph_index import GraphIndex
+from py_src.map_schema import endpoint_id
+from py_src.smind_format import is_smind_path, read_smind
+
+EXPORT_FORMATS = ("md", "opml", "csv")
+PROGRESS_EVERY = 1000
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _report(progress, done, total):
+    if progress is not None and done % PROGRESS_EVERY == 0 and progress(done, total):
+        raise _Stopped()
+
+# 取り込み時に "**ラベル**: 本文" から作られた名前を元の書式に戻す
+_LABEL_RE = re.compile(r"【(.*?)】\n(.*)", re.S)
+
+
+def format_for_path(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext == "markdown":
+        ext = "md"
+    return ext if ext in EXPORT_FORMATS else None
+
+
+def _one_line(name):
+    return " ".join(str(name if name is not None else "").split())
+
+
+def _markdown_text(name):
+    name = "" if name is None else str(name)
+    match_label = _LABEL_RE.fullmatch(name)
+    if match_label:
+        return f"**{match_label.group(1)}**: {_one_line(match_label.group(2))}"
+    return _one_line(name)
+
+
+def write_markdown(data, f, progress=None):
+    """H1 for the root, H2 for its children, nested bullets below (mirrors the importer)."""
+    index = GraphIndex(data)
+    total = len(index.by_id)
+    for done, (node_id, depth) in enumerate(index.walk(), 1):
+        _report(progress, done, total)
+        text = _markdown_text(index.by_id[node_id].get("name"))
+        if depth == 0:
+            f.write(f"# {text}\n\n")
+        elif depth == 1:
+            f.write(f"\n## {text}\n\n")
+        else:
+            f.write("  " * (depth - 2) + f"- {text}\n")
+
+
+def write_opml(data, f, progress=None):
+    # xml.sax.saxutils は urllib.request まで読み込むため、起動時ではなく使うときに読み込む
+    from xml.sax.saxutils import quoteattr
+
+    index = GraphIndex(data)
+    title = ""
+    root_id = index.root_id()
+    if root_id is not None:
+        title = _one_line(index.by_id[root_id].get("name"))
+
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n<opml version="2.0">\n')
+    f.write(f"  <head>\n    <title>{quoteattr(title)[1:-1]}</title>\n  </head>\n  <body>\n")
+    open_depth = -1
+    total = len(index.by_id)
+    for done, (node_id, depth) in enumerate(index.walk(), 1):
+        _report(progress, done, total)
+        while open_depth >= depth:
+            f.write("    " + "  " * open_depth + "</outline>\n")
+            open_depth -= 1
+        node = index.by_id[node_id]
+        f.write("    " + "  " * depth + f"<outline text={quoteattr(_one_line(node.get('name')))}>\n")
+        open_depth = depth
+    while open_depth >= 0:
+        f.write("    " + "  " * open_depth + "</outline>\n")
+        open_depth -= 1
+    f.write("  </body>\n</opml>\n")
+
+
+def write_csv(data, f, progress=None):
+    index = GraphIndex(data)
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(["source", "source_name", "target", "target_name", "name"])
+    total = len(index.links)
+    for done, link in enumerate(index.links, 1):
+        _report(progress, done, total)
+        source = endpoint_id(link.get("source"))
+        target = endpoint_id(link.get("target"))
+        writer.writerow([
+            source, index.by_id.get(source, {}).get("name", ""),
+            target, index.by_id.get(target, {}).get("name", ""),
+            link.get("name", ""),
+        ])
+
+
+_WRITERS = {"md": write_markdown, "opml": write_opml, "csv": write_csv}
+
+
+def export_map(data, path, fmt=None, progress=None):
+    """
+    Write *data* to *path* in *fmt* (``md`` / ``opml`` / ``csv``; guessed from
+    the extension when omitted). Returns the format used, or None when
+    *progress* asked to stop (the partial file is removed).
+    """
+    fmt = fmt or format_for_path(path)
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    # Excel で文字化けしないよう CSV は BOM 付き UTF-8 で出力する
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    try:
+        with open(path, "w", encoding=encoding, newline="") as f:
+            _WRITERS[fmt](data, f, progress)
+    except _Stopped:
+        os.remove(path)
+        return None
+    return fmt
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m py_src.map_export <input.json|.smind> <output.md|.opml|.csv>")
+        sys.exit(1)
+    src = sys.argv[1]
+    if is_smind_path(src):
+        source_data = read_smind(src)
+    else:
+        with open(src, "r", encoding="utf-8") as f:
+            source_data = json.load(f)
+    export_map(source_data, sys.argv[2])
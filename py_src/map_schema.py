@@ -0,0 +1,58 @@
+"""Field whitelists for map documents.
+
+Nodes and links coming from the UI carry runtime-only properties added by
+react-force-graph (``vx``, ``__threeObj``, ``_originalX`` ...). The projectors
+below build new compact records containing only the persisted fields, without
+touching the caller's dicts, and resolve link endpoints that were replaced by
+node objects back to plain ids in the same pass.
+"""
+
+# 保存対象のノードのキー
+NODE_KEYS = frozenset([
+    "id", "name", "group", "x", "y", "z", "fx", "fy", "fz", "img", "icon_img",
+    "style_id", "color", "index", "deadline", "priority", "urgency", "disabled",
+    "type", "url", "file_path", "folder_path", "scale", "background",
+    "size_x", "size_y", "rot_x", "rot_y", "groupId", "groupIds",
+    "node_bg_color", "node_pattern_color", "groupShape", "groupColor", "collapsed",
+])
+
+# 保存対象のリンクのキー
+LINK_KEYS = frozenset(["source", "target", "index", "name"])
+
+# ノードの座標・サイズなど数値で保持されるキー
+NODE_NUMERIC_KEYS = ("x", "y", "z", "fx", "fy", "fz", "size_x", "size_y", "rot_x", "rot_y", "scale")
+
+
+def endpoint_id(value):
+    """Return the node id for a link endpoint that may be a node object."""
+    if isinstance(value, dict) and "id" in value:
+        return value["id"]
+    return value
+
+
+def project_node(node, keys=NODE_KEYS):
+    return {k: v for k, v in node.items() if k in keys}
+
+
+def project_link(link, keys=LINK_KEYS):
+    out = {k: v for k, v in link.items() if k in keys}
+    for end in ("source", "target"):
+        if end in out:
+            out[end] = endpoint_id(out[end])
+    return out
+
+
+def project_graph(data):
+    """
+    Return a new document with whitelisted nodes and links. Other top-level
+    keys (groups, camera, globalBackground ...) are kept as they are.
+    """
+    out = {}
+    for key, value in data.items():
+        if key == "nodes":
+            out[key] = [project_node(node) for node in value]
+        elif key == "links":
+            out[key] = [project_link(link) for link in value]
+        else:
+            out[key] = value
+    return out
@@ -0,0 +1,261 @@
+"""Viewport-scoped access to large maps.
+
+The map file is memory-mapped and a uniform grid is built over node
+positions, so the UI can ask for the nodes inside a bounding box (or within N
+hops of a focus node) and page data in as the camera moves instead of
+receiving the whole graph in one message.
+
+For ``.smind`` files only the position columns are decoded up front; node
+records are materialized when they are first returned. JSON files are
+parsed in full (``json.loads`` needs the bytes, so the mapped file is copied
+once and the whole document stays in memory); the mmap only saves memory
+for ``.smind``.
+"""
+import json
+import math
+import mmap
+import os
+from collections import deque
+
+from py_src.map_schema import endpoint_id
+from py_src.smind_format import SmindReader, is_smind_path
+
+# グリッドの1セルの大きさ (ノードの標準サイズ 240x80 の数倍)
+DEFAULT_CELL_SIZE = 1000.0
+DEFAULT_FETCH_LIMIT = 2000
+
+
+def _read_mapped(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if is_smind_path(path):
+                return SmindReader(mm)
+            # JSONはパーサが bytes を要求するため、ここでのみコピーが発生する
+            return json.loads(mm[:])
+
+
+def _bound(bbox, corner, axis, default):
+    # JS からは省略した軸や範囲そのものが null で届くことがある
+    value = ((bbox or {}).get(corner) or {}).get(axis)
+    return default if value is None else value
+
+
+class _JsonNodes:
+    """Adapter giving a parsed JSON document the same interface as SmindReader."""
+
+    def __init__(self, data):
+        self._data = data
+        self._nodes = data.get("nodes", [])
+        self.node_count = len(self._nodes)
+
+    def column(self, key):
+        kinds = bytearray(self.node_count)
+        values = [0.0] * self.node_count
+        for i, node in enumerate(self._nodes):
+            value = node.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                kinds[i] = 1
+                values[i] = value
+        return kinds, values
+
+    def node(self, i):
+        return self._nodes[i]
+
+    def ids(self):
+        return [node.get("id") for node in self._nodes]
+
+    def nodes(self):
+        return self._nodes
+
+    def links(self):
+        return self._data.get("links", [])
+
+    def fields(self):
+        return {k: v for k, v in self._data.items() if k not in ("nodes", "links")}
+
+    def document(self, nodes=None):
+        return self._data
+
+
+class MapStore:
+    """Spatially indexed, lazily materialized map."""
+
+    def __init__(self, path, cell_size=DEFAULT_CELL_SIZE):
+        self.path = path
+        self.cell_size = float(cell_size)
+        source = _read_mapped(path)
+        if isinstance(source, SmindReader):
+            self._source = source
+        else:
+            self._source = _JsonNodes(source or {"nodes": [], "links": []})
+        self.node_count = self._source.node_count
+        self._nodes = {}
+        self._build_index()
+
+    def _position_column(self, fixed, free):
+        # 固定座標 (fx) を優先し、なければ現在座標 (x) を使う
+        fixed_kinds, fixed_values = self._source.column(fixed) or (None, None)
+        free_kinds, free_values = self._source.column(free) or (None, None)
+        out = [0.0] * self.node_count
+        for i in range(self.node_count):
+            if fixed_kinds is not None and fixed_kinds[i] in (1, 2):
+                out[i] = float(fixed_values[i])
+            elif free_kinds is not None and free_kinds[i] in (1, 2):
+                out[i] = float(free_values[i])
+        return out
+
+    def _build_index(self):
+        self.xs = self._position_column("fx", "x")
+        self.ys = self._position_column("fy", "y")
+        self.zs = self._position_column("fz", "z")
+
+        self._ids = self._source.ids()
+        self._index_of = {node_id: i for i, node_id in enumerate(self._ids)}
+
+        cell = self.cell_size
+        self._grid = {}
+        for i in range(self.node_count):
+            key = (math.floor(self.xs[i] / cell), math.floor(self.ys[i] / cell), math.floor(self.zs[i] / cell))
+            bucket = self._grid.get(key)
+            if bucket is None:
+                self._grid[key] = [i]
+            else:
+                bucket.append(i)
+
+        self._adjacency = {}
+        for li, link in enumerate(self._source.links()):
+            for end in (endpoint_id(link.get("source")), endpoint_id(link.get("target"))):
+                self._adjacency.setdefault(end, []).append(li)
+
+    def _node(self, i):
+        node = self._nodes.get(i)
+        if node is None:
+            node = self._nodes[i] = self._source.node(i)
+        return node
+
+    def bounds(self):
+        if not self.node_count:
+            return None
+        return {
+            "min": {"x": min(self.xs), "y": min(self.ys), "z": min(self.zs)},
+            "max": {"x": max(self.xs), "y": max(self.ys), "z": max(self.zs)},
+        }
+
+    def summary(self):
+        """Everything the UI needs before the first page of nodes arrives."""
+        return {
+            "path": self.path,
+            "node_count": self.node_count,
+            "link_count": len(self._source.links()),
+            "bounds": self.bounds(),
+            "fields": self._source.fields(),
+        }
+
+    def document(self):
+        """The full document, reusing node records that were already materialized."""
+        if isinstance(self._source, _JsonNodes):
+            return self._source.document()
+        return self._source.document(nodes=[self._node(i) for i in range(self.node_count)])
+
+    def _indices_in_box(self, lo, hi):
+        cell = self.cell_size
+        c_lo = [math.floor(v / cell) for v in lo]
+        c_hi = [math.floor(v / cell) for v in hi]
+        span = 1
+        for a, b in zip(c_lo, c_hi):
+            span *= (b - a + 1)
+
+        if span > len(self._grid):
+            cells = [bucket for key, bucket in self._grid.items()
+                     if all(c_lo[d] <= key[d] <= c_hi[d] for d in range(3))]
+        else:
+            cells = []
+            for cx in range(c_lo[0], c_hi[0] + 1):
+                for cy in range(c_lo[1], c_hi[1] + 1):
+                    for cz in range(c_lo[2], c_hi[2] + 1):
+                        bucket = self._grid.get((cx, cy, cz))
+                        if bucket:
+                            cells.append(bucket)
+
+        xs, ys, zs = self.xs, self.ys, self.zs
+        for bucket in cells:
+            for i in bucket:
+                if lo[0] <= xs[i] <= hi[0] and lo[1] <= ys[i] <= hi[1] and lo[2] <= zs[i] <= hi[2]:
+                    yield i
+
+    def _links_for(self, indices, known_ids):
+        """Links between the returned nodes, or from them to nodes the UI already has."""
+        ids = {self._ids[i] for i in indices}
+        visible = ids | set(known_ids or ())
+        links = self._source.links()
+        seen = set()
+        out = []
+        for node_id in ids:
+            for li in self._adjacency.get(node_id, ()):
+                if li in seen:
+                    continue
+                seen.add(li)
+                link = links[li]
+                if endpoint_id(link.get("source")) in visible and endpoint_id(link.get("target")) in visible:
+                    out.append(link)
+        return out
+
+    def _page(self, indices, limit, known_ids):
+        known = set(known_ids or ())
+        picked = []
+        truncated = False
+        for i in indices:
+            if self._ids[i] in known:
+                continue
+            if len(picked) >= limit:
+                truncated = True
+                break
+            picked.append(i)
+        return {
+            "nodes": [self._node(i) for i in picked],
+            "links": self._links_for(picked, known_ids),
+            "truncated": truncated,
+        }
+
+    def fetch_box(self, bbox, limit=DEFAULT_FETCH_LIMIT, known_ids=None):
+        """
+        Nodes whose position lies in *bbox* (``{"min": {x,y,z}, "max": {x,y,z}}``;
+        a missing or null axis, corner or bbox is unbounded), skipping ids in
+        *known_ids*.
+        """
+        lo = [_bound(bbox, "min", axis, -math.inf) for axis in "xyz"]
+        hi = [_bound(bbox, "max", axis, math.inf) for axis in "xyz"]
+        if any(math.isinf(v) for v in lo + hi):
+            finite_lo = [v if not math.isinf(v) else min(vals, default=0.0) for v, vals in zip(lo, (self.xs, self.ys, self.zs))]
+            finite_hi = [v if not math.isinf(v) else max(vals, default=0.0) for v, vals in zip(hi, (self.xs, self.ys, self.zs))]
+            lo, hi = finite_lo, finite_hi
+        return self._page(self._indices_in_box(lo, hi), limit, known_ids)
+
+    def fetch_neighborhood(self, node_id, hops=1, limit=DEFAULT_FETCH_LIMIT, known_ids=None):
+        """Nodes within *hops* links of *node_id* in breadth-first order."""
+        start = self._index_of.get(node_id)
+        if start is None:
+            return {"nodes": [], "links": [], "truncated": False}
+
+        links = self._source.links()
+
+        def bfs():
+            seen = {node_id}
+            queue = deque([(node_id, 0)])
+            while queue:
+                current, depth = queue.popleft()
+                index = self._index_of.get(current)
+                if index is not None:
+                    yield index
+                if depth >= hops:
+                    continue
+                for li in self._adjacency.get(current, ()):
+                    link = links[li]
+                    for end in (endpoint_id(link.get("source")), endpoint_id(link.get("target"))):
+                        if end not in seen:
+                            seen.add(end)
+                            queue.append((end, depth + 1))
+
+        return self._page(bfs(), limit, known_ids)
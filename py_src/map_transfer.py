@@ -0,0 +1,159 @@
+"""Chunked transfer of map documents between Python and the UI over Eel.
+
+Loading or saving a large map used to be one Eel message carrying the whole
+document: a 30 MB map became a single JSON frame that both sides held twice
+in memory, and the UI saw nothing until the last byte arrived. A transfer
+session splits the document into ordered batches instead:
+
+Download (load)::
+
+    open_download(document) -> {"session", "fields", "node_count",
+                                "link_count", "chunk_count", "chunk_size"}
+    chunk(session, seq)     -> {"seq", "nodes", "links", "last"}
+    close(session)
+
+Nodes come first, then links, so every link arrives after both of its
+endpoints. The UI pulls chunks by sequence number and decides how many
+requests it keeps in flight, which is the backpressure: nothing is sent that
+was not asked for, and fetching the same chunk again (after a reload or a
+timeout) returns the same batch. Chunks are slices of the loaded document;
+the full JSON is never built.
+
+Upload (save)::
+
+    open_upload(fields)               -> session
+    push(session, seq, nodes, links)  -> number of chunks received
+    finish_upload(session, count)     -> document (None when a chunk is missing)
+
+Chunks may arrive in any order and are joined by sequence number.
+
+Sessions that see no request for SESSION_TTL seconds are dropped, as are the
+least recently used ones beyond MAX_SESSIONS.
+"""
+import secrets
+import time
+
+DEFAULT_CHUNK_ITEMS = 2000
+MAX_CHUNK_ITEMS = 50000
+SESSION_TTL = 120.0
+MAX_SESSIONS = 8
+
+
+class _Download:
+    def __init__(self, document, chunk_size):
+        self.nodes = document.get("nodes") or []
+        self.links = document.get("links") or []
+        self.fields = {k: v for k, v in document.items() if k not in ("nodes", "links")}
+        self.chunk_size = chunk_size
+        self.node_chunks = -(-len(self.nodes) // chunk_size)
+        self.chunk_count = max(self.node_chunks + -(-len(self.links) // chunk_size), 1)
+        self.touched = time.monotonic()
+
+    def chunk(self, seq):
+        size = self.chunk_size
+        nodes, links = [], []
+        if seq < self.node_chunks:
+            nodes = self.nodes[seq * size:(seq + 1) * size]
+        else:
+            start = (seq - self.node_chunks) * size
+            links = self.links[start:start + size]
+        return {"seq": seq, "nodes": nodes, "links": links, "last": seq == self.chunk_count - 1}
+
+
+class _Upload:
+    def __init__(self, fields):
+        self.fields = dict(fields or {})
+        self.chunks = {}  # seq -> (nodes, links)
+        self.touched = time.monotonic()
+
+    def document(self, chunk_count):
+        nodes, links = [], []
+        for seq in range(chunk_count):
+            if seq not in self.chunks:
+                return None
+            chunk_nodes, chunk_links = self.chunks[seq]
+            nodes.extend(chunk_nodes)
+            links.extend(chunk_links)
+        document = {"nodes": nodes, "links": links}
+        document.update(self.fields)
+        return document
+
+
+class TransferSessions:
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _add(self, session):
+        self.expire()
+        while len(self._sessions) >= self.max_sessions:
+            # 放置された古いセッションから捨てる
+            oldest = min(self._sessions, key=lambda key: self._sessions[key].touched)
+            del self._sessions[oldest]
+        session_id = secrets.token_hex(8)
+        self._sessions[session_id] = session
+        return session_id
+
+    def _get(self, session_id, kind):
+        session = self._sessions.get(session_id)
+        if not isinstance(session, kind):
+            return None
+        session.touched = time.monotonic()
+        return session
+
+    def expire(self):
+        now = time.monotonic()
+        for session_id in [k for k, s in self._sessions.items() if now - s.touched > self.ttl]:
+            del self._sessions[session_id]
+
+    def open_download(self, document, chunk_size=DEFAULT_CHUNK_ITEMS):
+        chunk_size = min(max(int(chunk_size), 1), MAX_CHUNK_ITEMS)
+        session = _Download(document, chunk_size)
+        session_id = self._add(session)
+        return {
+            "session": session_id,
+            "fields": session.fields,
+            "node_count": len(session.nodes),
+            "link_count": len(session.links),
+            "chunk_count": session.chunk_count,
+            "chunk_size": chunk_size,
+        }
+
+    def chunk(self, session_id, seq):
+        """Batch *seq* of a download, or None for an unknown session or sequence number."""
+        session = self._get(session_id, _Download)
+        if session is None or not 0 <= seq < session.chunk_count:
+            return None
+        return session.chunk(seq)
+
+    def open_upload(self, fields=None):
+        return self._add(_Upload(fields))
+
+    def push(self, session_id, seq, nodes=(), links=()):
+        """Store batch *seq* of an upload. Returns the number of batches received, or None."""
+        session = self._get(session_id, _Upload)
+        if session is None or seq < 0:
+            return None
+        session.chunks[seq] = (list(nodes or ()), list(links or ()))
+        return len(session.chunks)
+
+    def finish_upload(self, session_id, chunk_count=None):
+        """
+        The uploaded document, joined in sequence order, or None when any of
+        the *chunk_count* batches is missing (the session then stays open so
+        the missing batches can be pushed again).
+        """
+        session = self._get(session_id, _Upload)
+        if session is None:
+            return None
+        document = session.document(len(session.chunks) if chunk_count is None else chunk_count)
+        if document is not None:
+            self.close(session_id)
+        return document
+
+    def close(self, session_id):
+        self._sessions.pop(session_id, None)
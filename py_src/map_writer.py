@@ -0,0 +1,151 @@
+"""Streaming, atomic writer for mind map documents.
+
+The graph is written record by record into a temporary file that lives next to
+the destination and is renamed over it only once everything has been flushed
+to disk, so a crash mid-save can never leave a truncated map behind.
+"""
+import json
+import os
+import tempfile
+import time
+
+# SPACE_MIND_DEBUG_SAVE=1 で保存時のサマリーログを出力する (ドキュメント全体はシリアライズしない)
+DEBUG_SAVE = os.environ.get("SPACE_MIND_DEBUG_SAVE", "") not in ("", "0")
+# SPACE_MIND_COMPACT_SAVE=1 でインデントなしのコンパクト形式で保存する
+COMPACT_SAVE = os.environ.get("SPACE_MIND_COMPACT_SAVE", "") not in ("", "0")
+
+# These keys hold record lists and are streamed one element at a time.
+STREAMED_KEYS = ("nodes", "links")
+
+_WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _read_umask():
+    # os.umask はプロセス全体の設定を書き換えるので、書き込みスレッドが動き出す前の import 時に一度だけ読む
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _read_umask()
+
+
+def _default_file_mode():
+    return 0o666 & ~_UMASK
+
+
+def _indent(text, prefix):
+    return prefix + text.replace("\n", "\n" + prefix)
+
+
+def iter_map_chunks(data, compact=False):
+    """
+    Yield the JSON text of *data* in chunks, one record per chunk for the
+    streamed lists. With ``compact=False`` the output is byte-identical to
+    ``json.dump(data, f, ensure_ascii=False, indent=2)``.
+    """
+    if compact:
+        def encode(value):
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        open_obj, close_obj = "{", "}"
+        item_sep, key_sep = ",", ":"
+        record_prefix, record_sep = "", ","
+        list_open, list_close = "[", "]"
+    else:
+        def encode(value):
+            return json.dumps(value, ensure_ascii=False, indent=2)
+        open_obj, close_obj = "{\n", "\n}"
+        item_sep, key_sep = ",\n", ": "
+        record_prefix, record_sep = "    ", ",\n"
+        list_open, list_close = "[\n", "\n  ]"
+
+    if not data:
+        yield "{}"
+        return
+
+    yield open_obj
+    first = True
+    for key, value in data.items():
+        head = "" if first else item_sep
+        first = False
+        if not compact:
+            head += "  "
+        head += json.dumps(key, ensure_ascii=False) + key_sep
+
+        if key in STREAMED_KEYS and isinstance(value, list) and value:
+            yield head + list_open
+            for i, record in enumerate(value):
+                text = encode(record)
+                if not compact:
+                    text = _indent(text, record_prefix)
+                yield text if i == 0 else record_sep + text
+            yield list_close
+        else:
+            text = encode(value)
+            if not compact:
+                text = text.replace("\n", "\n  ")
+            yield head + text
+    yield close_obj
+
+
+def atomic_write_chunks(path, chunks, binary=False):
+    """
+    Write an iterable of text (or bytes with ``binary=True``) chunks to *path*
+    via a temporary file and ``os.replace``. Returns the number of characters
+    (bytes) written.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory
+    )
+    if binary:
+        open_kwargs = dict(mode="wb", buffering=_WRITE_BUFFER_SIZE)
+    else:
+        open_kwargs = dict(mode="w", encoding="utf-8", newline="", buffering=_WRITE_BUFFER_SIZE)
+    written = 0
+    try:
+        with open(fd, **open_kwargs) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = _default_file_mode()
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return written
+
+
+def write_map(data, path, compact=None):
+    """
+    Stream *data* to *path* atomically.
+
+    Args:
+        data: マップデータ (nodes / links / その他のトップレベルキー)
+        path: 保存先パス
+        compact: True でインデントなし。None の場合は COMPACT_SAVE に従う
+    """
+    if compact is None:
+        compact = COMPACT_SAVE
+
+    start = time.perf_counter()
+    written = atomic_write_chunks(path, iter_map_chunks(data, compact=compact))
+
+    if DEBUG_SAVE:
+        elapsed = (time.perf_counter() - start) * 1000
+        print(
+            f"--- Saved {path}: nodes={len(data.get('nodes', []))} "
+            f"links={len(data.get('links', []))} chars={written} "
+            f"compact={compact} {elapsed:.1f}ms"
+        )
+    return written
@@ -0,0 +1,264 @@
+"""Markdown -> mind map importer.
+
+Lines are consumed from an iterator (the file is never read into memory as a
+whole), patterns are compiled once, and every node is cloned from a shared
+template. The heading/list stack only ever pops entries that were pushed
+once, so a document is processed in linear time.
+
+Supported syntax:
+    # .. ######   headings (the first heading becomes the issue node,
+                  each H2 opens a group)
+    - * +         bullets, nested by indentation (tabs count as 4 spaces)
+    1. / 1)       ordered list items, treated like bullets
+    ``` / ~~~     fenced code blocks, imported as a single node
+    **Label**: x  bold labels become "【Label】\\nx"
+
+A ``progress(done, total)`` callback (a job's reporter) is called every
+PROGRESS_EVERY lines; when it returns True the import stops and returns None.
+"""
+import os
+import re
+
+# フロントエンドの EMPHASIS_BG_COLORS と完全に同じカラーパレット
+GROUP_COLORS = (
+    '#2255aa',  # 青系
+    '#226644',  # 緑系
+    '#886600',  # 黄系
+    '#aa4400',  # 橙系
+    '#993366',  # ピンク系
+    '#553399',  # 紫系
+    '#444444',  # グレー系
+)
+
+TAB_SIZE = 4
+PROGRESS_EVERY = 1000
+
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+_BULLET_RE = re.compile(r"(?:[-*+]|\d{1,9}[.)])\s+(.*)$")
+_FENCE_RE = re.compile(r"(`{3,}|~{3,})")
+
+# すべてのノードはこのテンプレートを複製して作る (キーの順序もこの順になる)
+_NODE_TEMPLATE = {
+    "id": 0,
+    "name": "",
+    "group": 1,
+    "style_id": 1,
+    "x": 0.0,
+    "y": 0.0,
+    "z": 0.0,
+    "fx": 0.0,
+    "fy": 0.0,
+    "fz": -300.0,
+    "type": "normal",
+}
+
+
+def _new_node(node_id, name):
+    node = dict(_NODE_TEMPLATE)
+    node["id"] = node_id
+    node["name"] = name
+    return node
+
+
+def _apply_group(node, group_id, style_id):
+    if group_id is not None:
+        color_idx = (group_id - 1) % len(GROUP_COLORS)
+        node["groupId"] = group_id
+        node["groupIds"] = [group_id]
+        node["color"] = GROUP_COLORS[color_idx]
+        node["node_bg_color"] = color_idx
+        node["node_pattern_color"] = color_idx
+        node["style_id"] = style_id
+    node["size_x"] = 240
+    node["size_y"] = 80
+
+
+def _bullet_text(text):
+    # 太字装飾 (**項目名**)
+    match_bold = _BOLD_RE.match(text)
+    if not match_bold:
+        return text
+    label = match_bold.group(1)
+    rest = text[match_bold.end():].strip()
+    if rest:
+        if rest.startswith(":") or rest.startswith("："):
+            rest = rest[1:].strip()
+        return f"【{label}】\n{rest}"
+    return label
+
+
+class _MindMapBuilder:
+    def __init__(self):
+        self.nodes = []
+        self.links = []
+        self.groups = []
+        # 階層スタック。各要素は (level, node_id, group_id)
+        self.stack = []
+        self.next_node_id = 1
+        self.next_group_id = 1
+        self.current_h_level = 1
+
+    def _parent(self, level):
+        stack = self.stack
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        if stack:
+            return stack[-1][1], stack[-1][2]
+        return 1, None
+
+    def _attach(self, node, parent_id, level, group_id):
+        self.nodes.append(node)
+        self.links.append({
+            "index": len(self.links),
+            "source": parent_id,
+            "target": node["id"],
+            "name": ""
+        })
+        self.stack.append((level, node["id"], group_id))
+
+    def heading(self, h_len, title):
+        self.current_h_level = h_len
+        level = h_len * 4
+
+        node = _new_node(self.next_node_id, title)
+        self.next_node_id += 1
+
+        if node["id"] == 1:
+            # 最初の見出し（ルート）は課題ノード
+            node["type"] = "issue"
+            node["size_x"] = 350
+            node["size_y"] = 100
+            self.nodes.append(node)
+            self.stack.append((level, 1, None))
+            return
+
+        parent_id, group_id = self._parent(level)
+        if h_len == 2:
+            # 新グループ
+            group_id = self.next_group_id
+            self.next_group_id += 1
+            color = GROUP_COLORS[(group_id - 1) % len(GROUP_COLORS)]
+            self.groups.append({"id": group_id, "name": title, "color": color})
+            # 新しいグループタイプのノード仕様に対応
+            node["type"] = "group"
+            node["groupShape"] = "cloud"
+            node["groupColor"] = color
+
+        # H2(グループのトップレベル)のみ強調スタイル、それ以外はノーマルスタイル
+        _apply_group(node, group_id, 4 if h_len == 2 else 1)
+        self._attach(node, parent_id, level, group_id)
+
+    def item(self, indent, text):
+        level = (self.current_h_level * 4) + 4 + indent
+        parent_id, group_id = self._parent(level)
+        node = _new_node(self.next_node_id, text)
+        self.next_node_id += 1
+        # 配下はノーマルスタイル(style_id=1)にする
+        _apply_group(node, group_id, 1)
+        self._attach(node, parent_id, level, group_id)
+
+    def code_block(self, indent, lines):
+        text = "\n".join(lines).strip("\n")
+        if text:
+            self.item(indent, text)
+
+    def result(self):
+        nodes = self.nodes
+        if not nodes:
+            nodes = [{
+                "id": 1,
+                "name": "新規マインドマップ",
+                "group": 1,
+                "style_id": 1,
+                "x": 0.0, "y": 0.0, "z": 0.0,
+                "fx": 0.0, "fy": 0.0, "fz": -300.0,
+                "type": "issue"
+            }]
+        return {
+            "nodes": nodes,
+            "links": self.links,
+            "groups": self.groups,
+            "globalBackground": "sky",
+            "layoutMode": "force"
+        }
+
+
+def parse_markdown_lines(lines, progress=None, total=0):
+    """
+    Build a mind map document from an iterable of Markdown lines. With
+    *progress*, reports the characters read out of *total* and returns None
+    when it asks to stop.
+    """
+    builder = _MindMapBuilder()
+    fence = None  # 現在のコードブロックの (開始記号, インデント, 行リスト)
+    done = 0
+
+    for number, line_raw in enumerate(lines, 1):
+        if progress is not None:
+            done += len(line_raw)
+            if number % PROGRESS_EVERY == 0 and progress(min(done, total), total):
+                return None
+        line_clean = line_raw.strip()
+
+        if fence is not None:
+            marker, indent, code = fence
+            if line_clean.startswith(marker[0] * len(marker)) and not line_clean.strip(marker[0]):
+                builder.code_block(indent, code)
+                fence = None
+            else:
+                code.append(line_raw.rstrip("\r\n"))
+            continue
+
+        if not line_clean:
+            continue
+
+        if line_clean == "---" or line_clean == "***":
+            continue
+
+        # 見出し判定
+        if line_clean[0] == "#":
+            parts = line_clean.split(" ", 1)
+            hashes = parts[0]
+            if hashes.count("#") != len(hashes):
+                continue
+            title = parts[1].strip() if len(parts) > 1 else ""
+            if title:
+                builder.heading(len(hashes), title)
+            continue
+
+        expanded = line_raw.expandtabs(TAB_SIZE) if "\t" in line_raw else line_raw
+        indent = len(expanded) - len(expanded.lstrip())
+
+        match_fence = _FENCE_RE.match(line_clean)
+        if match_fence:
+            fence = (match_fence.group(1), indent, [])
+            continue
+
+        # 箇条書きリスト・番号付きリスト判定
+        match_bullet = _BULLET_RE.match(line_clean)
+        if match_bullet:
+            text = _bullet_text(match_bullet.group(1).strip())
+            if text:
+                builder.item(indent, text)
+
+    if fence is not None:
+        # 閉じられていないコードブロックも取り込む
+        builder.code_block(fence[1], fence[2])
+
+    return builder.result()
+
+
+def parse_markdown_file(filepath, progress=None):
+    """Stream *filepath* through the importer. Returns None if it cannot be read (or was cancelled)."""
+    try:
+        total = os.path.getsize(filepath)
+        f = open(filepath, "r", encoding="utf-8")
+    except Exception as e:
+        print(f"Error reading markdown file: {e}")
+        return None
+    with f:
+        try:
+            return parse_markdown_lines(f, progress, total)
+        except UnicodeDecodeError as e:
+            print(f"Error reading markdown file: {e}")
+            return None
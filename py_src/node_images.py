@@ -0,0 +1,350 @@
+"""Batch node-image renderer with a content-addressed PNG cache.
+
+The old pipeline rendered one node per call (Jinja2 HTML -> wkhtmltoimage ->
+PIL) and saved ``node_img/<id>_<timestamp>.png`` every time, so unchanged
+nodes were rendered again and stale PNGs piled up. Here:
+
+* every node gets a key, the SHA-256 of what its image depends on (name,
+  style_id, size, colors and the embedded icon) plus RENDER_VERSION; the PNG
+  is stored as ``<key[:2]>/<key>.png`` under the cache directory, so nodes
+  that look the same share one file;
+* ``NodeImageCache.plan`` splits a batch into cache hits and one entry per
+  missing key, and only the misses are rendered;
+* rendering goes through one long-lived renderer per process: a headless
+  Chromium page (Playwright) that is reused for every node, or wkhtmltoimage
+  via imgkit when Playwright is not available. The job scheduler keeps its
+  worker processes, so the browser is started once per session;
+* ``NodeImageCache.gc`` deletes images no map references any more. Hits are
+  touched, and files younger than GC_GRACE are kept so images of other
+  recently opened maps survive.
+"""
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+from py_src.map_writer import atomic_write_chunks
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.space_mind_cache/node_img")
+# テンプレートや描画方法を変えたら上げる (古い画像は GC で消える)
+RENDER_VERSION = 2
+DEFAULT_WIDTH = 300
+DEFAULT_HEIGHT = 200
+MAX_SIZE = 4096
+GC_GRACE = 7 * 24 * 3600
+
+COLOR_FIELDS = ("color", "node_bg_color", "node_pattern_color", "node_custom_bg_color")
+
+# node_bg_color / node_pattern_color は色ではなくパレットの番号 (web_src/components/HtmlNodeComponent.tsx と同じ)。
+# 7 は背景ではカスタム色 (node_custom_bg_color)、模様では背景と同じ色 (模様なし)
+CUSTOM_COLOR_INDEX = 7
+BG_COLORS = ("#ddeeff", "#ddffee", "#fffadd", "#ffeedd", "#ffddee", "#eeddff", "#f0f0f0")
+PATTERN_COLORS = ("#4c9ac0", "#3aaa6a", "#c8a000", "#d06020", "#c04070", "#7040c0", "#808080")
+# 強調スタイル (style_id 4) は背景が濃く模様が薄い逆配色
+EMPHASIS_STYLE_ID = 4
+EMPHASIS_BG_COLORS = ("#2255aa", "#226644", "#886600", "#aa4400", "#993366", "#553399", "#444444")
+EMPHASIS_PATTERN_COLORS = ("#d0e8ff", "#ccffee", "#fff8cc", "#ffeedd", "#ffd0e8", "#ead0ff", "#e8e8e8")
+DEFAULT_CUSTOM_BG_COLOR = "#ddeeff"
+
+NODE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>
+html, body { margin: 0; padding: 0; background: transparent; }
+#node {
+  box-sizing: border-box;
+  width: {{ width }}px;
+  height: {{ height }}px;
+  display: flex;
+  flex-direction: column;
+  justify-content: center;
+  align-items: center;
+  gap: 8px;
+  padding: 16px;
+  overflow: hidden;
+  border-radius: 20px;
+  background: {{ background }};
+  border-left: 12px solid {{ pattern }};
+  color: {{ color }};
+  font-family: "Yu Gothic", "Meiryo", "Noto Sans CJK JP", sans-serif;
+  font-size: 24px;
+  text-align: center;
+  word-break: break-all;
+}
+#node img { max-width: 64px; max-height: 64px; }
+</style></head>
+<body><div id="node" class="style-{{ style_id }}">
+{% if icon %}<img src="{{ icon }}">{% endif %}
+<div>{{ name }}</div>
+</div></body></html>
+"""
+
+
+def node_size(node):
+    def clamp(value, default):
+        try:
+            value = int(float(value))
+        except (TypeError, ValueError):
+            return default
+        return min(max(value, 1), MAX_SIZE)
+
+    return clamp(node.get("size_x"), DEFAULT_WIDTH), clamp(node.get("size_y"), DEFAULT_HEIGHT)
+
+
+def image_key(node):
+    """Hash of everything the rendered image depends on."""
+    icon = node.get("icon_img")
+    icon_hash = hashlib.sha256(str(icon).encode("utf-8")).hexdigest() if icon else None
+    fields = [
+        RENDER_VERSION,
+        "" if node.get("name") is None else str(node.get("name")),
+        node.get("style_id"),
+        list(node_size(node)),
+        [node.get(field) for field in COLOR_FIELDS],
+        icon_hash,
+    ]
+    payload = json.dumps(fields, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _palette_index(value):
+    # 数値以外は 0 (UI と同じく 0..7 に丸める)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0
+    return min(max(int(value), 0), CUSTOM_COLOR_INDEX)
+
+
+def node_colors(node):
+    """``(background, pattern, text)`` CSS colors, resolved like HtmlNodeComponent does."""
+    bg_index = _palette_index(node.get("node_bg_color"))
+    pattern_index = _palette_index(node.get("node_pattern_color"))
+    emphasis = (node.get("style_id") or 1) == EMPHASIS_STYLE_ID
+    if bg_index == CUSTOM_COLOR_INDEX:
+        background = node.get("node_custom_bg_color") or DEFAULT_CUSTOM_BG_COLOR
+    else:
+        background = (EMPHASIS_BG_COLORS if emphasis else BG_COLORS)[bg_index]
+    if pattern_index == CUSTOM_COLOR_INDEX:
+        pattern = background
+    else:
+        pattern = (EMPHASIS_PATTERN_COLORS if emphasis else PATTERN_COLORS)[pattern_index]
+    text = pattern if emphasis else node.get("color") or "#222222"
+    return background, pattern, text
+
+
+_template = None
+
+
+def render_html(node):
+    global _template
+    if _template is None:
+        from jinja2 import Environment
+        _template = Environment(autoescape=True).from_string(NODE_TEMPLATE)
+    width, height = node_size(node)
+    icon = node.get("icon_img")
+    if icon and not str(icon).startswith("data:image/"):
+        # 画像データ以外 (ファイル名など) は埋め込まない
+        icon = None
+    background, pattern, color = node_colors(node)
+    return _template.render(
+        width=width,
+        height=height,
+        name="" if node.get("name") is None else node.get("name"),
+        style_id=node.get("style_id") or 1,
+        icon=icon,
+        color=color,
+        background=background,
+        pattern=pattern,
+    )
+
+
+# ---- 描画 ----
+
+def find_wkhtmltoimage():
+    if sys.platform.startswith("win"):
+        # Windows ではアプリに同梱した wkhtmltoimage.exe を使う
+        base = getattr(sys, "_MEIPASS", os.path.abspath("."))
+        bundled = os.path.join(base, "wkhtmltoimage.exe")
+        if os.path.exists(bundled):
+            return bundled
+    found = shutil.which("wkhtmltoimage")
+    if found:
+        return found
+    return "/usr/bin/wkhtmltoimage" if os.path.exists("/usr/bin/wkhtmltoimage") else None
+
+
+class BrowserRenderer:
+    """Headless Chromium page reused for every node (no process per image)."""
+
+    def __init__(self):
+        from playwright.sync_api import sync_playwright
+
+        self._playwright = sync_playwright().start()
+        try:
+            self._browser = self._playwright.chromium.launch()
+            self._page = self._browser.new_page()
+        except Exception:
+            self._playwright.stop()
+            raise
+
+    def render(self, html, width, height):
+        self._page.set_viewport_size({"width": width, "height": height})
+        self._page.set_content(html)
+        return self._page.locator("#node").screenshot(omit_background=True)
+
+    def close(self):
+        try:
+            self._browser.close()
+        finally:
+            self._playwright.stop()
+
+
+class WkhtmlRenderer:
+    """Fallback through imgkit; still one wkhtmltoimage process per image."""
+
+    def __init__(self, executable=None):
+        import imgkit
+
+        executable = executable or find_wkhtmltoimage()
+        if not executable:
+            raise RuntimeError("wkhtmltoimage not found")
+        self._imgkit = imgkit
+        self._config = imgkit.config(wkhtmltoimage=executable)
+
+    def render(self, html, width, height):
+        options = {
+            "format": "png",
+            "width": width,
+            "height": height,
+            "transparent": "",
+            "quiet": "",
+        }
+        return self._imgkit.from_string(html, False, config=self._config, options=options)
+
+    def close(self):
+        pass
+
+
+def open_renderer():
+    """Playwright if it can start, otherwise wkhtmltoimage."""
+    errors = []
+    for renderer_class in (BrowserRenderer, WkhtmlRenderer):
+        try:
+            return renderer_class()
+        except Exception as e:
+            errors.append(f"{renderer_class.__name__}: {e}")
+    raise RuntimeError("No node image renderer available (" + "; ".join(errors) + ")")
+
+
+_renderer = None
+
+
+def shared_renderer():
+    """The renderer of this process, started on first use and closed at exit."""
+    global _renderer
+    if _renderer is None:
+        _renderer = open_renderer()
+        atexit.register(close_shared_renderer)
+    return _renderer
+
+
+def close_shared_renderer():
+    global _renderer
+    if _renderer is not None:
+        renderer, _renderer = _renderer, None
+        renderer.close()
+
+
+# ---- キャッシュ ----
+
+class NodeImageCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def object_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".png")
+
+    def has(self, key):
+        return os.path.exists(self.object_path(key))
+
+    def plan(self, nodes):
+        """
+        ``(keys, misses)``: ``keys`` maps node id -> image key and ``misses``
+        maps each key without an image to one node to render it from.
+        """
+        keys = {}
+        misses = {}
+        checked = set()
+        now = time.time()
+        for node in nodes:
+            node_id = node.get("id")
+            if node_id is None:
+                continue
+            key = image_key(node)
+            keys[node_id] = key
+            if key in checked:
+                continue
+            checked.add(key)
+            try:
+                # 使われた画像は GC で消えないよう更新時刻を進める
+                os.utime(self.object_path(key), (now, now))
+            except OSError:
+                misses[key] = node
+        return keys, misses
+
+    def store(self, key, png):
+        path = self.object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_chunks(path, [png], binary=True)
+        return path
+
+    def render(self, misses, renderer=None, progress=None):
+        """
+        Render ``{key: node}`` and store the PNGs. Returns ``{key: bool}``.
+        ``progress(done, total)`` returning True stops the batch.
+        """
+        renderer = renderer or shared_renderer()
+        results = {}
+        total = len(misses)
+        for done, (key, node) in enumerate(misses.items(), 1):
+            if self.has(key):
+                results[key] = True
+            else:
+                width, height = node_size(node)
+                try:
+                    self.store(key, renderer.render(render_html(node), width, height))
+                    results[key] = True
+                except Exception as e:
+                    print(f"Error rendering node image: {e}")
+                    results[key] = False
+            if progress is not None and progress(done, total):
+                break
+        return results
+
+    def gc(self, referenced, grace=GC_GRACE):
+        """Delete images whose key is not in *referenced* and that were not used within *grace* seconds."""
+        referenced = set(referenced)
+        cutoff = time.time() - grace
+        removed = 0
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                key, ext = os.path.splitext(name)
+                path = os.path.join(shard_dir, name)
+                if ext != ".png" or key in referenced:
+                    continue
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+            try:
+                os.rmdir(shard_dir)
+            except OSError:
+                pass
+        return removed
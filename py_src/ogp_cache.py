@@ -0,0 +1,387 @@
+"""OGP thumbnail fetcher with a content-addressed, size-bounded on-disk cache.
+
+``get_ogp_image`` used to make two uncached ``requests.get`` calls per URL
+node and parse the whole page with BeautifulSoup on every launch. OgpCache
+instead:
+
+* keeps thumbnails on disk under ``objects/<sha256[:2]>/<sha256>`` (identical
+  images shared by several pages are stored once) with an ``index.json``
+  mapping page URL -> image hash, content type, validators and timestamps;
+* serves fresh entries (younger than ``ttl``) without any network access and
+  revalidates stale ones with ``If-None-Match`` / ``If-Modified-Since``, so an
+  unchanged page or image costs a 304;
+* remembers pages without an image for ``negative_ttl``;
+* evicts least-recently-used entries once the objects exceed ``max_bytes``;
+* fetches through one pooled ``requests.Session`` on a bounded gevent thread
+  pool, reading only the page ``<head>`` with the stdlib HTML parser.
+
+Cache hits only touch memory. The index is written when entries changed,
+at most once per FLUSH_INTERVAL (``maybe_flush``) and at exit (``flush``);
+access times ride along with the next write. A failed refetch of a stale
+entry keeps serving the old image and is not retried for RETRY_INTERVAL.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from py_src.map_writer import atomic_write_chunks
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.space_mind_cache/ogp")
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_HEAD_BYTES = 512 * 1024
+CACHE_TTL = 7 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+RETRY_INTERVAL = 3600
+FLUSH_INTERVAL = 5.0
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = 10
+
+INDEX_NAME = "index.json"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+    "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": '"Windows"',
+    "Upgrade-Insecure-Requests": "1",
+}
+
+
+class _HeadParser(HTMLParser):
+    """Collects og:image / twitter:image / icon candidates and stops at <body>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.og_image = None
+        self.twitter_image = None
+        self.icon = None
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.done = True
+            return
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name")
+            content = attrs.get("content")
+            if not content:
+                return
+            if key == "og:image" and self.og_image is None:
+                self.og_image = content
+            elif key == "twitter:image" and self.twitter_image is None:
+                self.twitter_image = content
+        elif tag == "link" and self.icon is None:
+            rel = (attrs.get("rel") or "").lower()
+            if "icon" in rel and attrs.get("href"):
+                self.icon = attrs["href"]
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+    def image_url(self):
+        # OGP 画像、Twitter カード画像、ファビコンの順に採用する
+        return self.og_image or self.twitter_image or self.icon
+
+
+def find_image_url(response, base_url):
+    """Read the page head from a streamed *response* and return the absolute image URL."""
+    parser = _HeadParser()
+    encoding = response.encoding or "utf-8"
+    read = 0
+    for chunk in response.iter_content(chunk_size=16 * 1024):
+        read += len(chunk)
+        parser.feed(chunk.decode(encoding, errors="replace"))
+        if parser.done or read >= MAX_HEAD_BYTES:
+            break
+    img_url = parser.image_url()
+    if not img_url:
+        return None
+    # 相対パスの場合は絶対パスに変換
+    return urljoin(base_url, img_url)
+
+
+def _validators(response):
+    return response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+
+def _conditional_headers(etag, last_modified):
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class OgpCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=MAX_CACHE_BYTES, ttl=CACHE_TTL,
+                 negative_ttl=NEGATIVE_TTL, max_workers=MAX_WORKERS, session=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_workers = max_workers
+        self._session = session
+        self._pool = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flushed_at = 0.0
+        self._entries = self._load_index()
+        self._sizes = {}
+        self._users = {}  # 画像のハッシュ -> それを使っているページ URL の集合
+        self._total = 0
+        for url, entry in self._entries.items():
+            self._link(url, entry)
+
+    # ---- ディスク上の索引とオブジェクト ----
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_NAME)
+
+    def object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # 画像ファイルが消えているエントリは捨てる
+        return {
+            url: entry for url, entry in entries.items()
+            if not entry.get("hash") or os.path.exists(self.object_path(entry["hash"]))
+        }
+
+    def flush(self):
+        """Persist the index if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._entries, ensure_ascii=False, separators=(",", ":"))
+            self._dirty = False
+            self._flushed_at = time.monotonic()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        atomic_write_chunks(self.index_path, [payload])
+
+    def maybe_flush(self):
+        """Persist the index if it changed and was not written in the last FLUSH_INTERVAL seconds."""
+        if self._dirty and time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def _store_object(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_chunks(path, [content], binary=True)
+        return digest
+
+    def read(self, digest):
+        """Image bytes for *digest*, or None when it is not cached."""
+        try:
+            with open(self.object_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def content_type(self, digest):
+        """Content type recorded for *digest* (image/png when unknown)."""
+        with self._lock:
+            for url in self._users.get(digest, ()):
+                return self._entries[url].get("content_type") or "image/png"
+        return "image/png"
+
+    # 以下の _link / _unlink / _release / _evict は self._lock を保持して呼ぶ
+
+    def _link(self, url, entry):
+        digest = entry.get("hash")
+        if not digest:
+            return
+        users = self._users.setdefault(digest, set())
+        users.add(url)
+        if digest not in self._sizes:
+            self._sizes[digest] = entry.get("size", 0)
+            self._total += self._sizes[digest]
+
+    def _unlink(self, url, entry):
+        digest = entry.get("hash")
+        users = self._users.get(digest)
+        if users is not None:
+            users.discard(url)
+
+    def _release(self, digest):
+        """Delete the object for *digest* unless another entry still uses it."""
+        if not digest or self._users.get(digest):
+            return
+        self._users.pop(digest, None)
+        self._total -= self._sizes.pop(digest, 0)
+        try:
+            os.remove(self.object_path(digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        by_age = sorted(self._entries.items(), key=lambda item: item[1].get("accessed_at", 0))
+        for url, entry in by_age:
+            if self._total <= self.max_bytes:
+                break
+            del self._entries[url]
+            self._unlink(url, entry)
+            self._release(entry.get("hash"))
+        self._dirty = True
+
+    # ---- 取得 ----
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from gevent.threadpool import ThreadPool
+            self._pool = ThreadPool(self.max_workers)
+        return self._pool
+
+    def _has_object(self, entry):
+        return bool(entry.get("hash")) and os.path.exists(self.object_path(entry["hash"]))
+
+    def _fresh(self, entry, now):
+        if entry.get("hash") and not self._has_object(entry):
+            return False
+        if now < entry.get("retry_at", 0):
+            # 直前の再取得に失敗したので、しばらくは古い画像をそのまま使う
+            return True
+        ttl = self.ttl if entry.get("hash") else self.negative_ttl
+        return now - entry.get("fetched_at", 0) < ttl
+
+    def _download_image(self, img_url, entry):
+        """Fetch (or revalidate) the image. Returns the updated image fields."""
+        same_image = entry.get("image_url") == img_url and self._has_object(entry)
+        headers = _conditional_headers(entry.get("etag"), entry.get("last_modified")) if same_image else {}
+        with self.session.get(img_url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as response:
+            if response.status_code == 304 and same_image:
+                return {}
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes: {img_url}")
+                chunks.append(chunk)
+            content = b"".join(chunks)
+            etag, last_modified = _validators(response)
+            return {
+                "image_url": img_url,
+                "hash": self._store_object(content),
+                "size": len(content),
+                "content_type": response.headers.get("Content-Type", "image/png").split(";")[0],
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+
+    def _fetch(self, url, entry):
+        """Network part of a lookup; runs on the thread pool."""
+        entry = dict(entry or {})
+        page_headers = {}
+        if self._has_object(entry) or (entry and not entry.get("hash")):
+            page_headers = _conditional_headers(entry.get("page_etag"), entry.get("page_last_modified"))
+        with self.session.get(url, headers=page_headers, timeout=REQUEST_TIMEOUT,
+                              allow_redirects=True, stream=True) as response:
+            if response.status_code == 304 and page_headers:
+                img_url = entry.get("image_url")
+            else:
+                response.raise_for_status()
+                entry["page_etag"], entry["page_last_modified"] = _validators(response)
+                img_url = find_image_url(response, response.url or url)
+
+        if img_url:
+            entry.update(self._download_image(img_url, entry))
+        else:
+            for key in ("image_url", "hash", "size", "content_type", "etag", "last_modified"):
+                entry.pop(key, None)
+        entry["fetched_at"] = time.time()
+        return entry
+
+    def _lookup(self, url):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and self._fresh(entry, now):
+                # アクセス時刻はメモリ上だけで更新し、次に索引を書くときに一緒に保存する
+                entry["accessed_at"] = now
+                return entry
+        try:
+            updated = self._fetch(url, entry)
+        except Exception as e:
+            print(f"Error fetching OGP image: {e}")
+            if entry is not None and entry.get("hash"):
+                # 取得に失敗しても古いキャッシュがあればそれを使う
+                with self._lock:
+                    entry["retry_at"] = now + RETRY_INTERVAL
+                    entry["accessed_at"] = now
+                    self._dirty = True
+                return entry
+            updated = {"fetched_at": now}
+        updated.pop("retry_at", None)
+        updated["accessed_at"] = time.time()
+        with self._lock:
+            previous = self._entries.get(url)
+            if previous is not None:
+                self._unlink(url, previous)
+            self._entries[url] = updated
+            self._link(url, updated)
+            if previous is not None and previous.get("hash") != updated.get("hash"):
+                self._release(previous.get("hash"))
+            self._dirty = True
+            self._evict()
+        return updated
+
+    def get_many(self, urls):
+        """
+        ``{url: entry or None}`` for every URL; entries carry ``hash``,
+        ``content_type`` and ``size``. Duplicate URLs are fetched once and at
+        most ``max_workers`` requests run at a time.
+        """
+        unique = list(dict.fromkeys(u for u in urls if u))
+        if unique:
+            self.session  # ワーカースレッドで同時に作られないよう先に作っておく
+        entries = self.pool.map(self._lookup, unique) if unique else []
+        self.maybe_flush()
+        result = {url: None for url in urls}
+        for url, entry in zip(unique, entries):
+            result[url] = entry if entry.get("hash") else None
+        return result
+
+    def __contains__(self, url):
+        """Whether *url* has an index entry (fetched before, with or without an image)."""
+        with self._lock:
+            return url in self._entries
+
+    def get(self, url):
+        return self.get_many([url]).get(url)
@@ -0,0 +1,248 @@
+"""Most-recently-used map list kept in memory with debounced, atomic saves.
+
+``update_recent_files`` used to read and rewrite
+``~/.space_mind_recent_files.json`` on every open, and the menu re-read it
+every time it was shown. RecentFiles loads the file once, answers from
+memory, and writes at most once per DEBOUNCE seconds (``maybe_flush``) or on
+``flush`` at exit, through a temporary file and ``os.replace``.
+
+The file keeps its original format, a plain list of paths newest first, so
+older builds (which read and rewrite that list) keep working next to this
+one. The metadata for the menu lives in a sidecar file next to it
+(``~/.space_mind_recent_files.meta.json``)::
+
+    {"version": 1, "entries": {"<path>": {"last_opened", "node_count", "link_count", "title"}}}
+
+Paths the sidecar does not know (opened by an older build) keep their place
+in the list and simply have no metadata.
+
+Several app instances can share the files: a save takes a lock file, merges
+the list currently on disk with this instance's changes (a path opened here
+goes in front of entries opened before it; a newer ``last_opened`` on disk
+wins), and writes both files, so one instance does not drop maps opened in
+another. Changes made by other instances are picked up when either file's
+stamp changes. The lock is only tried once on the event
+loop (``maybe_flush``); while another instance holds it the save is retried
+on the next tick. Only ``flush(timeout=...)`` at exit waits for it.
+
+Each entry keeps metadata for the menu (``node_count``, ``link_count``,
+``title``, ``last_opened``) so it can be drawn without opening any map.
+A ``{"version", "entries"}`` document written to the list's path by an
+earlier build of this module is still read and is replaced by the list on
+the next save.
+"""
+import json
+import os
+import time
+
+from py_src.map_writer import atomic_write_chunks
+
+DEFAULT_PATH = os.path.expanduser("~/.space_mind_recent_files.json")
+MAX_ENTRIES = 10
+DEBOUNCE = 2.0
+LOCK_TIMEOUT = 2.0
+# これより古いロックファイルは異常終了したインスタンスの残骸とみなす
+STALE_LOCK = 10.0
+FORMAT_VERSION = 1
+META_SUFFIX = ".meta.json"
+
+META_KEYS = ("node_count", "link_count", "title")
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def meta_path_for(path):
+    return os.path.splitext(path)[0] + META_SUFFIX
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def map_metadata(data):
+    """Menu metadata for a loaded map document."""
+    nodes = data.get("nodes") or []
+    title = None
+    for node in nodes:
+        if isinstance(node, dict) and node.get("type") == "issue":
+            title = node.get("name")
+            break
+    return {
+        "node_count": len(nodes),
+        "link_count": len(data.get("links") or []),
+        "title": title,
+    }
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self._fd = None
+
+    def try_acquire(self):
+        try:
+            self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            return True
+        except FileExistsError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(self.path) > STALE_LOCK:
+                os.remove(self.path)
+                return self.try_acquire()
+        except OSError:
+            pass
+        return False
+
+    def acquire(self, timeout=0.0):
+        """
+        Take the lock, waiting up to *timeout* seconds (0: try once). Never
+        sleep on the event loop: a timeout is only for exit, when it has stopped.
+        """
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class RecentFiles:
+    def __init__(self, path=DEFAULT_PATH, limit=MAX_ENTRIES):
+        self.path = path
+        self.meta_path = meta_path_for(path)
+        self.limit = limit
+        self._entries = []
+        self._changed = {}  # このインスタンスで変更したパス -> エントリ (None は削除)
+        self._dirty_since = None
+        self._stamp = None
+        self._reload()
+
+    def _disk_stamp(self):
+        return _stamp(self.path), _stamp(self.meta_path)
+
+    def _read(self):
+        raw = _load(self.path)
+        if isinstance(raw, dict):
+            # この形式を一覧のファイルに書いていた以前のビルドの内容 (次の保存でパスのリストに戻す)
+            entries = raw.get("entries")
+            return [dict(e) for e in entries or [] if isinstance(e, dict) and isinstance(e.get("path"), str)]
+        paths = [p for p in raw if isinstance(p, str)] if isinstance(raw, list) else []
+        meta = _load(self.meta_path)
+        meta = meta.get("entries") if isinstance(meta, dict) else None
+        meta = meta if isinstance(meta, dict) else {}
+        entries = []
+        for path in dict.fromkeys(paths):
+            entry = {k: v for k, v in (meta.get(path) or {}).items() if k in META_KEYS or k == "last_opened"}
+            entry["path"] = path
+            entry.setdefault("last_opened", 0)
+            entries.append(entry)
+        return entries
+
+    def _merge(self, on_disk):
+        """*on_disk* (in list order) with this instance's changes applied."""
+        current = {e["path"]: e for e in on_disk}
+        merged = [e for e in on_disk if e["path"] not in self._changed]
+        touched = sorted((e for e in self._changed.values() if e is not None), key=lambda e: e["last_opened"])
+        for entry in touched:
+            disk = current.get(entry["path"])
+            if disk is not None and disk.get("last_opened", 0) > entry["last_opened"]:
+                # 他のインスタンスがあとで開いた
+                entry = disk
+            # それより前に開かれたエントリの前に入れる (古いビルドが追加したエントリは 0 扱い)
+            position = next(
+                (i for i, e in enumerate(merged) if e.get("last_opened", 0) <= entry["last_opened"]),
+                len(merged),
+            )
+            merged.insert(position, entry)
+        return merged[:self.limit]
+
+    def _reload(self):
+        self._stamp = self._disk_stamp()
+        self._entries = self._merge(self._read())
+
+    def entries(self):
+        """Entries newest first, each ``{"path", "last_opened", "node_count", "link_count", "title"}``."""
+        if self._disk_stamp() != self._stamp:
+            # 他のインスタンスが書き換えた
+            self._reload()
+        return [dict(e) for e in self._entries]
+
+    def paths(self):
+        return [e["path"] for e in self.entries()]
+
+    def touch(self, path, **metadata):
+        """Move *path* to the front (metadata keys: node_count, link_count, title)."""
+        previous = next((e for e in self._entries if e["path"] == path), {})
+        entry = {key: previous.get(key) for key in META_KEYS if previous.get(key) is not None}
+        entry.update({k: v for k, v in metadata.items() if k in META_KEYS and v is not None})
+        entry["path"] = path
+        entry["last_opened"] = time.time()
+        self._changed[path] = entry
+        self._entries = [entry] + [e for e in self._entries if e["path"] != path]
+        del self._entries[self.limit:]
+        self._mark_dirty()
+
+    def remove(self, path):
+        self._changed[path] = None
+        self._entries = [e for e in self._entries if e["path"] != path]
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+
+    def maybe_flush(self):
+        if self._dirty_since is not None and time.monotonic() - self._dirty_since >= DEBOUNCE:
+            self.flush()
+
+    def flush(self, timeout=None):
+        """
+        Save pending changes. By default the lock is tried once and the save
+        is skipped (still pending) when another instance holds it; with a
+        *timeout* it waits that long and then saves without the lock.
+        Returns whether nothing is left to save.
+        """
+        if self._dirty_since is None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock = _FileLock(self.path)
+        if not lock.acquire(timeout or 0.0) and timeout is None:
+            return False
+        # timeout を指定した場合はロックが取れなくても保存する (マージは直前の内容に対して行う)
+        with lock:
+            entries = self._merge(self._read())
+            meta = {e["path"]: {k: v for k, v in e.items() if k != "path"} for e in entries}
+            payload = json.dumps({"version": FORMAT_VERSION, "entries": meta}, ensure_ascii=False, indent=2)
+            atomic_write_chunks(self.meta_path, [payload])
+            # 一覧は従来どおりパスのリストで書く (古いビルドもそのまま読み書きできる)
+            payload = json.dumps([e["path"] for e in entries], ensure_ascii=False, indent=2)
+            atomic_write_chunks(self.path, [payload])
+        self._entries = entries
+        self._stamp = self._disk_stamp()
+        self._changed = {}
+        self._dirty_since = None
+        return True
@@ -0,0 +1,232 @@
+"""Inverted n-gram index over node names (backs the Find modal).
+
+Names are normalized with NFKC + casefold (so full-width / half-width forms
+and letter case match each other) and whitespace is collapsed. Every
+normalized name is split into character bigrams, which suits Japanese names
+that have no word boundaries. A sorted name list answers prefix queries by
+bisection, and a length-ordered id list lets broad (and one-letter) queries
+stop after *limit* hits instead of scoring every candidate.
+
+Modes:
+    substring  names containing the query (default, same semantics as the
+               old case-insensitive ``includes`` scan), ranked exact match >
+               prefix > shorter names
+    prefix     names starting with the query
+    fuzzy      names sharing at least FUZZY_THRESHOLD of their bigrams with
+               the query (Dice coefficient), best first
+
+The index is updated in place from full documents (``sync``) or save deltas
+(``apply_delta``) so it never has to be rebuilt while a map stays open.
+"""
+import bisect
+import heapq
+import unicodedata
+from collections import Counter
+
+SEARCH_MODES = ("substring", "prefix", "fuzzy")
+DEFAULT_SEARCH_LIMIT = 50
+FUZZY_THRESHOLD = 0.5
+# これ以上のノードが一度に変わるときは並び順を逐次挿入せず最後にまとめて作り直す
+BULK_THRESHOLD = 1000
+
+_PREFIX_END = "\U0010ffff"
+
+
+def normalize(text):
+    return " ".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+
+def bigrams(text):
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SearchIndex:
+    def __init__(self, nodes=(), path=None):
+        self.path = path
+        self._names = {}      # id -> 正規化した名前
+        self._display = {}    # id -> 元の名前
+        self._postings = {}   # bigram -> id の集合
+        self._gram_count = {}  # id -> bigram の種類数 (あいまい検索のスコア計算用)
+        self._sorted_names = []
+        self._sorted_ids = []
+        self._lengths = []
+        self._length_ids = []
+        self._bulk = False
+        self._bulk_load(nodes)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, node):
+        node_id = node.get("id")
+        if node_id is None:
+            return
+        if node_id in self._names:
+            self.remove(node_id)
+        name = node.get("name")
+        name = "" if name is None else str(name)
+        norm = normalize(name)
+        self._names[node_id] = norm
+        self._display[node_id] = name
+        grams = bigrams(norm)
+        self._gram_count[node_id] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(node_id)
+        if self._bulk:
+            return
+        pos = bisect.bisect_right(self._sorted_names, norm)
+        self._sorted_names.insert(pos, norm)
+        self._sorted_ids.insert(pos, node_id)
+        pos = bisect.bisect_right(self._lengths, len(norm))
+        self._lengths.insert(pos, len(norm))
+        self._length_ids.insert(pos, node_id)
+
+    def remove(self, node_id):
+        norm = self._names.pop(node_id, None)
+        if norm is None:
+            return
+        del self._display[node_id]
+        del self._gram_count[node_id]
+        for gram in bigrams(norm):
+            ids = self._postings[gram]
+            ids.discard(node_id)
+            if not ids:
+                del self._postings[gram]
+        if self._bulk:
+            return
+        lo = bisect.bisect_left(self._sorted_names, norm)
+        pos = self._sorted_ids.index(node_id, lo)
+        del self._sorted_names[pos]
+        del self._sorted_ids[pos]
+        lo = bisect.bisect_left(self._lengths, len(norm))
+        pos = self._length_ids.index(node_id, lo)
+        del self._lengths[pos]
+        del self._length_ids[pos]
+
+    def _bulk_load(self, nodes, removed=()):
+        self._bulk = True
+        try:
+            for node_id in removed:
+                self.remove(node_id)
+            for node in nodes:
+                self.add(node)
+        finally:
+            self._bulk = False
+        names = self._names
+        ordered = sorted(names, key=names.__getitem__)
+        self._sorted_names = [names[i] for i in ordered]
+        self._sorted_ids = ordered
+        ordered = sorted(names, key=lambda i: len(names[i]))
+        self._lengths = [len(names[i]) for i in ordered]
+        self._length_ids = ordered
+
+    def sync(self, nodes):
+        """Bring the index in line with *nodes*, touching only added, renamed or removed nodes."""
+        seen = set()
+        changed = []
+        for node in nodes:
+            node_id = node.get("id")
+            seen.add(node_id)
+            name = node.get("name")
+            if self._display.get(node_id) != ("" if name is None else str(name)):
+                changed.append(node)
+        removed = [i for i in self._names if i not in seen]
+        if len(changed) + len(removed) > BULK_THRESHOLD:
+            self._bulk_load(changed, removed)
+            return
+        for node_id in removed:
+            self.remove(node_id)
+        for node in changed:
+            self.add(node)
+
+    def apply_delta(self, delta):
+        """Apply the node part of a save_delta payload."""
+        nodes = delta.get("nodes") or {}
+        for node_id in nodes.get("removed", ()):
+            self.remove(node_id)
+        for node in nodes.get("added", ()):
+            self.add(node)
+        for patch in nodes.get("modified", ()):
+            if "name" in patch:
+                self.add(patch)
+
+    def _prefix_range(self, query):
+        lo = bisect.bisect_left(self._sorted_names, query)
+        hi = bisect.bisect_left(self._sorted_names, query + _PREFIX_END, lo)
+        return lo, hi
+
+    def _prefix_ids(self, query, limit):
+        lo, hi = self._prefix_range(query)
+        if hi - lo > limit:
+            # 候補が多い場合は名前順の先頭から返す (完全一致は常に先頭に来る)
+            return self._sorted_ids[lo:lo + limit]
+        ranked = sorted(range(lo, hi), key=lambda i: (len(self._sorted_names[i]), i))
+        return [self._sorted_ids[i] for i in ranked]
+
+    def _candidates(self, query):
+        postings = []
+        for gram in bigrams(query):
+            ids = self._postings.get(gram)
+            if not ids:
+                return set()
+            postings.append(ids)
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _substring_ids(self, query, limit):
+        found = self._prefix_ids(query, limit)
+        if len(found) >= limit:
+            return found
+        exclude = set(found)
+        names = self._names
+        # 1 文字の検索は bigram で絞り込めないので、全ノードを候補として短い順に走査する
+        candidates = self._candidates(query) if len(query) > 1 else names
+        want = limit - len(found)
+        if len(candidates) ** 2 * 10 > want * len(names):
+            # 候補が多いときは短い名前から順に走査し、必要な件数が揃ったら打ち切る
+            for node_id in self._length_ids:
+                if node_id in candidates and node_id not in exclude and query in names[node_id]:
+                    found.append(node_id)
+                    if len(found) >= limit:
+                        break
+            return found
+        scored = (
+            (len(names[node_id]), node_id)
+            for node_id in candidates
+            if node_id not in exclude and query in names[node_id]
+        )
+        rest = heapq.nsmallest(want, scored, key=lambda s: s[0])
+        return found + [s[1] for s in rest]
+
+    def _fuzzy_ids(self, query, limit):
+        grams = bigrams(query)
+        if not grams:
+            return []
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+        names = self._names
+        gram_count = self._gram_count
+        scored = []
+        for node_id, common in counts.items():
+            dice = 2.0 * common / (len(grams) + gram_count[node_id])
+            if dice >= FUZZY_THRESHOLD:
+                scored.append((-dice, len(names[node_id]), node_id))
+        return [s[2] for s in heapq.nsmallest(limit, scored, key=lambda s: s[:2])]
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT, mode="substring"):
+        """Ranked ``[{"id", "name"}]`` of nodes matching *query*."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        query = normalize(query or "")
+        if not query or limit <= 0:
+            return []
+        if mode == "prefix":
+            ids = self._prefix_ids(query, limit)
+        elif mode == "fuzzy":
+            ids = self._fuzzy_ids(query, limit)
+        else:
+            ids = self._substring_ids(query, limit)
+        return [{"id": node_id, "name": self._display[node_id]} for node_id in ids]
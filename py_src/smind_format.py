@@ -0,0 +1,386 @@
+"""Columnar ``.smind`` container for large maps.
+
+Layout (all integers little-endian)::
+
+    b"SMND" | u16 version | u16 section count
+    section* = u8 tag length | tag | u8 codec | u32 raw size | u32 stored size | payload
+
+Sections (each zlib-compressed on its own):
+
+    META  JSON: counts, top-level key order and fields other than nodes/links,
+          column dtypes
+    SHPE  JSON list of node key orders (shared by every node with the same shape)
+          + u32 shape index per node in SHPI
+    STRS  JSON string table for node names + u32 index per node in NAME
+    C:<k> one per numeric column (id, x, y, fx, size_x ...): u8 kind per node
+          followed by packed float32 or float64 values
+    NRST  JSON list with the remaining fields of each node
+    LNKS  JSON list of links
+
+Numeric columns are packed as float32 whenever every value survives the
+float32 round trip and as float64 otherwise, so converting JSON -> .smind ->
+JSON is lossless (values, int/float types and key order are preserved).
+``lossy_float32=True`` forces float32 for the smallest files.
+
+Truncated or corrupt containers raise SmindFormatError (never a raw
+``struct.error`` / ``zlib.error`` / ``KeyError``) from the header, section
+and column decoders alike.
+
+Usage: python -m py_src.smind_format input.json output.smind
+"""
+import json
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import contextmanager
+
+from py_src.map_schema import NODE_NUMERIC_KEYS
+from py_src.map_writer import atomic_write_chunks, write_map
+
+SMIND_EXTENSION = ".smind"
+MAGIC = b"SMND"
+VERSION = 1
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+_HEADER = struct.Struct("<4sHH")
+_SECTION = struct.Struct("<BII")
+
+# 数値カラムの各ノードの値の種類
+KIND_ABSENT = 0
+KIND_FLOAT = 1
+KIND_INT = 2
+KIND_OTHER = 3  # NRST に格納
+
+# カラムとして格納するノードのキー (id は map_store が全ノードを展開せずに参照できるように含める)
+COLUMN_KEYS = ("id",) + NODE_NUMERIC_KEYS
+
+NO_STRING = 0xFFFFFFFF
+_MAX_EXACT_INT = 1 << 53
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+class SmindFormatError(ValueError):
+    pass
+
+
+# 壊れた・途中で切れたファイルを読んだときに出る例外 (SmindFormatError に変換する)
+_DECODE_ERRORS = (struct.error, zlib.error, ValueError, KeyError, IndexError, TypeError)
+
+
+@contextmanager
+def _decoding(what):
+    try:
+        yield
+    except SmindFormatError:
+        raise
+    except _DECODE_ERRORS as e:
+        raise SmindFormatError(f"{what} is corrupt: {e!r}") from e
+
+
+def is_smind_path(path):
+    return path.lower().endswith(SMIND_EXTENSION)
+
+
+def _column_tag(key):
+    return ("C:" + key).encode("ascii")
+
+
+def _pack_array(values):
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _json_bytes(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _encode_nodes(nodes, lossy_float32):
+    sections = []
+    numeric_keys = set(COLUMN_KEYS)
+
+    shapes, shape_ids = [], {}
+    shape_index = array("I")
+    strings, string_ids = [], {}
+    name_index = array("I")
+    kinds = {key: bytearray(len(nodes)) for key in COLUMN_KEYS}
+    values = {key: [0.0] * len(nodes) for key in COLUMN_KEYS}
+    rest = []
+
+    for i, node in enumerate(nodes):
+        shape = tuple(node.keys())
+        sid = shape_ids.get(shape)
+        if sid is None:
+            sid = shape_ids[shape] = len(shapes)
+            shapes.append(shape)
+        shape_index.append(sid)
+
+        extra = {}
+        name = node.get("name")
+        if isinstance(name, str):
+            nid = string_ids.get(name)
+            if nid is None:
+                nid = string_ids[name] = len(strings)
+                strings.append(name)
+            name_index.append(nid)
+        else:
+            name_index.append(NO_STRING)
+
+        for key, value in node.items():
+            if key == "name" and isinstance(value, str):
+                continue
+            if key in numeric_keys:
+                if isinstance(value, float):
+                    kinds[key][i] = KIND_FLOAT
+                    values[key][i] = value
+                    continue
+                if isinstance(value, int) and not isinstance(value, bool) and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT:
+                    kinds[key][i] = KIND_INT
+                    values[key][i] = float(value)
+                    continue
+                kinds[key][i] = KIND_OTHER
+            extra[key] = value
+        rest.append(extra)
+
+    dtypes = {}
+    for key in COLUMN_KEYS:
+        if not any(kinds[key]):
+            continue
+        packed = array("f", values[key])
+        if (lossy_float32 and key != "id") or array("d", packed) == array("d", values[key]):
+            dtypes[key] = "f"
+        else:
+            packed = array("d", values[key])
+            dtypes[key] = "d"
+        sections.append((_column_tag(key), bytes(kinds[key]) + _pack_array(packed)))
+
+    sections.append((b"SHPE", _json_bytes([list(s) for s in shapes])))
+    sections.append((b"SHPI", _pack_array(shape_index)))
+    sections.append((b"STRS", _json_bytes(strings)))
+    sections.append((b"NAME", _pack_array(name_index)))
+    sections.append((b"NRST", _json_bytes(rest)))
+    return sections, dtypes
+
+
+def iter_smind_chunks(data, lossy_float32=False, level=6):
+    """Yield the encoded container for *data* as a sequence of byte strings."""
+    nodes = data.get("nodes", [])
+    links = data.get("links", [])
+    node_sections, dtypes = _encode_nodes(nodes, lossy_float32)
+    meta = {
+        "node_count": len(nodes),
+        "link_count": len(links),
+        "order": list(data.keys()),
+        "fields": {k: v for k, v in data.items() if k not in ("nodes", "links")},
+        "columns": dtypes,
+    }
+    sections = [(b"META", _json_bytes(meta))] + node_sections + [(b"LNKS", _json_bytes(links))]
+
+    yield _HEADER.pack(MAGIC, VERSION, len(sections))
+    for tag, raw in sections:
+        stored = zlib.compress(raw, level)
+        codec = CODEC_ZLIB
+        if len(stored) >= len(raw):
+            stored, codec = raw, CODEC_RAW
+        yield bytes([len(tag)]) + tag + _SECTION.pack(codec, len(raw), len(stored))
+        yield stored
+
+
+def write_smind(data, path, lossy_float32=False):
+    """Write *data* to *path* as a ``.smind`` container (atomically)."""
+    return atomic_write_chunks(path, iter_smind_chunks(data, lossy_float32=lossy_float32), binary=True)
+
+
+def read_sections(buf):
+    """Parse a container into ``{tag: raw bytes}``. *buf* may be bytes or an mmap."""
+    view = memoryview(buf)
+    if len(view) < _HEADER.size:
+        raise SmindFormatError("file too short")
+    magic, version, count = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise SmindFormatError("not a .smind file")
+    if version > VERSION:
+        raise SmindFormatError(f"unsupported .smind version {version}")
+
+    sections = {}
+    offset = _HEADER.size
+    for index in range(count):
+        with _decoding(f"section header {index}"):
+            tag_len = view[offset]
+            tag = bytes(view[offset + 1:offset + 1 + tag_len])
+            offset += 1 + tag_len
+            codec, raw_size, stored_size = _SECTION.unpack_from(view, offset)
+            offset += _SECTION.size
+        payload = view[offset:offset + stored_size]
+        offset += stored_size
+        if len(payload) != stored_size:
+            raise SmindFormatError(f"section {tag!r} is truncated")
+        with _decoding(f"section {tag!r}"):
+            if codec == CODEC_ZLIB:
+                raw = zlib.decompress(payload)
+            elif codec == CODEC_RAW:
+                raw = bytes(payload)
+            else:
+                raise SmindFormatError(f"unknown codec {codec}")
+            if len(raw) != raw_size:
+                raise SmindFormatError(f"section {tag!r} is corrupt")
+            sections[tag.decode("ascii")] = raw
+    return sections
+
+
+class SmindReader:
+    """
+    Lazy view over a decoded container. Numeric columns can be read without
+    materializing any node dict; node records are built on demand.
+    """
+
+    def __init__(self, buf):
+        self.sections = read_sections(buf)
+        with _decoding("META"):
+            self.meta = json.loads(self.sections["META"])
+            self.node_count = int(self.meta["node_count"])
+            self.link_count = int(self.meta["link_count"])
+            if not all(key in self.meta for key in ("columns", "order", "fields")):
+                raise SmindFormatError("META is incomplete")
+        self._columns = {}
+        self._tables = None
+        self._links = None
+
+    def column(self, key):
+        """Return ``(kinds, values)`` for a numeric column, or None if absent."""
+        column = self._columns.get(key)
+        if column is None:
+            typecode = self.meta["columns"].get(key)
+            if typecode is None:
+                return None
+            with _decoding(f"column {key!r}"):
+                raw = self.sections["C:" + key]
+                values = _unpack_array(typecode, raw[self.node_count:])
+                if len(raw) < self.node_count or len(values) != self.node_count:
+                    raise SmindFormatError(f"column {key!r} does not have {self.node_count} values")
+                column = self._columns[key] = (raw[:self.node_count], values)
+        return column
+
+    def _node_tables(self):
+        if self._tables is None:
+            with _decoding("node tables"):
+                tables = (
+                    json.loads(self.sections["SHPE"]),
+                    _unpack_array("I", self.sections["SHPI"]),
+                    json.loads(self.sections["STRS"]),
+                    _unpack_array("I", self.sections["NAME"]),
+                    json.loads(self.sections["NRST"]),
+                )
+            if any(len(tables[t]) != self.node_count for t in (1, 3, 4)):
+                raise SmindFormatError(f"node tables do not have {self.node_count} entries")
+            self._tables = tables
+        return self._tables
+
+    def node(self, i):
+        shapes, shape_index, strings, name_index, rest = self._node_tables()
+        with _decoding(f"node {i}"):
+            return self._decode_node(i, shapes[shape_index[i]], strings, name_index[i], rest[i])
+
+    def _decode_node(self, i, shape, strings, name_at, extra):
+        node = {}
+        for key in shape:
+            column = self.column(key) if key in self.meta["columns"] else None
+            if column is not None:
+                kind = column[0][i]
+                if kind == KIND_FLOAT:
+                    node[key] = column[1][i]
+                    continue
+                if kind == KIND_INT:
+                    node[key] = int(column[1][i])
+                    continue
+            if key == "name" and name_at != NO_STRING:
+                node[key] = strings[name_at]
+            else:
+                node[key] = extra[key]
+        return node
+
+    def nodes(self):
+        return [self.node(i) for i in range(self.node_count)]
+
+    def ids(self):
+        """Node ids in file order, decoding a node only when its id is not numeric."""
+        column = self.column("id")
+        if column is None:
+            return [self.node(i).get("id") for i in range(self.node_count)]
+        kinds, values = column
+        ids = []
+        for i in range(self.node_count):
+            kind = kinds[i]
+            if kind == KIND_INT:
+                ids.append(int(values[i]))
+            elif kind == KIND_FLOAT:
+                ids.append(values[i])
+            else:
+                ids.append(self.node(i).get("id"))
+        return ids
+
+    def links(self):
+        if self._links is None:
+            with _decoding("LNKS"):
+                self._links = json.loads(self.sections["LNKS"])
+        return self._links
+
+    def fields(self):
+        """Top-level fields other than nodes/links (camera, groups ...)."""
+        return dict(self.meta["fields"])
+
+    def document(self, nodes=None):
+        data = {}
+        for key in self.meta["order"]:
+            if key == "nodes":
+                data[key] = self.nodes() if nodes is None else nodes
+            elif key == "links":
+                data[key] = self.links()
+            else:
+                data[key] = self.meta["fields"][key]
+        return data
+
+
+def decode_smind(buf):
+    """Decode container bytes back into a regular map document."""
+    return SmindReader(buf).document()
+
+
+def read_smind(path):
+    with open(path, "rb") as f:
+        return decode_smind(f.read())
+
+
+def convert(src, dst, lossy_float32=False):
+    """Convert between ``.json`` and ``.smind`` based on the file extensions."""
+    if is_smind_path(src):
+        data = read_smind(src)
+    else:
+        with open(src, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    if is_smind_path(dst):
+        write_smind(data, dst, lossy_float32=lossy_float32)
+    else:
+        write_map(data, dst)
+    return data
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) != 2:
+        print("Usage: python -m py_src.smind_format [--lossy-float32] <input> <output>")
+        sys.exit(1)
+    convert(args[0], args[1], lossy_float32="--lossy-float32" in sys.argv)
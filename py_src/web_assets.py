@@ -0,0 +1,91 @@
+"""Serve the built frontend with the Eel port filled in at request time.
+
+The production build hard-codes the development port: ``index.html`` loads
+``http://localhost:5169/eel.js`` and the bundle calls
+``eel.set_host('ws://localhost:5169')``. start_eel used to walk the asset
+tree and regex-rewrite both files on disk on every launch, which cost time
+and fails on read-only installs. Instead, routes for exactly those two files
+are registered ahead of Eel's static route; they substitute the chosen port
+while serving and keep the rewritten bytes in memory (re-read only when the
+file on disk changes). The dist files are never modified.
+"""
+import os
+import re
+
+import bottle
+
+EEL_JS_RE = re.compile(rb"http://localhost:\d+/eel\.js")
+WEBSOCKET_RE = re.compile(rb"ws://localhost:\d+")
+# index.html が読み込むエントリバンドル (Vite の base が "/" でも "./" でもよいようにする)
+ENTRY_SCRIPT_RE = re.compile(rb"""<script\b[^>]*\bsrc=["'](?:\.?/)?assets/([^"'/?#]+\.js)["']""")
+# ポートは起動ごとに変わるので、ブラウザにキャッシュさせない
+CACHE_CONTROL = "no-store"
+
+
+def find_bundle(root):
+    """
+    The entry bundle that ``<root>/index.html`` loads from ``<root>/assets``, or
+    None. Stale ``index-*.js`` files left over from older builds are ignored.
+    """
+    try:
+        with open(os.path.join(root, "index.html"), "rb") as f:
+            html = f.read()
+    except OSError:
+        return None
+    match = ENTRY_SCRIPT_RE.search(html)
+    if match is None:
+        return None
+    path = os.path.join(root, "assets", match.group(1).decode("utf-8"))
+    return path if os.path.isfile(path) else None
+
+
+class PortInjectedFile:
+    """A file served with the first match of *pattern* replaced by *replacement*."""
+
+    def __init__(self, path, pattern, replacement, content_type):
+        self.path = path
+        self.pattern = pattern
+        self.replacement = replacement
+        self.content_type = content_type
+        self._stamp = None
+        self._body = None
+
+    def body(self):
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with open(self.path, "rb") as f:
+                content = f.read()
+            self._body = self.pattern.sub(self.replacement, content, count=1)
+            self._stamp = stamp
+        return self._body
+
+    def serve(self):
+        try:
+            body = self.body()
+        except OSError:
+            return bottle.HTTPError(404, "Not found")
+        bottle.response.content_type = self.content_type
+        bottle.response.set_header("Cache-Control", CACHE_CONTROL)
+        return body
+
+
+def register_port_injection(root, port, app=None):
+    """
+    Serve ``<root>/index.html`` and the entry bundle with *port* injected.
+    Call before ``eel.start`` so these routes win over Eel's catch-all static route.
+    """
+    app = app or bottle.default_app()
+    files = {
+        "/index.html": PortInjectedFile(
+            os.path.join(root, "index.html"), EEL_JS_RE,
+            f"http://localhost:{port}/eel.js".encode("ascii"), "text/html; charset=utf-8"),
+    }
+    bundle = find_bundle(root)
+    if bundle:
+        files["/assets/" + os.path.basename(bundle)] = PortInjectedFile(
+            bundle, WEBSOCKET_RE, f"ws://localhost:{port}".encode("ascii"),
+            "application/javascript; charset=utf-8")
+    for path, served in files.items():
+        app.route(path, "GET", served.serve)
+    return files
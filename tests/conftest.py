@@ -0,0 +1,5 @@
+import os
+import sys
+
+# py_src をリポジトリのルートから import できるようにする
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+
+from py_src.autosave import Autosave, DeltaCoalescer, link_identities
+from py_src.graph_integrity import repair_graph
+
+DATASETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datasets")
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_coalescer_keeps_latest_state_per_record():
+    coalescer = DeltaCoalescer()
+    coalescer.add({"nodes": {"added": [{"id": 1, "name": "a"}]}})
+    coalescer.add({"nodes": {"modified": [{"id": 1, "name": "b"}, {"id": 2, "name": "c"}]}})
+    coalescer.add({"nodes": {"removed": [3]}, "links": {"removed": ["1>2#0"]}})
+    delta = coalescer.take()
+    assert delta["nodes"] == {
+        "removed": [3],
+        "added": [{"id": 1, "name": "b"}],
+        "modified": [{"id": 2, "name": "c"}],
+    }
+    assert delta["links"]["removed"] == ["1>2#0"]
+    assert not coalescer
+    assert coalescer.take() == {}
+
+
+def test_coalescer_merges_field_removals():
+    coalescer = DeltaCoalescer()
+    coalescer.add({"fields": {"groups": [1]}})
+    coalescer.add({"removed_fields": ["groups", "camera"]})
+    coalescer.add({"fields": {"camera": {"x": 1}}})
+    delta = coalescer.take()
+    assert delta["fields"] == {"camera": {"x": 1}}
+    assert delta["removed_fields"] == ["groups"]
+
+
+def test_link_identities_survive_renumbering():
+    links = [
+        {"source": 1, "target": 2, "index": 0},
+        {"source": 1, "target": 2, "index": 1},
+        {"source": {"id": 2}, "target": 3, "index": 2},
+    ]
+    keys = [link["index"] for link in link_identities(links)]
+    assert keys == ["1>2#0", "1>2#1", "2>3#0"]
+    renumbered = [dict(link, index=i) for i, link in enumerate(links[1:])]
+    assert [link["index"] for link in link_identities(renumbered)] == ["1>2#0", "2>3#0"]
+
+
+def test_diff_after_link_deletion_removes_one_link(tmp_path):
+    nodes = [{"id": i} for i in range(50)]
+    links = [{"source": i, "target": i + 1, "index": i} for i in range(49)]
+    session = Autosave(str(tmp_path)).begin({"nodes": nodes, "links": links, "groups": []})
+    kept = [dict(link, index=i) for i, link in enumerate(links[:3] + links[4:])]
+    delta = session.store.diff({"nodes": nodes, "links": kept})
+    assert delta == {"links": {"removed": ["3>4#0"], "added": []}, "removed_fields": ["groups"]}
+
+
+def test_recover_untitled_session_from_snapshot(tmp_path):
+    store = Autosave(str(tmp_path))
+    session = store.begin({"nodes": [{"id": 1}, {"id": 2}], "links": [{"source": 1, "target": 2}]})
+    session.snapshot()
+    store.record({"nodes": {"added": [{"id": 3}]}, "links": {"removed": ["1>2#0"]}})
+    session.write(store.due(force=True)[1])
+    store.detach()
+    (meta,) = store.sessions()
+    assert meta["source_path"] is None
+    recovered = store.recover(meta["key"], read_json)
+    assert [node["id"] for node in recovered["nodes"]] == [1, 2, 3]
+    assert recovered["links"] == []
+
+
+def test_recover_repairs_source_file_like_the_session_base(tmp_path):
+    source = tmp_path / "map.json"
+    shutil.copy(os.path.join(DATASETS, "forcegraph-dependencies.json"), source)
+    base, report = repair_graph(read_json(source))
+    assert any(report.values())
+    store = Autosave(str(tmp_path / "recovery"))
+    store.begin(base, str(source))
+    node_id = base["nodes"][0]["id"]
+    store.record({"nodes": {"modified": [{"id": node_id, "name": "edited"}]}})
+    store.session.write(store.due(force=True)[1])
+    store.detach()
+    (meta,) = store.sessions()
+    recovered = store.recover(meta["key"], read_json)
+    assert len(recovered["nodes"]) == len(base["nodes"])
+    assert recovered["nodes"][0]["name"] == "edited"
+    assert [link["index"] for link in recovered["links"]] == list(range(len(base["links"])))
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from py_src.delta_store import DeltaStore
+
+
+def make_store(tmp_path, data=None):
+    path = str(tmp_path / "map.json")
+    written = []
+
+    def writer(document, target):
+        written.append(document)
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+        return True
+
+    data = data or {"nodes": [{"id": 1, "name": "a"}], "links": []}
+    return DeltaStore(path, data, writer), written
+
+
+def test_apply_journals_then_compacts(tmp_path):
+    store, written = make_store(tmp_path)
+    store.apply({"nodes": {"added": [{"id": 2}], "modified": [{"id": 1, "name": "b"}]},
+                 "links": {"added": [{"source": 1, "target": 2, "index": 0}]}})
+    assert store.pending == 1
+    reopened, _ = make_store(tmp_path)
+    assert reopened.replay_journal(compact=False) == 1
+    assert reopened.document() == store.document()
+    assert store.compact()
+    assert written[-1]["nodes"] == [{"id": 1, "name": "b"}, {"id": 2}]
+    assert store.pending == 0
+
+
+def test_failed_journal_write_leaves_state_unchanged(tmp_path, monkeypatch):
+    store, _ = make_store(tmp_path)
+    before = store.document()
+
+    def fail(_fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("py_src.delta_store.os.fsync", fail)
+    with pytest.raises(OSError):
+        store.apply({"nodes": {"modified": [{"id": 1, "name": "lost"}]}})
+    assert store.document() == before
+    assert store.pending == 0
+    assert (tmp_path / "map.json.journal").read_bytes() == b""
+
+
+def test_invalid_delta_is_rejected_before_journaling(tmp_path):
+    store, _ = make_store(tmp_path)
+    with pytest.raises(ValueError):
+        store.apply({"nodes": {"modified": [{"name": "no id"}]}})
+    assert not (tmp_path / "map.json.journal").exists()
+
+
+def test_diff_emits_removed_fields(tmp_path):
+    store, _ = make_store(tmp_path, {"nodes": [], "links": [], "groups": [], "camera": {}})
+    delta = store.diff({"nodes": [], "links": [], "camera": {"x": 1}})
+    assert delta == {"fields": {"camera": {"x": 1}}, "removed_fields": ["groups"]}
+    store.apply(delta)
+    assert store.document() == {"nodes": [], "links": [], "camera": {"x": 1}}
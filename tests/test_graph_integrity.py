@@ -0,0 +1,53 @@
+import json
+import os
+
+from py_src.graph_integrity import repair_graph
+
+DATASETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datasets")
+
+
+def load(name):
+    with open(os.path.join(DATASETS, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_valid_map_without_link_indexes_needs_no_repair():
+    data = load("miserables.json")
+    assert all("index" not in link for link in data["links"])
+    repaired, report = repair_graph(data)
+    assert repaired is data
+    assert not any(report.values())
+
+
+def test_stale_indexes_are_renumbered():
+    data = {"nodes": [{"id": 1}, {"id": 2}], "links": [{"source": 1, "target": 2, "index": 5}, {"source": 2, "target": 1}]}
+    repaired, report = repair_graph(data)
+    assert report["reindexed_links"] == 1
+    assert repaired["links"] == [{"source": 1, "target": 2, "index": 0}, {"source": 2, "target": 1}]
+    assert data["links"][0]["index"] == 5
+
+
+def test_dangling_links_and_duplicate_ids():
+    data = {
+        "nodes": [{"id": 1, "name": "a"}, {"id": 1, "name": "a"}, {"id": 1, "name": "b"}, {"name": "c"}],
+        "links": [
+            {"source": 1, "target": 9, "index": 0},
+            {"source": {"id": 1}, "target": 1, "index": 1},
+            {"source": 1, "target": 1, "index": 2, "value": 2},
+        ],
+    }
+    repaired, report = repair_graph(data)
+    assert report["dropped_nodes"] == 1
+    assert report["renamed_nodes"] == 2
+    assert report["dangling_links"] == 1
+    assert [node["id"] for node in repaired["nodes"]] == [1, 2, 3]
+    # 同じ両端のリンクは並行辺として残す
+    assert repaired["links"] == [
+        {"source": 1, "target": 1, "index": 0},
+        {"source": 1, "target": 1, "index": 1, "value": 2},
+    ]
+
+
+def test_repair_is_deterministic():
+    data = load("forcegraph-dependencies.json")
+    assert repair_graph(data) == repair_graph(data)
@@ -0,0 +1,46 @@
+import os
+
+from py_src import map_export, markdown_import
+from py_src.map_export import export_map
+from py_src.markdown_import import parse_markdown_file
+
+
+def _big_map(count):
+    nodes = [{"id": i, "name": f"node {i}"} for i in range(count)]
+    links = [{"source": 0, "target": i} for i in range(1, count)]
+    return {"nodes": nodes, "links": links}
+
+
+def _stop_after(calls):
+    seen = []
+
+    def progress(done, total):
+        seen.append((done, total))
+        return len(seen) >= calls
+    return progress, seen
+
+
+def test_import_stops_when_cancelled(tmp_path):
+    path = tmp_path / "big.md"
+    lines = ["# Root", "## Topic"] + [f"- item {i}" for i in range(3 * markdown_import.PROGRESS_EVERY)]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+    progress, seen = _stop_after(1)
+    assert parse_markdown_file(str(path), progress=progress) is None
+    assert seen == [(seen[0][0], os.path.getsize(path))]
+
+    data = parse_markdown_file(str(path), progress=lambda done, total: False)
+    assert len(data["nodes"]) == len(lines)
+
+
+def test_export_stops_and_removes_partial_file(tmp_path):
+    data = _big_map(3 * map_export.PROGRESS_EVERY)
+    for fmt in map_export.EXPORT_FORMATS:
+        path = tmp_path / f"out.{fmt}"
+        progress, seen = _stop_after(2)
+        assert export_map(data, str(path), progress=progress) is None
+        assert len(seen) == 2
+        assert not path.exists()
+
+        assert export_map(data, str(path), progress=lambda done, total: False) == fmt
+        assert path.exists()
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from py_src.map_store import MapStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    nodes = [{"id": i, "name": f"n{i}", "x": i * 600.0, "y": -i * 600.0, "z": 0.0} for i in range(10)]
+    links = [{"source": i, "target": i + 1} for i in range(9)]
+    path = tmp_path / "map.json"
+    path.write_text(json.dumps({"nodes": nodes, "links": links}), encoding="utf-8")
+    return MapStore(str(path))
+
+
+def _ids(page):
+    return sorted(node["id"] for node in page["nodes"])
+
+
+def test_box_selects_nodes_and_links_between_them(store):
+    page = store.fetch_box({"min": {"x": 1000, "y": -3000, "z": -1}, "max": {"x": 3000, "y": 0, "z": 1}})
+    assert _ids(page) == [2, 3, 4, 5]
+    assert sorted((link["source"], link["target"]) for link in page["links"]) == [(2, 3), (3, 4), (4, 5)]
+    assert not page["truncated"]
+
+    page = store.fetch_box({"min": {"x": 1000, "y": -3000, "z": -1}, "max": {"x": 3000, "y": 0, "z": 1}},
+                           known_ids=[2, 3])
+    assert _ids(page) == [4, 5]
+
+
+@pytest.mark.parametrize("bbox", [None, {}, {"min": None, "max": None}, {"min": {"x": None}}])
+def test_missing_bounds_are_unbounded(store, bbox):
+    page = store.fetch_box(bbox)
+    assert _ids(page) == list(range(10))
+
+
+def test_partial_bounds_and_limit(store):
+    assert _ids(store.fetch_box({"min": {"x": 4000}})) == [7, 8, 9]
+    page = store.fetch_box(None, limit=3)
+    assert len(page["nodes"]) == 3
+    assert page["truncated"]
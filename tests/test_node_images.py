@@ -0,0 +1,22 @@
+from py_src.node_images import image_key, node_colors, render_html
+
+
+def test_palette_indexes_become_css_colors():
+    assert node_colors({"node_bg_color": 3, "node_pattern_color": 1}) == ("#ffeedd", "#3aaa6a", "#222222")
+    html = render_html({"name": "a", "node_bg_color": 3, "node_pattern_color": 1})
+    assert "background: #ffeedd;" in html
+    assert "border-left: 12px solid #3aaa6a;" in html
+
+
+def test_custom_and_emphasis_colors():
+    background, pattern, _ = node_colors({"node_bg_color": 7, "node_custom_bg_color": "#123456", "node_pattern_color": 7})
+    assert background == pattern == "#123456"
+    assert node_colors({"style_id": 4, "node_bg_color": 0, "node_pattern_color": 0}) == ("#2255aa", "#d0e8ff", "#d0e8ff")
+    # 範囲外や数値以外は UI と同じく丸める
+    assert node_colors({"node_bg_color": 12, "node_pattern_color": "red"})[1] == "#4c9ac0"
+
+
+def test_key_depends_on_look_only():
+    node = {"id": 1, "name": "a", "node_bg_color": 2}
+    assert image_key(node) == image_key(dict(node, id=2, x=10))
+    assert image_key(node) != image_key(dict(node, node_bg_color=3))
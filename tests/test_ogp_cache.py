@@ -0,0 +1,144 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import main
+from py_src.ogp_cache import OgpCache
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"\x00" * 1024
+
+
+class StandIn:
+    """Local HTTP server with one page per path under /page/, all sharing /img/a.png."""
+
+    def __init__(self):
+        self.requests = []
+        self.not_modified = []
+        self.pages_without_image = set()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body, content_type):
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    stand_in.not_modified.append(self.path)
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stand_in.requests.append(self.path)
+                if self.path.startswith("/page/"):
+                    meta = "" if self.path in stand_in.pages_without_image else \
+                        '<meta property="og:image" content="/img/a.png">'
+                    body = f"<html><head>{meta}</head><body><p>本文</p></body></html>".encode("utf-8")
+                    self._send(body, "text/html; charset=utf-8")
+                elif self.path == "/img/a.png":
+                    self._send(IMAGE, "image/png")
+                else:
+                    self.send_error(404)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+def test_fetch_then_serve_from_cache(stand_in, tmp_path):
+    cache = OgpCache(str(tmp_path))
+    urls = [stand_in.url("/page/1"), stand_in.url("/page/2")]
+
+    result = cache.get_many(urls + urls)
+    digest = hashlib.sha256(IMAGE).hexdigest()
+    assert {entry["hash"] for entry in result.values()} == {digest}
+    assert cache.read(digest) == IMAGE
+    assert cache.content_type(digest) == "image/png"
+    # 2 ページと共有の画像 1 枚を 2 回取得し、同じ内容は 1 つのファイルにまとめる
+    assert sorted(stand_in.requests) == ["/img/a.png", "/img/a.png", "/page/1", "/page/2"]
+    assert os.listdir(os.path.join(str(tmp_path), "objects", digest[:2])) == [digest]
+
+    stand_in.requests.clear()
+    assert cache.get(urls[0])["hash"] == digest
+    assert stand_in.requests == []
+
+    cache.flush()
+    reopened = OgpCache(str(tmp_path))
+    assert reopened.get(urls[1])["hash"] == digest
+    assert stand_in.requests == []
+
+
+def test_stale_entries_are_revalidated(stand_in, tmp_path):
+    url = stand_in.url("/page/1")
+    cache = OgpCache(str(tmp_path))
+    cache.get(url)
+    cache.flush()
+    assert stand_in.not_modified == []
+
+    stale = OgpCache(str(tmp_path), ttl=0)
+    assert stale.get(url)["hash"] == hashlib.sha256(IMAGE).hexdigest()
+    # 変わっていないページと画像は 304 で確認するだけ
+    assert stand_in.not_modified == ["/page/1", "/img/a.png"]
+
+
+def test_pages_without_image_are_remembered(stand_in, tmp_path):
+    url = stand_in.url("/page/plain")
+    stand_in.pages_without_image.add("/page/plain")
+    cache = OgpCache(str(tmp_path))
+
+    assert cache.get(url) is None
+    assert url in cache
+    stand_in.requests.clear()
+    assert cache.get(url) is None
+    assert stand_in.requests == []
+
+
+def test_least_recently_used_entries_are_evicted(stand_in, tmp_path):
+    cache = OgpCache(str(tmp_path), max_bytes=len(IMAGE) - 1)
+    url = stand_in.url("/page/1")
+    cache.get(url)
+    assert url not in cache
+    assert not os.path.exists(cache.object_path(hashlib.sha256(IMAGE).hexdigest()))
+
+
+def test_resolve_refetches_only_indexed_pages(stand_in, tmp_path, monkeypatch):
+    cache = OgpCache(str(tmp_path))
+    monkeypatch.setattr(main, "g_ogp_cache", cache)
+    url = stand_in.url("/page/1")
+    digest = cache.get(url)["hash"]
+
+    assert main.resolve_ogp_image(digest, {})[0] == cache.object_path(digest)
+
+    os.remove(cache.object_path(digest))
+    stand_in.requests.clear()
+    path, content_type, served = main.resolve_ogp_image(digest, {"src": url})
+    assert (served, content_type) == (digest, "image/png")
+    assert os.path.exists(path)
+    assert stand_in.requests == ["/page/1", "/img/a.png"]
+
+    stand_in.requests.clear()
+    missing = "0" * 64
+    assert main.resolve_ogp_image(missing, {"src": stand_in.url("/page/unknown")}) is None
+    assert stand_in.requests == []
@@ -0,0 +1,63 @@
+import json
+
+from py_src.recent_files import RecentFiles, meta_path_for
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_list_keeps_legacy_format_and_metadata_goes_to_sidecar(tmp_path):
+    path = str(tmp_path / "recent.json")
+    recent = RecentFiles(path)
+    recent.touch("/maps/a.json", node_count=3, title="A")
+    recent.touch("/maps/b.json")
+    assert recent.flush()
+    assert read_json(path) == ["/maps/b.json", "/maps/a.json"]
+    sidecar = read_json(meta_path_for(path))
+    assert sidecar["entries"]["/maps/a.json"]["node_count"] == 3
+    entries = RecentFiles(path).entries()
+    assert [e["path"] for e in entries] == ["/maps/b.json", "/maps/a.json"]
+    assert entries[1]["title"] == "A"
+
+
+def test_changes_by_an_older_build_are_kept(tmp_path):
+    path = str(tmp_path / "recent.json")
+    recent = RecentFiles(path)
+    recent.touch("/maps/a.json", node_count=1)
+    recent.flush()
+    # 古いビルドはパスのリストだけを書き換える
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(["/maps/old.json", "/maps/a.json"], f)
+    assert [e["path"] for e in recent.entries()] == ["/maps/old.json", "/maps/a.json"]
+    recent.touch("/maps/b.json")
+    recent.flush()
+    assert read_json(path) == ["/maps/b.json", "/maps/old.json", "/maps/a.json"]
+    assert "node_count" not in RecentFiles(path).entries()[1]
+
+
+def test_two_instances_merge(tmp_path):
+    path = str(tmp_path / "recent.json")
+    first = RecentFiles(path)
+    second = RecentFiles(path)
+    first.touch("/maps/a.json")
+    second.touch("/maps/b.json")
+    first.flush()
+    second.flush()
+    assert read_json(path) == ["/maps/b.json", "/maps/a.json"]
+    first.remove("/maps/b.json")
+    first.flush()
+    assert read_json(path) == ["/maps/a.json"]
+
+
+def test_reads_versioned_document_from_earlier_build(tmp_path):
+    path = str(tmp_path / "recent.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "entries": [{"path": "/maps/a.json", "last_opened": 5, "title": "A"}]}, f)
+    recent = RecentFiles(path)
+    assert recent.entries()[0]["title"] == "A"
+    recent.touch("/maps/b.json")
+    recent.flush()
+    assert read_json(path) == ["/maps/b.json", "/maps/a.json"]
+    assert read_json(meta_path_for(path))["entries"]["/maps/a.json"]["title"] == "A"
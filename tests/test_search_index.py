@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from py_src import search_index
+from py_src.search_index import SearchIndex, normalize
+
+DATASETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datasets")
+
+
+def _nodes(names):
+    return [{"id": i, "name": name} for i, name in enumerate(names)]
+
+
+def _scan(nodes, query):
+    # 以前の Find モーダルと同じ、大文字小文字を区別しない includes
+    return {node["id"] for node in nodes if normalize(query) in normalize(node.get("name") or "")}
+
+
+def test_substring_matches_a_full_scan():
+    with open(os.path.join(DATASETS, "miserables.json"), encoding="utf-8") as f:
+        nodes = [{"id": node["id"], "name": node["id"]} for node in json.load(f)["nodes"]]
+    index = SearchIndex(nodes)
+    for query in ("a", "ma", "Val", "MLLE", "ine", "xyz"):
+        found = index.search(query, limit=len(nodes))
+        assert {hit["id"] for hit in found} == _scan(nodes, query)
+
+
+def test_ranking_and_normalization():
+    index = SearchIndex(_nodes(["ｔｏｋｙｏ　Tower", "Kyoto", "tokyo", "東京タワー", "大東京"]))
+    assert [hit["name"] for hit in index.search("TOKYO")] == ["tokyo", "ｔｏｋｙｏ　Tower"]
+    assert [hit["name"] for hit in index.search("tokyo tower")] == ["ｔｏｋｙｏ　Tower"]
+    assert [hit["name"] for hit in index.search("東京")] == ["東京タワー", "大東京"]
+    assert [hit["name"] for hit in index.search("東京", mode="prefix")] == ["東京タワー"]
+    assert [hit["name"] for hit in index.search("kyoto", limit=1)] == ["Kyoto"]
+    assert index.search("") == []
+    with pytest.raises(ValueError):
+        index.search("x", mode="regex")
+
+
+def test_fuzzy_tolerates_typos():
+    index = SearchIndex(_nodes(["performance", "perform", "information"]))
+    assert [hit["name"] for hit in index.search("performence", mode="fuzzy")] == ["performance", "perform"]
+
+
+@pytest.mark.parametrize("bulk_threshold", [search_index.BULK_THRESHOLD, 0])
+def test_updates_match_a_rebuilt_index(monkeypatch, bulk_threshold):
+    monkeypatch.setattr(search_index, "BULK_THRESHOLD", bulk_threshold)
+    nodes = _nodes(["alpha", "beta", "gamma", "alphabet"])
+    index = SearchIndex(nodes)
+
+    index.apply_delta({"nodes": {
+        "removed": [1],
+        "added": [{"id": 9, "name": "alpine"}],
+        "modified": [{"id": 2, "name": "alpaca"}, {"id": 3, "x": 10}],
+    }})
+    after_delta = _nodes(["alpha", None, "alpaca", "alphabet"])
+    after_delta = [node for node in after_delta if node["id"] != 1] + [{"id": 9, "name": "alpine"}]
+    for query in ("alp", "al", "a"):
+        assert index.search(query, mode="prefix") == SearchIndex(after_delta).search(query, mode="prefix")
+        assert index.search(query) == SearchIndex(after_delta).search(query)
+
+    synced = [{"id": 0, "name": "omega"}, {"id": 3, "name": "alphabet"}, {"id": 4, "name": "alps"}]
+    index.sync(synced)
+    assert len(index) == 3
+    for query in ("alp", "o", "mega"):
+        assert index.search(query) == SearchIndex(synced).search(query)
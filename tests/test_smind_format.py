@@ -0,0 +1,98 @@
+import json
+import os
+import zlib
+
+import pytest
+
+from py_src.map_store import MapStore
+from py_src.smind_format import (SmindFormatError, SmindReader, convert, decode_smind,
+                                 iter_smind_chunks, read_smind)
+
+DATASETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datasets")
+
+
+def _encode(data):
+    return b"".join(iter_smind_chunks(data))
+
+
+def _sample():
+    return {
+        "camera": {"position": {"x": 1, "y": 2, "z": 3}},
+        "nodes": [
+            {"id": 1, "name": "root", "x": 0.1, "y": -2, "size_x": 240, "color": 3},
+            {"name": "child", "id": "c-1", "fx": 1e300, "y": 2.5, "img": None},
+            {"id": 2.5, "name": None, "x": "not a number", "extra": [1, 2]},
+        ],
+        "links": [{"source": 1, "target": "c-1", "index": 0}],
+        "groups": [],
+    }
+
+
+def test_round_trip_preserves_values_types_and_key_order():
+    data = _sample()
+    decoded = decode_smind(_encode(data))
+    assert decoded == data
+    assert json.dumps(decoded) == json.dumps(data)
+
+
+def test_dataset_round_trip(tmp_path):
+    src = os.path.join(DATASETS, "SpaceMind_Manual.json")
+    smind = str(tmp_path / "manual.smind")
+    back = str(tmp_path / "manual.json")
+    data = convert(src, smind)
+    convert(smind, back)
+    with open(back, encoding="utf-8") as f:
+        assert json.load(f) == data
+    assert read_smind(smind) == data
+
+    store = MapStore(smind)
+    assert store.node_count == len(data["nodes"])
+    assert store.document() == data
+
+
+def _corruptions(blob):
+    yield "empty", b""
+    yield "wrong magic", b"XXXX" + blob[4:]
+    for size in (9, 12, len(blob) // 2, len(blob) - 1):
+        yield f"truncated to {size}", blob[:size]
+    # 先頭のセクション (META) の圧縮データを壊す
+    tag_len = blob[8]
+    payload = 8 + 1 + tag_len + 9
+    yield "bad zlib payload", blob[:payload] + bytes(b ^ 0xFF for b in blob[payload:payload + 8]) + blob[payload + 8:]
+
+
+@pytest.mark.parametrize("name", [name for name, _ in _corruptions(_encode(_sample()))])
+def test_corrupt_files_raise_format_error(name):
+    blob = dict(_corruptions(_encode(_sample())))[name]
+    with pytest.raises(SmindFormatError):
+        decode_smind(blob)
+
+
+def _rebuild(data, replace):
+    """Re-encode *data* with the raw payload of some sections replaced."""
+    from py_src import smind_format
+
+    out = []
+    chunks = list(iter_smind_chunks(data, level=0))
+    out.append(chunks[0])
+    for header, stored in zip(chunks[1::2], chunks[2::2]):
+        tag = header[1:1 + header[0]].decode("ascii")
+        raw = zlib.decompress(stored) if header[1 + header[0]] == smind_format.CODEC_ZLIB else stored
+        raw = replace.get(tag, raw)
+        out.append(header[:1 + header[0]] + smind_format._SECTION.pack(smind_format.CODEC_RAW, len(raw), len(raw)))
+        out.append(raw)
+    return b"".join(out)
+
+
+@pytest.mark.parametrize("replace", [
+    {"META": b"{not json"},
+    {"META": b'{"node_count": 3}'},
+    {"C:x": b"\x01\x01"},
+    {"SHPI": b"\x00\x00\x00"},
+    {"NRST": b"[]"},
+    {"LNKS": b"[1,"},
+])
+def test_corrupt_sections_raise_format_error(replace):
+    blob = _rebuild(_sample(), replace)
+    with pytest.raises(SmindFormatError):
+        SmindReader(blob).document()
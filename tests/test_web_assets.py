@@ -0,0 +1,52 @@
+import os
+
+import bottle
+
+from py_src.web_assets import find_bundle, register_port_injection
+
+INDEX_HTML = """<!doctype html>
+<html>
+  <head>
+    <script type="text/javascript" src="http://localhost:5169/eel.js"></script>
+    <script type="module" crossorigin src="{src}"></script>
+    <link rel="stylesheet" crossorigin href="/assets/index-3f2a.css">
+  </head>
+  <body><div id="root"></div></body>
+</html>
+"""
+
+
+def _build(root, src, bundles):
+    os.makedirs(os.path.join(root, "assets"))
+    with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+        f.write(INDEX_HTML.format(src=src))
+    for name in bundles:
+        with open(os.path.join(root, "assets", name), "w", encoding="utf-8") as f:
+            f.write(f"/* {name} */ eel.set_host('ws://localhost:5169');")
+
+
+def test_find_bundle_follows_index_html(tmp_path):
+    root = str(tmp_path)
+    # 古いビルドの index-*.js が残っていても index.html が読み込むものを選ぶ
+    _build(root, "/assets/index-new.js", ["index-aaa-old.js", "index-new.js", "index-zzz-old.js"])
+    assert find_bundle(root) == os.path.join(root, "assets", "index-new.js")
+
+
+def test_find_bundle_with_relative_base_and_missing_files(tmp_path):
+    root = str(tmp_path / "relative")
+    _build(root, "./assets/main-1.js", ["main-1.js"])
+    assert find_bundle(root) == os.path.join(root, "assets", "main-1.js")
+
+    root = str(tmp_path / "missing")
+    _build(root, "/assets/index-gone.js", ["index-other.js"])
+    assert find_bundle(root) is None
+    assert find_bundle(str(tmp_path / "no-build")) is None
+
+
+def test_register_port_injection_serves_the_referenced_bundle(tmp_path):
+    root = str(tmp_path)
+    _build(root, "/assets/index-new.js", ["index-aaa-old.js", "index-new.js"])
+    files = register_port_injection(root, 40123, app=bottle.Bottle())
+    assert sorted(files) == ["/assets/index-new.js", "/index.html"]
+    assert b"ws://localhost:40123" in files["/assets/index-new.js"].body()
+    assert b"http://localhost:40123/eel.js" in files["/index.html"].body()
@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
 import json
+import sys
 
-def add_img_to_nodes(file_path):
+from py_src.node_images import NodeImageCache
+
+def add_img_to_nodes(file_path, render=False, gc=False):
+    # マップのファイルは書き換えない (ノードの img はユーザーが設定した画像なので上書きしない)。
+    # 描画した画像は見た目のハッシュ (/_img/node/<ハッシュ>) で参照する
     with open(file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
-    for node in data.get("nodes", []):
-        node_id = node.get("id")
-        node["img"] = f"node_img/{node_id}.png"
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"Updated {file_path} successfully.")
+    cache = NodeImageCache()
+    # 見た目 (名前・スタイル・サイズ・色) のハッシュで画像を指すので、同じ見た目のノードは同じ画像を共有する
+    keys, misses = cache.plan(data.get("nodes", []))
+    print(f"Checked {file_path}. ({len(keys)} nodes, {len(misses)} images missing)")
+    if render and misses:
+        rendered = cache.render(misses)
+        print(f"Rendered {sum(rendered.values())} of {len(misses)} images.")
+    if gc:
+        print(f"Removed {cache.gc(keys.values())} unused images.")
 
 if __name__ == "__main__":
-    file_path = "web_src/datasets/output.json"
-    add_img_to_nodes(file_path)
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    file_path = args[0] if args else "web_src/datasets/output.json"
+    add_img_to_nodes(file_path, render="--render" in sys.argv, gc="--gc" in sys.argv)
@@ -15,6 +15,12 @@ export default defineConfig({
   root: "web_src",
   base: "./",
   publicDir: "public",
+  server: {
+    // 開発時はページを Vite (5173)、画像を Eel (5169) が配信するので /_img を転送する
+    proxy: {
+      '/_img': 'http://localhost:5169',
+    },
+  },
   build : {
     outDir: "./../dist_vite",
     emptyOutDir: true,
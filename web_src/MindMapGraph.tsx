@@ -32,6 +32,7 @@ import { executeCircleLayout } from './layouts/CircleLayout';
 
 import './index.css'
 import { useHistory } from './hooks/useHistory';
+import { resetAutosaveBaseline } from './services/autosave';
 import { NODE_CONSTANTS } from './constants';
 import { NodeData, GroupData, GraphData } from './types/graph';
 import { useGroupVisuals } from './hooks/useGroupVisuals';
@@ -688,6 +689,8 @@ const MindMapGraph = forwardRef((props: any, ref:any) => {
         setGraphData: (graphData:any) => {
             // 背景の誤クリックによる選択解除を防ぐため、 mountTime をリセットする
             mountTime.current = Date.now();
+            // 読み込んだ内容は編集ではないので、自動保存の差分の基準にする
+            resetAutosaveBaseline();
 
             // layoutModeをロード
             const loadedLayoutMode = graphData.layoutMode === 'force' ? 'force' : 'static';
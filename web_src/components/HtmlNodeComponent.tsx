@@ -115,7 +115,7 @@ const HtmlNodeComponent: React.FC<HtmlNodeComponentProps> = ({ node }) => {
 
   // タイプごとのスタイル分岐
   let customImg = null;
-  if (node.img && node.img !== 'new_node.png' && !node.img.startsWith('node_img/')) {
+  if (node.img && node.img !== 'new_node.png' && !node.img.startsWith('node_img/') && !node.img.startsWith('/_img/node/')) {
     customImg = node.img;
   } else if (icon_img && (icon_img === 'logo.png' || icon_img === './assets/logo.png')) {
     customImg = 'logo.png';
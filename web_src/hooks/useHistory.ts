@@ -1,5 +1,6 @@
 import { useRef, useState, useCallback } from 'react';
 import { cloneDeep } from 'lodash';
+import { markGraphDirty } from '../services/autosave';
 
 export interface HistoryItem {
     action: 'add_node' | 'delete_node' | 'edit_node' | 'move_node' | 'add_link' | 'delete_link' | 'edit_link';
@@ -29,6 +30,7 @@ export const useHistory = () => {
             timestamp: Date.now()
         });
         historyIndexRef.current = historyRef.current.length - 1;
+        markGraphDirty();
 
         // UIの再描画が必要な場合のみforceUpdate
         if (['add_node', 'delete_node', 'edit_node'].includes(action)) {
@@ -47,6 +49,7 @@ export const useHistory = () => {
             return false; // ignore rapid repeated calls
         }
         lastUndoTime.current = now;
+        markGraphDirty();
         if (historyIndexRef.current >= 0) {
             const item = historyRef.current[historyIndexRef.current];
             
@@ -165,6 +168,7 @@ export const useHistory = () => {
             return false; // ignore rapid repeated calls
         }
         lastRedoTime.current = now;
+        markGraphDirty();
         if (historyIndexRef.current < historyRef.current.length - 1) {
             const item = historyRef.current[historyIndexRef.current + 1];
             
@@ -21,6 +21,11 @@ import { FloatButton } from 'antd';
 import { NODE_CONSTANTS } from './constants';
 
 import { storageService } from './services';
+import { registerJobEvents } from './services/jobEvents';
+import { registerRecoveryEvents, RECOVERY_EVENT, RecoverySession } from './services/recoveryEvents';
+import { registerDocumentEvents, MAP_REPAIRED_EVENT, MapRepairedDetail } from './services/documentEvents';
+import { cleanGraphData, startAutosave } from './services/autosave';
+import type { MapBatch } from './services/mapTransfer';
 
 declare const window: any;
 export const eel = window.eel;
@@ -34,6 +39,9 @@ if (eel && import.meta.env.VITE_APP_MODE !== 'web') {
   try {
     eel.set_host( 'ws://localhost:5169' );
     window.eel.expose( sayHelloJS, '' );
+    registerJobEvents();
+    registerRecoveryEvents();
+    registerDocumentEvents();
   } catch (e) {
     console.warn("Failed to initialize Eel:", e);
   }
@@ -92,6 +100,8 @@ const App = () => {
     const [aboutVisible, setAboutVisible] = useState(false);
     const [currentFileName, setCurrentFileName] = useState<string>('');
     const [loading, setLoading] = useState(false);
+    // 分割して読み込んでいるマップの届いたノード/リンクの数と全体の数 (読み込み中の表示用)
+    const [loadProgress, setLoadProgress] = useState<MapBatch | null>(null);
     const [isNodeEditorOpen, setIsNodeEditorOpen] = useState(false);
     const [isLinkEditorOpen, setIsLinkEditorOpen] = useState(false);
     const [isGroupEditorOpen, setIsGroupEditorOpen] = useState(false);
@@ -111,10 +121,14 @@ const App = () => {
         localStorage.setItem('space_mind_particles_enabled', String(isParticlesEnabled));
     }, [isParticlesEnabled]);
 
+    const handleLoadBatch = (batch: MapBatch) => {
+        setLoadProgress(batch);
+    };
+
     const handleOpenRecent = async (path: string) => {
         setLoading(true);
         try {
-            const node_data = await storageService.loadJsonByPath(path);
+            const node_data = await storageService.loadJsonByPath(path, handleLoadBatch);
             if (node_data) {
                 const loadedForce = node_data.layoutMode === 'force';
                 setIsForceMode(loadedForce);
@@ -127,6 +141,7 @@ const App = () => {
             message.error('最近のファイルの読み込みに失敗しました');
         } finally {
             setLoading(false);
+            setLoadProgress(null);
         }
     };
 
@@ -219,7 +234,7 @@ const App = () => {
     const handleFileSelect = async () => {
         setLoading(true);
         try {
-            const node_data = await storageService.selectFileDialog();
+            const node_data = await storageService.selectFileDialog(handleLoadBatch);
             if (node_data) {
                 const loadedForce = node_data.layoutMode === 'force';
                 setIsForceMode(loadedForce);
@@ -235,6 +250,7 @@ const App = () => {
             message.error('ファイルの読み込みに失敗しました');
         } finally {
             setLoading(false);
+            setLoadProgress(null);
         }
     };
 
@@ -348,6 +364,62 @@ const App = () => {
         }
     }, [resetGraph]);
 
+    // 編集中のマップを復旧用に自動保存する (デスクトップ版のみ)
+    useEffect(() => {
+        if (!window.eel || import.meta.env.VITE_APP_MODE === 'web') {
+            return;
+        }
+        return startAutosave(window.eel, () => mindMapGraphRef.current?.getGraphData());
+    }, []);
+
+    // 読み込んだマップの壊れたリンクなどを修復した場合は知らせる (保存するとファイルに反映される)
+    useEffect(() => {
+        const handleRepaired = (event: any) => {
+            const { path, repairs }: MapRepairedDetail = event.detail;
+            const total = Object.values(repairs).reduce((sum, n) => sum + n, 0);
+            message.info({
+                content: `${path} の ${total} 件の不整合を修復しました。保存するとファイルに反映されます`,
+                duration: 5,
+            });
+        };
+        window.addEventListener(MAP_REPAIRED_EVENT, handleRepaired);
+        return () => window.removeEventListener(MAP_REPAIRED_EVENT, handleRepaired);
+    }, []);
+
+    // 前回保存されずに終了したマップがあれば復元するか確認する
+    useEffect(() => {
+        const handleRecovery = (event: any) => {
+            const sessions: RecoverySession[] = event.detail || [];
+            const latest = sessions[0];
+            if (!latest) {
+                return;
+            }
+            const name = latest.source_path || latest.title || '無題のマップ';
+            Modal.confirm({
+                title: '保存されていない変更があります',
+                content: `${name} (${latest.node_count} ノード) の自動保存を復元しますか？`
+                    + (latest.source_changed ? ' 元のファイルはその後変更されています。' : ''),
+                okText: '復元',
+                cancelText: '破棄',
+                onOk: async () => {
+                    const recovered = await window.eel.recover_session(latest.key)();
+                    if (recovered && recovered.data && mindMapGraphRef.current) {
+                        setIsForceMode(recovered.data.layoutMode === 'force');
+                        mindMapGraphRef.current.setGraphData(recovered.data);
+                        setCurrentFileName(recovered.path || '');
+                    } else {
+                        message.error('自動保存の復元に失敗しました');
+                    }
+                },
+                onCancel: () => {
+                    window.eel.discard_recovery_session(latest.key)();
+                },
+            });
+        };
+        window.addEventListener(RECOVERY_EVENT, handleRecovery);
+        return () => window.removeEventListener(RECOVERY_EVENT, handleRecovery);
+    }, []);
+
     const [menuPosition, setMenuPosition] = useState<{x: number, y: number}>({x: 0, y: 0});
     const [menuOpen, setMenuOpen] = useState(false);
     const [rightClickedNode, setRightClickedNode] = useState<any>(null);
@@ -567,43 +639,11 @@ const App = () => {
     const saveData = useCallback(async (isSaveAs: boolean) => {
         if(!mindMapGraphRef.current) return;
         
-        let data = mindMapGraphRef.current.getGraphData();
-        // Python側でin-place変更されるため、ディープコピーを作成
-        data = JSON.parse(JSON.stringify(data));
-        data.nodes = data.nodes.map((node: any) => {
-            delete node.__threeObj;
-            // 固定位置（fx, fy, fz）がないノードについては、座標情報を保存しない
-            if (node.fx === undefined && node.fy === undefined) {
-                delete node.x;
-                delete node.y;
-                delete node.z;
-                delete node.vx;
-                delete node.vy;
-                delete node.vz;
-                delete node.fx;
-                delete node.fy;
-                delete node.fz;
-            }
-            return node;
-        });
-
-        data.links = data.links.map((link: any) => {
-            const cleanLink = { ...link };
-            if (link.source !== undefined) {
-                cleanLink.source = (link.source && typeof link.source === 'object') ? link.source.id : link.source;
-            }
-            if (link.target !== undefined) {
-                cleanLink.target = (link.target && typeof link.target === 'object') ? link.target.id : link.target;
-            }
-            delete cleanLink.__threeObj;
-            return cleanLink;
-        });
-
         // カメラ位置と視点方向を取得して保存
-        const cameraState = mindMapGraphRef.current.getCameraState?.();
-        if (cameraState) {
-            data.camera = cameraState;
-        }
+        const data = cleanGraphData(
+            mindMapGraphRef.current.getGraphData(),
+            mindMapGraphRef.current.getCameraState?.(),
+        );
 
         try {
             const result = isSaveAs 
@@ -879,7 +919,7 @@ const App = () => {
       );
 
     return (
-        <Spin spinning={loading} tip="ファイルを読み込み中..." wrapperClassName="full-height-spin" style={{ height: '100%', width: '100%' }}>
+        <Spin spinning={loading} tip={loadProgress ? `ファイルを読み込み中... (${loadProgress.loaded} / ${loadProgress.total})` : 'ファイルを読み込み中...'} wrapperClassName="full-height-spin" style={{ height: '100%', width: '100%' }}>
             <Button 
                 icon={<MenuOutlined rev={undefined} />}
                 onClick={() => setDrawerVisible(!drawerVisible)}
@@ -1,8 +1,12 @@
 import { StorageService } from './StorageService';
+import { MapBatch, loadMapChunked, saveMapChunked } from './mapTransfer';
 
 declare const window: any;
 
 export class EelStorageAdapter implements StorageService {
+  // 同じタイミングで要求された OGP 画像は get_ogp_images の 1 回の呼び出しにまとめる
+  private ogpWaiters = new Map<string, ((imgData: string | null) => void)[]>();
+
   private getEel() {
     return window.eel;
   }
@@ -18,20 +22,21 @@ export class EelStorageAdapter implements StorageService {
     return false;
   }
 
-  async loadJsonByPath(path: string): Promise<any> {
-    return await this.getEel().load_json_by_path(path)();
+  // マップはチャンクに分けて転送する (onBatch にはノード/リンクが届いた順に渡される)
+  async loadJsonByPath(path: string, onBatch?: (batch: MapBatch) => void): Promise<any> {
+    return await loadMapChunked(this.getEel(), path, onBatch);
   }
 
-  async selectFileDialog(): Promise<any> {
-    return await this.getEel().select_file_dialog()();
+  async selectFileDialog(onBatch?: (batch: MapBatch) => void): Promise<any> {
+    return await loadMapChunked(this.getEel(), null, onBatch);
   }
 
   async saveData(data: any): Promise<[boolean, string | null]> {
-    return await this.getEel().save_data(data)();
+    return await saveMapChunked(this.getEel(), data);
   }
 
   async saveAsData(data: any): Promise<[boolean, string | null]> {
-    return await this.getEel().save_as_data(data)();
+    return await saveMapChunked(this.getEel(), data, true);
   }
 
   async getRecentFiles(): Promise<string[]> {
@@ -56,17 +61,34 @@ export class EelStorageAdapter implements StorageService {
 
   async getOgpImage(url: string): Promise<string | null> {
     return new Promise((resolve) => {
-      try {
-        this.getEel().get_ogp_image(url)((imgData: string | null) => {
-          resolve(imgData);
-        });
-      } catch (err) {
-        console.error("Error getting OGP via Eel:", err);
-        resolve(null);
+      const waiters = this.ogpWaiters.get(url);
+      if (waiters) {
+        waiters.push(resolve);
+        return;
+      }
+      if (this.ogpWaiters.size === 0) {
+        setTimeout(() => this.flushOgpImages(), 0);
       }
+      this.ogpWaiters.set(url, [resolve]);
     });
   }
 
+  private flushOgpImages() {
+    const waiters = this.ogpWaiters;
+    this.ogpWaiters = new Map();
+    const resolveAll = (images: Record<string, string | null>) => {
+      waiters.forEach((resolvers, url) => resolvers.forEach((resolve) => resolve(images[url] ?? null)));
+    };
+    try {
+      this.getEel().get_ogp_images(Array.from(waiters.keys()))((images: Record<string, string | null> | null) => {
+        resolveAll(images || {});
+      });
+    } catch (err) {
+      console.error("Error getting OGP via Eel:", err);
+      resolveAll({});
+    }
+  }
+
   async importMarkdownDialog(): Promise<any> {
     return await this.getEel().import_markdown_dialog()();
   }
@@ -1,8 +1,10 @@
+import type { MapBatch } from './mapTransfer';
+
 export interface StorageService {
   isWebMode(): boolean;
   init(): Promise<boolean>;
-  loadJsonByPath(path: string): Promise<any>;
-  selectFileDialog(): Promise<any>;
+  loadJsonByPath(path: string, onBatch?: (batch: MapBatch) => void): Promise<any>;
+  selectFileDialog(onBatch?: (batch: MapBatch) => void): Promise<any>;
   saveData(data: any): Promise<[boolean, string | null]>;
   saveAsData(data: any): Promise<[boolean, string | null]>;
   getRecentFiles(): Promise<string[]>;
@@ -0,0 +1,258 @@
+// 編集中のマップの変更をバックエンドの自動保存 (py_src/autosave.py) に差分で送る。
+// 編集 (履歴への追加・元に戻す・やり直し) やノード/リンクの配列の入れ替えがあったときだけ、
+// ノード/リンクを 1 件ずつ文字列にして前回送った内容と比べ、変わったものだけを autosave_delta で送る。
+// 変更が無ければ何も文字列にしない (ドラッグなど履歴に残らない変更は FULL_CHECK_INTERVAL_MS ごとに拾う)。
+// マップ全体を送るのは未保存のマップで自動保存を始めるときだけで、大きなマップは分割して送る
+
+import { CHUNK_SIZE, autosaveMapChunked } from './mapTransfer';
+
+export const AUTOSAVE_INTERVAL_MS = 5000;
+const FULL_CHECK_INTERVAL_MS = 60000;
+// マップを読み込んでから基準を取るまでの時間 (読み込んだ内容が描画に反映されるのを待つ)
+const BASELINE_DELAY_MS = 500;
+
+let dirty = false;
+let baselineRequested = false;
+// 動いている自動保存の確認処理 (startAutosave が設定する)
+let requestCheck: (() => void) | null = null;
+
+// マップが編集されたことを知らせる (次の確認で差分を作る)
+export function markGraphDirty() {
+  dirty = true;
+}
+
+// 別のマップを読み込んだので、次に見えた内容を基準にする (読み込んだ内容は編集ではない)
+export function resetAutosaveBaseline() {
+  baselineRequested = true;
+  if (requestCheck) {
+    // 次の間隔を待たずに基準を取る (その間の編集を基準に含めない)
+    setTimeout(requestCheck, BASELINE_DELAY_MS);
+  }
+}
+
+const endpointId = (value: any) => (value && typeof value === 'object') ? value.id : value;
+
+// 保存しないプロパティを取り除く (node は複製したもの)
+function stripNode(node: any): any {
+  delete node.__threeObj;
+  // 固定位置（fx, fy, fz）がないノードについては、座標情報を保存しない
+  if (node.fx === undefined && node.fy === undefined) {
+    delete node.x;
+    delete node.y;
+    delete node.z;
+    delete node.vx;
+    delete node.vy;
+    delete node.vz;
+    delete node.fx;
+    delete node.fy;
+    delete node.fz;
+  }
+  return node;
+}
+
+function stripLink(link: any): any {
+  const cleanLink = { ...link };
+  if (link.source !== undefined) {
+    cleanLink.source = endpointId(link.source);
+  }
+  if (link.target !== undefined) {
+    cleanLink.target = endpointId(link.target);
+  }
+  delete cleanLink.__threeObj;
+  return cleanLink;
+}
+
+// 保存用にグラフのデータを複製し、描画用のプロパティを取り除く
+export function cleanGraphData(graph: any, cameraState?: any): any {
+  // Python側でin-place変更されるため、ディープコピーを作成
+  const data = JSON.parse(JSON.stringify(graph));
+  data.nodes = data.nodes.map(stripNode);
+  data.links = data.links.map(stripLink);
+  if (cameraState) {
+    data.camera = cameraState;
+  }
+  return data;
+}
+
+// ノード/リンク/トップレベルの値ごとの JSON 文字列
+interface Snapshot {
+  nodes: Map<any, string>;
+  links: Map<string, string>;
+  fields: Map<string, string>;
+}
+
+// d3 はリンクを削除するたびに index を振り直すので、自動保存では両端の id と
+// 同じ両端を持つリンクの中での順番をキーにする (py_src/autosave.py の link_identities と同じ形)
+function takeSnapshot(graph: any): Snapshot {
+  const nodes = new Map<any, string>();
+  for (const node of graph.nodes) {
+    nodes.set(node.id, JSON.stringify(stripNode({ ...node })));
+  }
+  const links = new Map<string, string>();
+  const seen = new Map<string, number>();
+  for (const link of graph.links) {
+    const record = stripLink(link);
+    const pair = `${record.source}>${record.target}`;
+    const count = seen.get(pair) ?? 0;
+    seen.set(pair, count + 1);
+    record.index = `${pair}#${count}`;
+    links.set(record.index, JSON.stringify(record));
+  }
+  return { nodes, links, fields: fieldSnapshot(graph) };
+}
+
+function fieldSnapshot(graph: any): Map<string, string> {
+  const fields = new Map<string, string>();
+  for (const [key, value] of Object.entries(graph)) {
+    if (key !== 'nodes' && key !== 'links' && value !== undefined) {
+      fields.set(key, JSON.stringify(value));
+    }
+  }
+  return fields;
+}
+
+function sameFields(a: Map<string, string>, b: Map<string, string>): boolean {
+  if (a.size !== b.size) {
+    return false;
+  }
+  for (const [key, text] of a) {
+    if (b.get(key) !== text) {
+      return false;
+    }
+  }
+  return true;
+}
+
+// before から after への変更 (変わったレコードは added で丸ごと置き換える)
+function diffRecords<K>(before: Map<K, string>, after: Map<K, string>): { removed: K[]; added: any[] } {
+  const removed: K[] = [];
+  const added: any[] = [];
+  before.forEach((_, key) => {
+    if (!after.has(key)) {
+      removed.push(key);
+    }
+  });
+  after.forEach((text, key) => {
+    if (before.get(key) !== text) {
+      added.push(JSON.parse(text));
+    }
+  });
+  return { removed, added };
+}
+
+// autosave_delta に渡す差分を CHUNK_SIZE 件ずつに分ける (1 つのメッセージを大きくしない)。変更が無ければ空
+function diffSnapshots(before: Snapshot, after: Snapshot): any[] {
+  const pieces: any[] = [];
+  for (const name of ['nodes', 'links'] as const) {
+    const { removed, added } = diffRecords<any>(before[name], after[name]);
+    for (let i = 0; i < removed.length; i += CHUNK_SIZE) {
+      pieces.push({ [name]: { removed: removed.slice(i, i + CHUNK_SIZE) } });
+    }
+    for (let i = 0; i < added.length; i += CHUNK_SIZE) {
+      pieces.push({ [name]: { added: added.slice(i, i + CHUNK_SIZE) } });
+    }
+  }
+  const fields: Record<string, any> = {};
+  for (const [key, text] of after.fields) {
+    if (before.fields.get(key) !== text) {
+      fields[key] = JSON.parse(text);
+    }
+  }
+  const removedFields = Array.from(before.fields.keys()).filter((key) => !after.fields.has(key));
+  if (Object.keys(fields).length || removedFields.length) {
+    pieces.push({ fields, removed_fields: removedFields });
+  }
+  return pieces;
+}
+
+function snapshotDocument(snapshot: Snapshot): any {
+  const data: any = {};
+  snapshot.fields.forEach((text, key) => {
+    data[key] = JSON.parse(text);
+  });
+  data.nodes = Array.from(snapshot.nodes.values(), (text) => JSON.parse(text));
+  data.links = Array.from(snapshot.links.values(), (text) => JSON.parse(text));
+  return data;
+}
+
+// 変更を送る。自動保存の基準がまだ無い (未保存のマップの) ときはマップ全体を分割して送る
+async function sendChanges(eel: any, pieces: any[], snapshot: Snapshot): Promise<boolean> {
+  for (let i = 0; i < pieces.length; i++) {
+    if (!(await eel.autosave_delta(pieces[i])())) {
+      return i === 0 && await autosaveMapChunked(eel, snapshotDocument(snapshot));
+    }
+  }
+  return true;
+}
+
+// getGraph が返すマップの変更を interval ごとに送る。前回の送信が終わる前は送らない。
+// 最初に見えた内容 (起動直後の空のマップや読み込んだマップ) は編集ではないので送らない。停止する関数を返す
+export function startAutosave(eel: any, getGraph: () => any, interval = AUTOSAVE_INTERVAL_MS): () => void {
+  let busy = false;
+  let baseline: Snapshot | null = null;
+  // 前回確認したときのノード/リンクの配列とトップレベルの値 (入れ替わっていれば変更がある)
+  let seenNodes: any[] | null = null;
+  let seenLinks: any[] | null = null;
+  let checkedAt = 0;
+
+  const check = async () => {
+    if (busy) {
+      return;
+    }
+    const graph = getGraph();
+    if (!graph || !graph.nodes || graph.nodes.length === 0) {
+      return;
+    }
+    if (baselineRequested) {
+      if (graph.nodes === seenNodes) {
+        // 読み込んだ内容がまだ描画に反映されていない
+        return;
+      }
+      baselineRequested = false;
+      baseline = null;
+    }
+    const now = Date.now();
+    const fields = fieldSnapshot(graph);
+    const changed = dirty || baseline === null || graph.nodes !== seenNodes || graph.links !== seenLinks
+      || !sameFields(fields, baseline.fields);
+    if (!changed && now - checkedAt < FULL_CHECK_INTERVAL_MS) {
+      return;
+    }
+    dirty = false;
+    seenNodes = graph.nodes;
+    seenLinks = graph.links;
+    checkedAt = now;
+
+    const snapshot = takeSnapshot(graph);
+    if (baseline === null) {
+      baseline = snapshot;
+      return;
+    }
+    const pieces = diffSnapshots(baseline, snapshot);
+    if (pieces.length === 0) {
+      return;
+    }
+    busy = true;
+    try {
+      if (await sendChanges(eel, pieces, snapshot)) {
+        baseline = snapshot;
+      } else {
+        dirty = true;
+      }
+    } catch (error) {
+      console.error('Error autosaving:', error);
+      dirty = true;
+    } finally {
+      busy = false;
+    }
+  };
+
+  const timer = setInterval(check, interval);
+  requestCheck = check;
+  return () => {
+    clearInterval(timer);
+    if (requestCheck === check) {
+      requestCheck = null;
+    }
+  };
+}
@@ -0,0 +1,24 @@
+// 開いたマップをバックエンドがメモリ上で修復したときの通知 (on_map_repaired) を受け取り、
+// window の CustomEvent 'space-mind-map-repaired' として配信する。修復した内容は保存するまでファイルに書き込まれない
+
+declare const window: any;
+
+export const MAP_REPAIRED_EVENT = 'space-mind-map-repaired';
+
+export interface MapRepairedDetail {
+  docId: string;
+  path: string;
+  // 修復の種類ごとの件数 (renamed_nodes / dropped_nodes / dangling_links / reindexed_links / resolved_endpoints)
+  repairs: Record<string, number>;
+}
+
+function onMapRepaired(docId: string, path: string, repairs: Record<string, number>) {
+  window.dispatchEvent(new CustomEvent(MAP_REPAIRED_EVENT, { detail: { docId, path, repairs } }));
+}
+
+export function registerDocumentEvents() {
+  if (!window.eel) {
+    return;
+  }
+  window.eel.expose(onMapRepaired, 'on_map_repaired');
+}
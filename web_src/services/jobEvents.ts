@@ -0,0 +1,44 @@
+// バックエンドのジョブ (start_layout_job など) の進捗・完了通知を受け取り、
+// window の CustomEvent 'space-mind-job' として配信する
+// (今のところ画面側にこのイベントを受け取る処理は無く、start_layout_job / start_export_job /
+// cancel_job を呼ぶ画面も無い。ジョブはバックエンドの API としてのみ使える)
+
+declare const window: any;
+
+export const JOB_EVENT = 'space-mind-job';
+
+export interface JobInfo {
+  id: number;
+  kind: string;
+  status: 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+  done: number;
+  total: number;
+  error: string | null;
+}
+
+export interface JobEventDetail {
+  type: 'progress' | 'done';
+  job: JobInfo;
+  // progress では途中結果 (無い場合は null)、done では結果
+  payload: any;
+}
+
+function dispatchJobEvent(detail: JobEventDetail) {
+  window.dispatchEvent(new CustomEvent(JOB_EVENT, { detail }));
+}
+
+function onJobProgress(job: JobInfo, partial: any) {
+  dispatchJobEvent({ type: 'progress', job, payload: partial });
+}
+
+function onJobDone(job: JobInfo, result: any) {
+  dispatchJobEvent({ type: 'done', job, payload: result });
+}
+
+export function registerJobEvents() {
+  if (!window.eel) {
+    return;
+  }
+  window.eel.expose(onJobProgress, 'on_job_progress');
+  window.eel.expose(onJobDone, 'on_job_done');
+}
@@ -0,0 +1,134 @@
+// 大きなマップを 1 つの Eel メッセージで送受信せず、ノード/リンクのチャンクに分けて転送する
+// (バックエンドは py_src/map_transfer.py)。読み込みではチャンクが届くたびに onBatch を呼ぶので、
+// 全体が届く前に進み具合を表示できる (描画はマップ全体が届いてから行う)
+
+export const CHUNK_SIZE = 2000;
+// 同時に要求するチャンク数の上限 (これ以上は前のチャンクが届くまで待つ)
+const MAX_IN_FLIGHT = 4;
+
+export interface MapBatch {
+  nodes: any[];
+  links: any[];
+  // これまでに届いたノード/リンクの数と全体の数
+  loaded: number;
+  total: number;
+}
+
+interface TransferHeader {
+  session: string;
+  path: string;
+  fields: Record<string, any>;
+  node_count: number;
+  link_count: number;
+  chunk_count: number;
+  chunk_size: number;
+}
+
+interface TransferChunk {
+  seq: number;
+  nodes: any[];
+  links: any[];
+  last: boolean;
+}
+
+export async function loadMapChunked(
+  eel: any,
+  path: string | null,
+  onBatch?: (batch: MapBatch) => void,
+): Promise<any> {
+  const header: TransferHeader | null = await eel.start_load_transfer(path, CHUNK_SIZE)();
+  if (!header) {
+    return null;
+  }
+  const { session, chunk_count: chunkCount } = header;
+  const total = header.node_count + header.link_count;
+  const chunks: TransferChunk[] = new Array(chunkCount);
+  const nodes: any[] = [];
+  const links: any[] = [];
+  let delivered = 0;
+  let loaded = 0;
+
+  // 順番どおりに届いた分だけ onBatch に渡す (リンクは両端のノードより後に届く)
+  const deliver = () => {
+    while (delivered < chunkCount && chunks[delivered]) {
+      const chunk = chunks[delivered];
+      nodes.push(...chunk.nodes);
+      links.push(...chunk.links);
+      loaded += chunk.nodes.length + chunk.links.length;
+      onBatch?.({ nodes: chunk.nodes, links: chunk.links, loaded, total });
+      delivered++;
+    }
+  };
+
+  try {
+    let next = 0;
+    const worker = async () => {
+      while (next < chunkCount) {
+        const seq = next++;
+        const chunk: TransferChunk | null = await eel.fetch_transfer_chunk(session, seq)();
+        if (!chunk) {
+          throw new Error(`Transfer chunk ${seq} of ${session} is not available`);
+        }
+        chunks[seq] = chunk;
+        deliver();
+      }
+    };
+    await Promise.all(Array.from({ length: Math.min(MAX_IN_FLIGHT, chunkCount) }, worker));
+  } finally {
+    eel.close_transfer(session)();
+  }
+  return { ...header.fields, nodes, links };
+}
+
+// ノード/リンクをチャンクに分けて保存セッションに送り、finish(session, chunkCount) で締める
+async function uploadMapChunked<T>(
+  eel: any,
+  data: any,
+  finish: (session: string, chunkCount: number) => Promise<T>,
+): Promise<T> {
+  const { nodes = [], links = [], ...fields } = data;
+  const batches: [any[], any[]][] = [];
+  for (let i = 0; i < nodes.length; i += CHUNK_SIZE) {
+    batches.push([nodes.slice(i, i + CHUNK_SIZE), []]);
+  }
+  for (let i = 0; i < links.length; i += CHUNK_SIZE) {
+    batches.push([[], links.slice(i, i + CHUNK_SIZE)]);
+  }
+
+  const session: string = await eel.start_save_transfer(fields)();
+  let next = 0;
+  const worker = async () => {
+    while (next < batches.length) {
+      const seq = next++;
+      const [chunkNodes, chunkLinks] = batches[seq];
+      const received = await eel.push_transfer_chunk(session, seq, chunkNodes, chunkLinks)();
+      if (received === null) {
+        throw new Error(`Save transfer ${session} was closed`);
+      }
+    }
+  };
+  try {
+    await Promise.all(Array.from({ length: Math.min(MAX_IN_FLIGHT, batches.length) }, worker));
+  } catch (err) {
+    eel.close_transfer(session)();
+    throw err;
+  }
+  return await finish(session, batches.length);
+}
+
+export async function saveMapChunked(eel: any, data: any, saveAs = false): Promise<[boolean, string | null]> {
+  const { nodes = [], links = [] } = data;
+  if (nodes.length + links.length <= CHUNK_SIZE) {
+    return saveAs ? await eel.save_as_data(data)() : await eel.save_data(data)();
+  }
+  return uploadMapChunked(eel, data, (session, chunkCount) => eel.finish_save_transfer(session, chunkCount, saveAs)());
+}
+
+// 自動保存の基準になるマップ全体を送る (未保存のマップで自動保存を始めるとき)
+export async function autosaveMapChunked(eel: any, data: any): Promise<boolean> {
+  const { nodes = [], links = [] } = data;
+  if (nodes.length + links.length <= CHUNK_SIZE) {
+    return await eel.autosave_document(data)();
+  }
+  return uploadMapChunked(eel, data, (session, chunkCount) => eel.finish_autosave_transfer(session, chunkCount)());
+}
@@ -0,0 +1,27 @@
+// 前回の終了時に保存されていなかったマップ (バックエンドの自動保存) が見つかったときの通知を受け取り、
+// window の CustomEvent 'space-mind-recovery' として配信する
+
+declare const window: any;
+
+export const RECOVERY_EVENT = 'space-mind-recovery';
+
+export interface RecoverySession {
+  key: string;
+  source_path: string | null;
+  // 自動保存の後で元のファイルが変更されている
+  source_changed: boolean;
+  title: string | null;
+  node_count: number;
+  updated_at: number | null;
+}
+
+function onRecoveryAvailable(sessions: RecoverySession[]) {
+  window.dispatchEvent(new CustomEvent(RECOVERY_EVENT, { detail: sessions }));
+}
+
+export function registerRecoveryEvents() {
+  if (!window.eel) {
+    return;
+  }
+  window.eel.expose(onRecoveryAvailable, 'on_recovery_available');
+}